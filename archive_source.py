@@ -0,0 +1,247 @@
+import os
+import io
+import json
+import mmap
+import struct
+import hashlib
+import tarfile
+import zipfile
+import threading
+from PyQt6.QtCore import QBuffer, QByteArray, QIODevice
+from PyQt6.QtGui import QImage, QImageReader
+
+import bbox_utils # Import the C++ module
+from label_writer import write_text_atomically
+
+ARCHIVE_EXTENSIONS = (".zip", ".tar", ".tar.gz", ".tgz")
+OVERLAY_SUFFIX = ".overlay" # Labels and other dataset files of an archive live in <archive>.overlay beside it
+ARCHIVE_INDEX_FILENAME = "archive_index.json"
+STREAMED_MEMBER = -1 # Data offset of members that are compressed and must go through the archive reader
+
+_ZIP_LOCAL_HEADER = struct.Struct("<4s22xHH") # Signature, then file name and extra field lengths at offset 26
+_ZIP_LOCAL_HEADER_SIGNATURE = b"PK\x03\x04"
+
+def is_archive_path(path):
+    return path.lower().endswith(ARCHIVE_EXTENSIONS)
+
+class ArchiveSource:
+    """Images of a zip or tar archive, addressed by virtual paths inside the overlay folder.
+
+    Every image gets the path it would have if it were extracted flat into the overlay folder,
+    so label files keep living beside their image as in a normal dataset folder. Members stored
+    without compression are read straight from a memory map of the archive; compressed members
+    go through zipfile/tarfile. The member index is built once and cached in the overlay folder.
+    """
+
+    def __init__(self, archive_path):
+        self.archive_path = os.path.abspath(archive_path)
+        self.overlay_folder = self.archive_path + OVERLAY_SUFFIX
+        self._members = {} # {virtual path: (member name, data offset or STREAMED_MEMBER, size)}
+        self._file = None
+        self._mmap = None
+        self._archive = None # zipfile.ZipFile or tarfile.TarFile, opened for streamed members
+        self._lock = threading.Lock() # zipfile/tarfile readers are not safe to share between threads
+        self.skipped_members = 0 # Images whose file name was already taken by another member
+
+    def open(self, image_extensions):
+        """Indexes the archive, or loads the cached index, and extracts its label files on first use."""
+        os.makedirs(self.overlay_folder, exist_ok=True)
+        stat = os.stat(self.archive_path)
+        index_path = os.path.join(self.overlay_folder, ARCHIVE_INDEX_FILENAME)
+        index = self._load_index(index_path)
+        if index is None or index['archive_size'] != stat.st_size or index['archive_mtime_ns'] != stat.st_mtime_ns:
+            members, label_members = self._index_members(image_extensions)
+            self._extract_label_members(members, label_members)
+            index = {'archive_size': stat.st_size, 'archive_mtime_ns': stat.st_mtime_ns, 'members': members}
+            write_text_atomically(index_path, json.dumps(index, separators=(",", ":")))
+        self._members = {os.path.join(self.overlay_folder, name): tuple(entry) for name, entry in index['members'].items()}
+
+        self._file = open(self.archive_path, 'rb')
+        if stat.st_size:
+            self._mmap = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        return self
+
+    def _load_index(self, index_path):
+        try:
+            with open(index_path, 'r') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def _index_members(self, image_extensions):
+        """Returns ({image file name: [member name, data offset, size]}, {label file name: member name})."""
+        image_extensions = {"." + extension.lower() for extension in image_extensions}
+        members = {}
+        label_members = {}
+
+        def add_member(member_name, data_offset, size):
+            file_name = os.path.basename(member_name)
+            extension = os.path.splitext(file_name)[1].lower()
+            if extension in image_extensions:
+                if file_name in members:
+                    self.skipped_members += 1
+                else:
+                    members[file_name] = [member_name, data_offset, size]
+            elif (extension == ".txt" or file_name == "labels.json") and file_name not in label_members:
+                label_members[file_name] = member_name
+
+        if zipfile.is_zipfile(self.archive_path):
+            with open(self.archive_path, 'rb') as f, zipfile.ZipFile(f) as archive, \
+                    mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as archive_map:
+                for info in archive.infolist():
+                    if info.is_dir():
+                        continue
+                    data_offset = STREAMED_MEMBER
+                    if info.compress_type == zipfile.ZIP_STORED and not info.flag_bits & 0x1:
+                        # The data follows the member's local header, whose variable fields may differ from the central directory
+                        signature, name_length, extra_length = _ZIP_LOCAL_HEADER.unpack_from(archive_map, info.header_offset)
+                        if signature == _ZIP_LOCAL_HEADER_SIGNATURE:
+                            data_offset = info.header_offset + _ZIP_LOCAL_HEADER.size + name_length + extra_length
+                    add_member(info.filename, data_offset, info.file_size)
+        else:
+            with tarfile.open(self.archive_path, 'r:*') as archive:
+                compressed = not isinstance(archive.fileobj, io.BufferedReader) # Offsets only map to the file when uncompressed
+                for info in archive:
+                    if info.isfile():
+                        add_member(info.name, STREAMED_MEMBER if compressed else info.offset_data, info.size)
+        return members, label_members
+
+    def _extract_label_members(self, members, label_members):
+        """Copies the label files of the archive's images (and labels.json) into the overlay folder.
+
+        Files already in the overlay are edits made in the app and are never overwritten.
+        """
+        image_stems = {os.path.splitext(name)[0] for name in members}
+        wanted = {name: member_name for name, member_name in label_members.items()
+                  if name == "labels.json" or os.path.splitext(name)[0] in image_stems}
+        if not wanted:
+            return
+        if zipfile.is_zipfile(self.archive_path):
+            with zipfile.ZipFile(self.archive_path) as archive:
+                for name, member_name in wanted.items():
+                    self._write_overlay_file(name, lambda: archive.read(member_name))
+        else:
+            with tarfile.open(self.archive_path, 'r:*') as archive:
+                for name, member_name in wanted.items():
+                    self._write_overlay_file(name, lambda: archive.extractfile(member_name).read())
+
+    def _write_overlay_file(self, name, read_member):
+        overlay_path = os.path.join(self.overlay_folder, name)
+        if not os.path.exists(overlay_path):
+            with open(overlay_path, 'wb') as f:
+                f.write(read_member())
+
+    def image_paths(self):
+        return list(self._members)
+
+    def contains(self, path):
+        return path in self._members
+
+    def member_signature(self, path):
+        """Returns (size, mtime_ns) of an archived image: the member's size and the archive's mtime."""
+        return self._members[path][2], os.stat(self.archive_path).st_mtime_ns
+
+    def member_digest(self, path):
+        """Returns the SHA-1 hex digest of an archived image's content."""
+        return hashlib.sha1(self.read_bytes(path)).hexdigest()
+
+    def member_size(self, path):
+        """Returns (width, height) of an archived image from its header, (0, 0) if it cannot be read."""
+        size = open_image_reader(path).size()
+        return (size.width(), size.height()) if size.isValid() else (0, 0)
+
+    def read_bytes(self, path):
+        """Returns the content of an archived image."""
+        member_name, data_offset, size = self._members[path]
+        if data_offset != STREAMED_MEMBER and self._mmap is not None:
+            return self._mmap[data_offset:data_offset + size]
+        with self._lock:
+            if self._archive is None:
+                if zipfile.is_zipfile(self.archive_path):
+                    self._archive = zipfile.ZipFile(self.archive_path)
+                else:
+                    self._archive = tarfile.open(self.archive_path, 'r:*')
+            if isinstance(self._archive, zipfile.ZipFile):
+                return self._archive.read(member_name)
+            return self._archive.extractfile(member_name).read()
+
+    def close(self):
+        with self._lock:
+            if self._archive is not None:
+                self._archive.close()
+                self._archive = None
+        if self._mmap is not None:
+            self._mmap.close()
+            self._mmap = None
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+# Open archives (and videos, see video_source.VideoSource), by overlay folder. Image paths inside
+# one of these folders are read from the source instead of the file system.
+_sources = {}
+
+def register_archive_source(source):
+    _sources[source.overlay_folder] = source
+
+def source_for_folder(folder):
+    """Returns the open ArchiveSource whose overlay is folder, or None for a plain dataset folder."""
+    return _sources.get(os.path.abspath(folder))
+
+def find_overlay_archive(folder):
+    """Returns the archive an overlay folder belongs to, or None if folder is not an archive overlay."""
+    if folder.endswith(OVERLAY_SUFFIX):
+        archive_path = folder[:-len(OVERLAY_SUFFIX)]
+        if is_archive_path(archive_path) and os.path.isfile(archive_path):
+            return archive_path
+    return None
+
+def _source_for_image(image_path):
+    source = _sources.get(os.path.dirname(image_path)) if _sources else None
+    return source if source is not None and source.contains(image_path) else None
+
+def open_image_reader(image_path):
+    """Returns a QImageReader for an image path, reading archived images from memory."""
+    source = _source_for_image(image_path)
+    if source is None:
+        return QImageReader(image_path)
+    buffer = QBuffer()
+    buffer.setData(QByteArray(source.read_bytes(image_path)))
+    buffer.open(QIODevice.OpenModeFlag.ReadOnly)
+    reader = QImageReader(buffer)
+    reader._buffer = buffer # The reader does not own its device
+    return reader
+
+def load_image(image_path):
+    """Decodes a whole image into a QImage, like QImage(image_path) but for archived images too."""
+    source = _source_for_image(image_path)
+    if source is None:
+        return QImage(image_path)
+    return QImage.fromData(source.read_bytes(image_path))
+
+def image_signature(image_path):
+    """Returns (size, mtime_ns) of an image, used to notice changed images. Archived images take the archive's mtime."""
+    source = _source_for_image(image_path)
+    if source is None:
+        stat = os.stat(image_path)
+        return stat.st_size, stat.st_mtime_ns
+    return source.member_signature(image_path)
+
+def archived_image_digest(image_path):
+    """Returns the digest identifying an archived image's content."""
+    return _source_for_image(image_path).member_digest(image_path)
+
+def is_archived_image(image_path):
+    return _source_for_image(image_path) is not None
+
+def read_image_sizes(image_paths):
+    """Returns [(width, height), ...] of the images if some of them are archived, None if all are files on disk.
+
+    The native functions read image headers from disk, which archived images and video frames do not
+    have. Pass this to their image_sizes argument. Unreadable images are (0, 0).
+    """
+    sources = [_source_for_image(image_path) for image_path in image_paths]
+    if not any(sources):
+        return None
+    return [source.member_size(image_path) if source is not None else bbox_utils.read_image_size(image_path)
+            for image_path, source in zip(image_paths, sources)]
@@ -0,0 +1,145 @@
+import os
+import time
+import queue
+import threading
+from PyQt6.QtCore import QObject, QRectF, pyqtSignal
+
+import bbox_utils # Import the C++ module
+from archive_source import open_image_reader
+from detection_scheduler import StageMetrics
+
+AUTO_LABEL_SAVE_BATCH = 64 # Images whose label files are formatted in one native call
+WRITE_QUEUE_BATCHES = 2 # Batches waiting for the write stage; a full queue holds back decoding and inference
+PIPELINE_STAGES = ("decode", "inference", "post-process", "write")
+
+class AutoLabelPipeline(QObject):
+    """Auto-labels many images on background threads, in stages that overlap.
+
+    decode (DetectionScheduler thread pool) -> inference (scheduler, batched) -> post-process
+    (confidence threshold, merge with the existing boxes) -> write (image size from the header,
+    normalization and formatting of label text in batches). Stages are joined by bounded queues,
+    so a slow stage holds back the ones before it and memory stays bounded. StageMetrics records
+    how busy each stage was. The label text of every image is handed to the GUI thread through
+    batch_ready, which submits it to the LabelWriter like a save.
+    """
+    batch_ready = pyqtSignal(list) # [(image path, label path, new boxes [(class_id, QRectF), ...], label text or None, error or None), ...]
+    progress = pyqtSignal(int, int) # (images done, total)
+    finished = pyqtSignal(object) # StageMetrics of the run
+    failed = pyqtSignal(str)
+
+    def __init__(self, scheduler, jobs, confidence_threshold, merge_iou):
+        """jobs is [(image path, label path, existing boxes [(class_id, QRectF), ...]), ...]."""
+        super().__init__()
+        self.metrics = StageMetrics(PIPELINE_STAGES)
+        scheduler.metrics = self.metrics
+        self.scheduler = scheduler
+        self.jobs = jobs
+        self.confidence_threshold = confidence_threshold
+        self.merge_iou = merge_iou
+        self._cancelled = threading.Event()
+        self._thread = None
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def cancel(self):
+        """Stops soon. Images already post-processed are still written, the others stay unlabelled."""
+        self._cancelled.set()
+
+    def wait(self):
+        """Blocks until the batches in flight are finished and every thread of the run has ended."""
+        if self._thread is not None:
+            self._thread.join()
+
+    def is_cancelled(self):
+        return self._cancelled.is_set()
+
+    def _run(self):
+        write_queue = queue.Queue(maxsize=WRITE_QUEUE_BATCHES)
+        writer = threading.Thread(target=self._write_stage, args=(write_queue,), daemon=True)
+        writer.start()
+        try:
+            jobs_by_path = {job[0]: job for job in self.jobs}
+            detections = self.scheduler.detect([job[0] for job in self.jobs])
+            batch = []
+            try:
+                for i, (image_path, raw_boxes_data, error) in enumerate(detections):
+                    started = time.perf_counter()
+                    _, label_path, existing_boxes = jobs_by_path[image_path]
+                    new_boxes = [] if error is not None else self._new_boxes(existing_boxes, raw_boxes_data)
+                    batch.append((image_path, label_path, existing_boxes, new_boxes, error))
+                    self.metrics.add("post-process", time.perf_counter() - started)
+                    if len(batch) >= AUTO_LABEL_SAVE_BATCH:
+                        write_queue.put(batch) # Blocks while the write stage is behind
+                        batch = []
+                    self.progress.emit(i + 1, len(self.jobs))
+                    if self._cancelled.is_set():
+                        break
+            finally:
+                detections.close() # Lets the scheduler finish the batches in flight
+            if batch:
+                write_queue.put(batch)
+        except Exception as e:
+            self.failed.emit(str(e))
+        finally:
+            write_queue.put(None)
+            writer.join()
+        self.finished.emit(self.metrics)
+
+    def _new_boxes(self, existing_boxes, raw_boxes_data):
+        """Post-process stage: the detections above the threshold that do not duplicate an existing box."""
+        detected = bbox_utils.process_yolo_results(raw_boxes_data, self.confidence_threshold)
+        if existing_boxes or len(detected) >= 2:
+            existing = []
+            for class_id, rect in existing_boxes:
+                p_box = bbox_utils.PixelBoundingBox()
+                p_box.class_id = class_id
+                p_box.x, p_box.y, p_box.width, p_box.height = rect.x(), rect.y(), rect.width(), rect.height()
+                existing.append(p_box)
+            detected = bbox_utils.merge_detections(existing, detected, self.merge_iou)
+        return [(p_box.class_id, QRectF(p_box.x, p_box.y, p_box.width, p_box.height)) for p_box in detected]
+
+    def _write_stage(self, write_queue):
+        while True:
+            batch = write_queue.get()
+            if batch is None:
+                return
+            started = time.perf_counter()
+            try:
+                results = self._format_batch(batch)
+            except Exception as e:
+                results = [(image_path, label_path, [], None, str(e)) for image_path, label_path, _, _, _ in batch]
+            self.metrics.add("write", time.perf_counter() - started, len(batch))
+            self.batch_ready.emit(results)
+
+    def _format_batch(self, batch):
+        """Write stage: the label text of every image of a batch, like DatasetManager.save_labels_for_paths."""
+        results = []
+        to_format = [] # (index in results, pixel boxes, width, height)
+        for image_path, label_path, existing_boxes, new_boxes, error in batch:
+            if error is not None:
+                results.append((image_path, label_path, [], None, error))
+                continue
+            pixel_boxes = []
+            for class_id, rect in existing_boxes + new_boxes:
+                if rect.width() > 0 and rect.height() > 0:
+                    p_box = bbox_utils.PixelBoundingBox()
+                    p_box.class_id = class_id
+                    p_box.x, p_box.y, p_box.width, p_box.height = rect.x(), rect.y(), rect.width(), rect.height()
+                    pixel_boxes.append(p_box)
+            if not pixel_boxes:
+                results.append((image_path, label_path, new_boxes, None, None)) # Removes the label file, like a save
+                continue
+            image_size = open_image_reader(image_path).size() # Header only, the image is not decoded
+            if not image_size.isValid() or image_size.isEmpty():
+                results.append((image_path, label_path, [], None, f"Could not get original image dimensions for {os.path.basename(image_path)}"))
+                continue
+            to_format.append((len(results), pixel_boxes, image_size.width(), image_size.height()))
+            results.append((image_path, label_path, new_boxes, None, None))
+
+        label_texts = bbox_utils.format_yolo_label_texts([item[1] for item in to_format], [item[2] for item in to_format], [item[3] for item in to_format])
+        for (index, _, _, _), label_text in zip(to_format, label_texts):
+            image_path, label_path, new_boxes, _, error = results[index]
+            results[index] = (image_path, label_path, new_boxes, label_text, error)
+        return results
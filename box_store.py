@@ -0,0 +1,160 @@
+import os
+import json
+import mmap
+import itertools
+import threading
+
+import bbox_utils # Import the C++ module
+from archive_source import read_image_sizes
+from label_writer import write_text_atomically
+from label_query import parse_normalized_boxes
+
+BOX_STORE_FILENAME = "labels.boxstore"
+BOX_STORE_JOURNAL_SUFFIX = ".journal" # Saves not merged into the store file yet, see BoxStore.write_journal
+
+def build_box_store(image_paths, label_paths, store_path):
+    """Worker function: writes the box store of a dataset from its label files. Returns the number of boxes."""
+    return bbox_utils.build_box_store(image_paths, label_paths, store_path, image_sizes=read_image_sizes(image_paths) or [])
+
+class BoxStore:
+    """Every box of a dataset in one memory-mapped file, see the layout in bbox_utils.cpp.
+
+    Boxes are packed in class/x/y/w/h columns with per-image offsets, so dataset-wide passes
+    (statistics, queries) and single-image lookups read memory instead of opening one label file
+    per image. Label files stay the reference: saves go to them as before and are mirrored here with
+    update(). Mirrored saves are kept in memory as updates that every reader applies over the file,
+    and are written to a small journal beside it, so a save never rewrites the whole store. Only
+    once many updates piled up are they merged into a new store file (write_updates). Rows are
+    keyed by label file name.
+    """
+
+    def __init__(self, store_path):
+        self.store_path = store_path
+        self.journal_path = store_path + BOX_STORE_JOURNAL_SUFFIX
+        self.folder = os.path.dirname(store_path) # Label files of the rows are in the same folder
+        self.buffer = None # mmap of the file, passed to the bbox_utils box store functions
+        self._rows = {} # {label file name: row}
+        self._names = [] # Label file name of every row
+        self._pending = {} # {row: label text or None}, saves not written to the file yet
+        self._file_signature = None # (size, mtime_ns) of the mapped file, the journal only applies to it
+        self.generation = 0 # Incremented whenever the file is replaced
+        self._write_ids = itertools.count()
+        self._journal_ids = itertools.count()
+        self._journal_lock = threading.Lock()
+        self._journal_written = -1 # Id of the newest journal on disk, older ones finishing late are dropped
+        self.journal_outdated = False # Updates were made since the last journal_snapshot
+
+    def open(self):
+        """Maps the store file. Raises OSError or ValueError if it is missing or damaged."""
+        with open(self.store_path, 'rb') as f:
+            buffer = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        try:
+            names = bbox_utils.read_box_store_names(buffer)
+        except ValueError:
+            buffer.close()
+            raise
+        self.buffer = buffer
+        self._names = names
+        self._rows = {name: row for row, name in enumerate(names)}
+        stat = os.stat(self.store_path)
+        self._file_signature = [stat.st_size, stat.st_mtime_ns]
+        self._read_journal()
+        return self
+
+    def _read_journal(self):
+        """Loads the updates of the journal if it was written for the mapped file."""
+        try:
+            with open(self.journal_path, 'r') as f:
+                journal = json.load(f)
+        except (OSError, ValueError):
+            return
+        if not isinstance(journal, dict) or journal.get('store') != self._file_signature:
+            return # Written for a store file that was rebuilt or merged since
+        for name, label_text in journal.get('updates', {}).items():
+            row = self._rows.get(name)
+            if row is not None and row not in self._pending:
+                self._pending[row] = label_text
+
+    def row(self, label_path):
+        """Returns the row of a label file, or None if it is not in the store."""
+        if os.path.dirname(label_path) != self.folder:
+            return None
+        return self._rows.get(os.path.basename(label_path))
+
+    def rows(self, label_paths):
+        """Returns the rows of many label files, or None if any of them is not in the store."""
+        rows = [self.row(label_path) for label_path in label_paths]
+        return None if None in rows else rows
+
+    def read_boxes(self, label_path):
+        """Returns [(class_id, center_x, center_y, width, height), ...] of a label file in the store, None if it does not exist."""
+        row = self.row(label_path)
+        if row in self._pending:
+            label_text = self._pending[row]
+            return parse_normalized_boxes(label_text) if label_text is not None else None
+        boxes = bbox_utils.read_box_store_boxes(self.buffer, row)
+        if boxes is None:
+            return None
+        return [(box.class_id, box.center_x, box.center_y, box.width, box.height) for box in boxes]
+
+    def update(self, label_path, label_text):
+        """Mirrors a saved label file (None if removed). Returns False if the file is not in the store."""
+        row = self.row(label_path)
+        if row is None:
+            return False
+        self._pending[row] = label_text
+        self.journal_outdated = True
+        return True
+
+    def pending_update_count(self):
+        return len(self._pending)
+
+    def take_pending_updates(self):
+        """Returns (rows, label texts) of the updates not in the file, for write_updates or the
+        updated_rows/updated_texts arguments of the bbox_utils box store readers."""
+        return list(self._pending), list(self._pending.values())
+
+    def journal_snapshot(self):
+        """Returns (journal id, journal text) holding the pending updates, see write_journal (GUI thread)."""
+        updates = {self._names[row]: label_text for row, label_text in self._pending.items()}
+        self.journal_outdated = False
+        return next(self._journal_ids), json.dumps({'store': self._file_signature, 'updates': updates})
+
+    def write_journal(self, journal_id, journal_text):
+        """Worker function: writes a journal from journal_snapshot unless a newer one was written already."""
+        with self._journal_lock:
+            if journal_id < self._journal_written:
+                return
+            write_text_atomically(self.journal_path, journal_text)
+            self._journal_written = journal_id
+
+    def write_updates(self, rows, label_texts):
+        """Worker function: writes the store with the given updates applied to a temporary file and returns its path."""
+        temp_path = f"{self.store_path}.{next(self._write_ids)}.tmp"
+        bbox_utils.write_updated_box_store(self.buffer, rows, label_texts, temp_path)
+        return temp_path
+
+    def replace_file(self, temp_path, rows, label_texts):
+        """Moves a file written by write_updates into place and maps it (GUI thread).
+
+        Updates made after they were taken stay pending, call sync to journal them against the new file.
+        """
+        os.replace(temp_path, self.store_path)
+        self.generation += 1
+        self.buffer = None # Closed once background readers release it
+        self.open()
+        for row, label_text in zip(rows, label_texts):
+            if row in self._pending and self._pending[row] == label_text:
+                del self._pending[row]
+        self.journal_outdated = bool(self._pending) # The journal on disk was written for the old file
+
+    def sync(self):
+        """Writes the journal of the pending updates if it is outdated, blocking."""
+        if self.journal_outdated:
+            self.write_journal(*self.journal_snapshot())
+
+    def close(self):
+        self.buffer = None
+        self._rows = {}
+        self._names = []
+        self._pending = {}
@@ -2,14 +2,17 @@ from PyQt6.QtWidgets import QLabel, QWidget, QMenu, QInputDialog # Import QMenu
 from PyQt6.QtCore import Qt, QPoint, QRect, QSize, QEvent, QPointF, QRectF, QSizeF, pyqtSignal
 from PyQt6.QtGui import QPixmap, QImage, QPainter, QTransform, QAction, QColor # Import QAction and QColor
 
+from image_cache import image_cache
+
 class ZoomPanLabel(QLabel):
     label_needed_signal = pyqtSignal(str) # New signal to request status bar message, defined as class attribute
     bounding_box_added = pyqtSignal() # New signal to indicate a bounding box has been added
+    full_resolution_needed = pyqtSignal() # Zoomed in past the resolution of a reduced-size pixmap
 
     def __init__(self, parent=None):
         super().__init__(parent)
-        self.original_pixmap = None
-        self.current_pixmap_scaled = None
+        self.original_pixmap = None # Displayed pixmap, possibly decoded below the image's original size
+        self.full_resolution_requested = False
         self.zoom_level = 1.0
         self.pan_offset = QPoint(0, 0)
         self.is_panning = False
@@ -103,10 +106,20 @@ class ZoomPanLabel(QLabel):
         else:
             self.setCursor(Qt.CursorShape.ArrowCursor)
 
-    def set_pixmap(self, pixmap):
+    def set_pixmap(self, pixmap, original_size=None):
+        """Shows pixmap as the current image.
+
+        original_size is the image's size in original pixels, when pixmap was decoded at a reduced
+        size. Zoom, pan and bounding boxes always work in original pixels.
+        """
         self.original_pixmap = pixmap
-        self.original_width = pixmap.width()
-        self.original_height = pixmap.height()
+        if original_size is not None and original_size.isValid():
+            self.original_width = original_size.width()
+            self.original_height = original_size.height()
+        else:
+            self.original_width = pixmap.width()
+            self.original_height = pixmap.height()
+        self.full_resolution_requested = False
         self.zoom_level = 1.0
         self.pan_offset = QPoint(0, 0)
         self.bounding_boxes = [] # Clear bounding boxes when a new image is set
@@ -114,6 +127,31 @@ class ZoomPanLabel(QLabel):
         self.history_index = -1 # Reset history index
         self.update_display()
 
+    def replace_pixmap(self, pixmap):
+        """Swaps in a higher resolution decode of the current image, keeping zoom, pan and boxes."""
+        self.original_pixmap = pixmap
+        self.update_display()
+
+    def pixmap_scale(self):
+        """Returns the resolution of the displayed pixmap relative to the original image (1.0 = full resolution)."""
+        if self.original_pixmap is None or not self.original_width:
+            return 1.0
+        return self.original_pixmap.width() / self.original_width
+
+    def _request_full_resolution_if_needed(self):
+        if self.original_pixmap is None or self.original_pixmap.isNull() or self.full_resolution_requested:
+            return
+        if self.pixmap_scale() < 1.0 and self.zoom_level > self.pixmap_scale():
+            self.full_resolution_requested = True
+            self.full_resolution_needed.emit()
+
+    def _get_scaled_pixmap(self, scale):
+        def scale_pixmap():
+            transform = QTransform()
+            transform.scale(scale, scale)
+            return self.original_pixmap.transformed(transform, Qt.TransformationMode.SmoothTransformation)
+        return image_cache.get_or_load(("scaled", self.original_pixmap.cacheKey(), scale), scale_pixmap)
+
     def update_display(self):
         # This method just triggers a repaint. The actual drawing is in paintEvent.
         self.update()
@@ -129,20 +167,20 @@ class ZoomPanLabel(QLabel):
             painter.end()
             return
 
-        # Calculate the scaled pixmap
-        transform = QTransform()
-        transform.scale(self.zoom_level, self.zoom_level)
-        self.current_pixmap_scaled = self.original_pixmap.transformed(transform, Qt.TransformationMode.SmoothTransformation)
-
-        # Calculate the drawing rectangle considering pan offset
-        scaled_width = self.current_pixmap_scaled.width()
-        scaled_height = self.current_pixmap_scaled.height()
-
-        # The drawing rectangle is the scaled pixmap's dimensions, offset by pan_offset
-        draw_rect = QRect(self.pan_offset.x(), self.pan_offset.y(), scaled_width, scaled_height)
-        
-        # Draw the scaled pixmap onto the label
-        painter.drawPixmap(draw_rect, self.current_pixmap_scaled)
+        if not self.original_pixmap.isNull():
+            pixmap_scale = self.pixmap_scale()
+            display_scale = self.zoom_level / pixmap_scale # Pixmap pixels to widget pixels
+            if display_scale < 1.0:
+                # Zoomed out: draw a smoothly downscaled copy, kept in the shared image cache per zoom level
+                painter.drawPixmap(self.pan_offset, self._get_scaled_pixmap(display_scale))
+            else:
+                # Zoomed in: scale only the visible part of the pixmap while painting
+                draw_rect = QRectF(QPointF(self.pan_offset), QSizeF(self.original_width, self.original_height) * self.zoom_level)
+                visible_rect = draw_rect.intersected(QRectF(self.rect()))
+                if not visible_rect.isEmpty():
+                    source_rect = QRectF(self.widget_to_image_coords(visible_rect.topLeft()) * pixmap_scale,
+                                         visible_rect.size() / display_scale)
+                    painter.drawPixmap(visible_rect, self.original_pixmap, source_rect)
 
         # Draw bounding boxes only if visible
         if self.bounding_boxes_visible and self.bounding_boxes:
@@ -230,6 +268,7 @@ class ZoomPanLabel(QLabel):
         self.pan_offset.setY(int(self.pan_offset.y() + mouse_relative_to_pan.y() * (1 - delta_zoom_factor)))
 
         self.zoom_level = new_zoom_level
+        self._request_full_resolution_if_needed()
         self.update_display()
 
     def _get_bounding_box_at_pos(self, pos: QPoint) -> int:
@@ -413,6 +452,15 @@ class ZoomPanLabel(QLabel):
         self._save_history_state()
         self.update_display()
 
+    def replace_bounding_boxes(self, boxes):
+        """Replaces all boxes as a single step that undo reverts, unlike set_bounding_boxes which resets the history."""
+        if not self.history:
+            self._save_history_state() # Undo goes back to the boxes shown before
+        self.bounding_boxes = list(boxes)
+        self.selected_box_index = -1
+        self._save_history_state()
+        self.update_display()
+
     def set_current_class_id(self, class_id: int):
         self.current_class_id = class_id
 
@@ -443,18 +491,19 @@ class ZoomPanLabel(QLabel):
 
         # Calculate zoom level to fit width
         widget_width = self.width()
-        original_image_width = self.original_pixmap.width()
+        original_image_width = self.original_width
         
-        if original_image_width > 0:
+        if original_image_width:
             self.zoom_level = widget_width / original_image_width
         else:
             self.zoom_level = 1.0 # Default if image width is zero
 
         # Center the image horizontally and vertically
-        scaled_height = self.original_pixmap.height() * self.zoom_level
+        scaled_height = (self.original_height or 0) * self.zoom_level
         self.pan_offset.setX(0)
         self.pan_offset.setY(int((self.height() - scaled_height) / 2))
         
+        self._request_full_resolution_if_needed()
         self.update_display()
 
     def toggle_bounding_box_visibility(self):
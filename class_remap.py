@@ -0,0 +1,40 @@
+import bbox_utils # Import the C++ module
+
+REMAP_CHUNK_SIZE = 20000 # Label files rewritten per native call, progress is reported between calls
+DELETED_CLASS = -1 # Mapping target that removes the boxes of a class
+
+def remap_class_ids(boxes, class_mapping):
+    """Applies a class mapping to in-memory [(class_id, QRectF), ...] boxes."""
+    remapped = []
+    for class_id, rect in boxes:
+        new_class_id = class_mapping.get(class_id, class_id)
+        if new_class_id != DELETED_CLASS:
+            remapped.append((new_class_id, rect))
+    return remapped
+
+def compact_class_mapping(labels):
+    """Returns ({old id: new id}, labels) renumbering the labels 0..n-1 in their current id order."""
+    class_mapping = {}
+    compacted_labels = []
+    for new_id, label in enumerate(sorted(labels, key=lambda label: label['id'])):
+        if label['id'] != new_id:
+            class_mapping[label['id']] = new_id
+        compacted_labels.append(dict(label, id=new_id))
+    return class_mapping, compacted_labels
+
+def rewrite_label_classes(label_paths, class_mapping, progress_callback=None):
+    """Worker function: rewrites the class ids of every label file with bbox_utils.remap_label_classes.
+
+    Returns (files changed, boxes remapped, boxes deleted, paths of files that could not be written).
+    """
+    files_changed = boxes_remapped = boxes_deleted = 0
+    failed_files = []
+    for start in range(0, len(label_paths), REMAP_CHUNK_SIZE):
+        result = bbox_utils.remap_label_classes(label_paths[start:start + REMAP_CHUNK_SIZE], class_mapping)
+        files_changed += result.files_changed
+        boxes_remapped += result.boxes_remapped
+        boxes_deleted += result.boxes_deleted
+        failed_files.extend(result.failed_files)
+        if progress_callback:
+            progress_callback(min(start + REMAP_CHUNK_SIZE, len(label_paths)), len(label_paths))
+    return files_changed, boxes_remapped, boxes_deleted, failed_files
@@ -0,0 +1,76 @@
+import os
+import json
+import shutil
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+
+import bbox_utils # Import the C++ module
+from archive_source import read_image_sizes
+
+COCO_EXPORT_CHUNK_SIZE = 2000 # Images converted per native call
+
+def export_coco(dataset_folder, image_files, label_paths, labels, output_path, progress_callback=None):
+    """Streams the dataset into a COCO JSON file without building the document in memory.
+
+    Chunks of images are converted to JSON fragments by bbox_utils.build_coco_chunk (image
+    dimensions come from file headers, or from the archive for archived images; conversion runs on native threads without the GIL)
+    while the previous chunk is being written. Annotations are spooled to a temporary file
+    beside the output and appended once all images have been written.
+    Returns (image_count, annotation_count, skipped_image_paths).
+    """
+    output_directory = os.path.dirname(os.path.abspath(output_path))
+    image_count = 0
+    annotation_count = 0
+    skipped_images = []
+
+    def convert_chunk(start, first_annotation_id):
+        chunk_images = image_files[start:start + COCO_EXPORT_CHUNK_SIZE]
+        chunk_labels = label_paths[start:start + COCO_EXPORT_CHUNK_SIZE]
+        file_names = [os.path.relpath(path, dataset_folder) for path in chunk_images]
+        image_sizes = read_image_sizes(chunk_images) or [] # Archived images have no header on disk
+        return start, bbox_utils.build_coco_chunk(chunk_images, chunk_labels, file_names, start + 1, first_annotation_id, image_sizes=image_sizes)
+
+    partial_path = output_path + ".partial"
+    try:
+        with tempfile.TemporaryFile('w+', dir=output_directory, prefix=".coco_annotations_") as annotations_spool, \
+                open(partial_path, 'w') as output, \
+                ThreadPoolExecutor(max_workers=1) as converter:
+            output.write('{"info": {"description": "Exported by pyqt_auto_labeller"},\n"images": [\n')
+
+            chunk_starts = list(range(0, len(image_files), COCO_EXPORT_CHUNK_SIZE))
+            pending = converter.submit(convert_chunk, chunk_starts[0], 1) if chunk_starts else None
+            for next_index in range(1, len(chunk_starts) + 1):
+                start, chunk = pending.result()
+                # Convert the next chunk while this one is written
+                if next_index < len(chunk_starts):
+                    next_annotation_id = annotation_count + chunk.annotation_count + 1
+                    pending = converter.submit(convert_chunk, chunk_starts[next_index], next_annotation_id)
+
+                if chunk.image_count:
+                    if image_count:
+                        output.write(",\n")
+                    output.write(chunk.images_json)
+                if chunk.annotation_count:
+                    if annotation_count:
+                        annotations_spool.write(",\n")
+                    annotations_spool.write(chunk.annotations_json)
+                image_count += chunk.image_count
+                annotation_count += chunk.annotation_count
+                skipped_images.extend(chunk.failed_images)
+                if progress_callback:
+                    progress_callback(min(start + COCO_EXPORT_CHUNK_SIZE, len(image_files)), len(image_files))
+
+            output.write('\n],\n"annotations": [\n')
+            annotations_spool.seek(0)
+            shutil.copyfileobj(annotations_spool, output, 1024 * 1024)
+            categories = [{"id": label['id'], "name": label['name'], "supercategory": "none"} for label in labels]
+            output.write('\n],\n"categories": ' + json.dumps(categories) + '\n}\n')
+
+        os.replace(partial_path, output_path)
+    except BaseException:
+        try:
+            os.remove(partial_path)
+        except OSError:
+            pass
+        raise
+    return image_count, annotation_count, skipped_images
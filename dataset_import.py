@@ -0,0 +1,285 @@
+import os
+import json
+import xml.etree.ElementTree as ET
+from concurrent.futures import ThreadPoolExecutor
+
+import bbox_utils # Import the C++ module
+from label_writer import write_text_atomically
+
+IMPORT_FLUSH_ANNOTATIONS = 200000 # Buffered annotations before label files are written
+IMPORT_WRITE_THREADS = 8
+_JSON_READ_SIZE = 1 << 20
+
+class _JsonStream:
+    """Minimal incremental reader for a JSON document whose top level is an object of arrays.
+
+    Only one array element is decoded at a time, so memory stays flat no matter how large the
+    file is. Elements are decoded with json's C accelerated raw_decode.
+    """
+
+    def __init__(self, f):
+        self.f = f
+        self.buffer = ""
+        self.pos = 0
+        self.eof = False
+        self.decoder = json.JSONDecoder()
+
+    def _fill(self):
+        chunk = self.f.read(_JSON_READ_SIZE)
+        if not chunk:
+            self.eof = True
+            return False
+        self.buffer = self.buffer[self.pos:] + chunk
+        self.pos = 0
+        return True
+
+    def peek(self):
+        """Returns the next non-whitespace character without consuming it, or '' at the end."""
+        while True:
+            while self.pos < len(self.buffer) and self.buffer[self.pos] in " \t\r\n":
+                self.pos += 1
+            if self.pos < len(self.buffer):
+                return self.buffer[self.pos]
+            if not self._fill():
+                return ""
+
+    def expect(self, char):
+        if self.peek() != char:
+            raise ValueError(f"Expected '{char}' at offset {self.pos} of the JSON stream")
+        self.pos += 1
+
+    def decode_value(self):
+        self.peek()
+        while True:
+            try:
+                value, end = self.decoder.raw_decode(self.buffer, self.pos)
+            except json.JSONDecodeError:
+                if self.eof or not self._fill():
+                    raise
+                continue
+            if end == len(self.buffer) and not self.eof and self._fill():
+                continue # A number may continue in the next chunk
+            self.pos = end
+            return value
+
+    def iter_top_level(self):
+        """Yields (key, item) for every element of every top-level array, and (key, value) for other values."""
+        self.expect("{")
+        if self.peek() == "}":
+            return
+        while True:
+            key = self.decode_value()
+            self.expect(":")
+            if self.peek() == "[":
+                self.pos += 1
+                if self.peek() == "]":
+                    self.pos += 1
+                else:
+                    while True:
+                        yield key, self.decode_value()
+                        separator = self.peek()
+                        self.pos += 1
+                        if separator == "]":
+                            break
+                        if separator != ",":
+                            raise ValueError(f"Malformed array '{key}' in the JSON stream")
+            else:
+                yield key, self.decode_value()
+            separator = self.peek()
+            self.pos += 1
+            if separator == "}":
+                return
+            if separator != ",":
+                raise ValueError("Malformed top-level object in the JSON stream")
+
+class _LabelFileBatchWriter:
+    """Buffers pixel boxes per image and writes them as YOLO label files in parallel batches."""
+
+    def __init__(self, dataset_folder, image_paths_by_stem):
+        self.dataset_folder = dataset_folder
+        self.image_paths_by_stem = image_paths_by_stem # {stem: image path} of the loaded dataset
+        self.pending = {} # {stem: (width, height, [(class_id, x, y, w, h), ...])}
+        self.pending_count = 0
+        self.written_stems = set() # Stems whose label file was already (re)created by this import
+        self.skipped_images = set()
+        self.executor = ThreadPoolExecutor(max_workers=IMPORT_WRITE_THREADS)
+
+    def add(self, file_name, width, height, class_id, x, y, w, h):
+        stem = os.path.splitext(os.path.basename(file_name))[0]
+        if stem not in self.image_paths_by_stem:
+            self.skipped_images.add(file_name)
+            return
+        if stem not in self.pending:
+            self.pending[stem] = (width, height, [])
+        self.pending[stem][2].append((class_id, x, y, w, h))
+        self.pending_count += 1
+        if self.pending_count >= IMPORT_FLUSH_ANNOTATIONS:
+            self.flush()
+
+    def check_image(self, file_name):
+        """Records an image of the annotations that is not in the dataset, even if it has no boxes."""
+        stem = os.path.splitext(os.path.basename(file_name))[0]
+        if stem not in self.image_paths_by_stem:
+            self.skipped_images.add(file_name)
+
+    def flush(self):
+        jobs = []
+        for stem, (width, height, boxes) in self.pending.items():
+            append = stem in self.written_stems # Annotations of one image may span flushes
+            self.written_stems.add(stem)
+            jobs.append(self.executor.submit(self._write_label_file, stem, width, height, boxes, append))
+        for job in jobs:
+            job.result() # Propagate write errors
+        self.pending = {}
+        self.pending_count = 0
+
+    def _write_label_file(self, stem, width, height, boxes, append):
+        pixel_boxes = []
+        for class_id, x, y, w, h in boxes:
+            p_box = bbox_utils.PixelBoundingBox()
+            p_box.class_id = class_id
+            p_box.x = x
+            p_box.y = y
+            p_box.width = w
+            p_box.height = h
+            pixel_boxes.append(p_box)
+        yolo_boxes = bbox_utils.convert_to_yolo_format(pixel_boxes, width, height)
+        label_path = os.path.join(self.dataset_folder, stem + ".txt")
+        label_text = bbox_utils.format_yolo_labels_to_string(yolo_boxes)
+        if append:
+            with open(label_path, 'r') as f:
+                label_text = f.read() + label_text # Written by an earlier flush of this import
+        write_text_atomically(label_path, label_text)
+
+    def close(self):
+        self.flush()
+        self.executor.shutdown()
+        return [self.image_paths_by_stem[stem] for stem in self.written_stems]
+
+def _map_category(name, labels, label_ids_by_name):
+    """Returns the labels.json id for a category name, appending a new label if needed."""
+    if name not in label_ids_by_name:
+        next_id = max((label['id'] for label in labels), default=-1) + 1
+        labels.append({'id': next_id, 'name': name, 'color': bbox_utils.generate_random_color()})
+        label_ids_by_name[name] = next_id
+    return label_ids_by_name[name]
+
+def import_coco(coco_path, dataset_folder, image_files, labels, progress_callback=None):
+    """Streams a COCO JSON file into per-image YOLO label files of the dataset.
+
+    Returns (imported image paths, updated labels list, annotation count, skipped file names).
+    Existing label files of imported images are replaced.
+    """
+    labels = [dict(label) for label in labels]
+    label_ids_by_name = {label['name']: label['id'] for label in labels}
+    writer = _LabelFileBatchWriter(dataset_folder, {os.path.splitext(os.path.basename(path))[0]: path for path in image_files})
+    images = {} # {coco image id: (file_name, width, height)}
+    class_ids = {} # {coco category id: labels.json id}
+    annotation_count = 0
+    seen_sections = set()
+    annotations_deferred = False
+
+    def add_annotation(annotation):
+        image = images.get(annotation.get('image_id'))
+        class_id = class_ids.get(annotation.get('category_id'))
+        bbox = annotation.get('bbox')
+        if image is None or class_id is None or not bbox or len(bbox) < 4:
+            return False
+        writer.add(image[0], image[1], image[2], class_id, *bbox[:4])
+        return True
+
+    try:
+        with open(coco_path, 'r', encoding='utf-8') as f:
+            for key, item in _JsonStream(f).iter_top_level():
+                if key not in seen_sections:
+                    seen_sections.add(key)
+                    if key == "annotations":
+                        # Annotations can only be resolved once images and categories are known
+                        annotations_deferred = not {"images", "categories"} <= seen_sections
+                if key == "images":
+                    images[item['id']] = (item['file_name'], item['width'], item['height'])
+                    writer.check_image(item['file_name'])
+                elif key == "categories":
+                    class_ids[item['id']] = _map_category(item['name'], labels, label_ids_by_name)
+                elif key == "annotations" and not annotations_deferred:
+                    annotation_count += add_annotation(item)
+                    if progress_callback and annotation_count % 100000 == 0:
+                        progress_callback(annotation_count, 0)
+
+        if annotations_deferred:
+            # Uncommon layout (annotations before images or categories): stream the file a second time
+            with open(coco_path, 'r', encoding='utf-8') as f:
+                for key, item in _JsonStream(f).iter_top_level():
+                    if key == "annotations":
+                        annotation_count += add_annotation(item)
+                        if progress_callback and annotation_count % 100000 == 0:
+                            progress_callback(annotation_count, 0)
+    finally:
+        imported_images = writer.close()
+    return imported_images, labels, annotation_count, sorted(writer.skipped_images)
+
+def _voc_number(element):
+    """Returns the number of a VOC element, None if the element is missing or empty."""
+    text = (element.text or "").strip() if element is not None else ""
+    return float(text) if text else None
+
+def _parse_voc_file(xml_path):
+    """Returns (file_name, width, height, [(name, xmin, ymin, xmax, ymax), ...]) of a Pascal VOC file.
+
+    Width and height are 0 if the file does not give them. Only the name and bndbox directly under an
+    object are read, those of its <part> children (e.g. a person's hands) are not separate objects.
+    """
+    file_name = None
+    width = height = 0
+    objects = []
+    for event, element in ET.iterparse(xml_path, events=("end",)):
+        tag = element.tag
+        if tag == "filename":
+            file_name = (element.text or "").strip()
+        elif tag == "size":
+            width = int(_voc_number(element.find("width")) or 0)
+            height = int(_voc_number(element.find("height")) or 0)
+        elif tag == "object":
+            name_element = element.find("name")
+            name = (name_element.text or "").strip() if name_element is not None else ""
+            bndbox = element.find("bndbox")
+            if name and bndbox is not None:
+                box = [_voc_number(bndbox.find(corner)) for corner in ("xmin", "ymin", "xmax", "ymax")]
+                if None not in box:
+                    objects.append((name, *box))
+            element.clear()
+    if not file_name:
+        file_name = os.path.splitext(os.path.basename(xml_path))[0]
+    return file_name, width, height, objects
+
+def import_voc(voc_folder, dataset_folder, image_files, labels, progress_callback=None):
+    """Imports a folder of Pascal VOC XML files into per-image YOLO label files of the dataset.
+
+    Returns the same tuple as import_coco.
+    """
+    labels = [dict(label) for label in labels]
+    label_ids_by_name = {label['name']: label['id'] for label in labels}
+    image_paths_by_stem = {os.path.splitext(os.path.basename(path))[0]: path for path in image_files}
+    writer = _LabelFileBatchWriter(dataset_folder, image_paths_by_stem)
+    xml_paths = [entry.path for entry in os.scandir(voc_folder) if entry.is_file() and entry.name.lower().endswith(".xml")]
+    annotation_count = 0
+
+    try:
+        with ThreadPoolExecutor(max_workers=IMPORT_WRITE_THREADS) as parser:
+            for i, (file_name, width, height, objects) in enumerate(parser.map(_parse_voc_file, xml_paths)):
+                stem = os.path.splitext(os.path.basename(file_name))[0]
+                if (width <= 0 or height <= 0) and stem in image_paths_by_stem:
+                    width, height = bbox_utils.read_image_size(image_paths_by_stem[stem])
+                if width <= 0 or height <= 0:
+                    writer.skipped_images.add(file_name)
+                    continue
+                writer.check_image(file_name)
+                for name, xmin, ymin, xmax, ymax in objects:
+                    class_id = _map_category(name, labels, label_ids_by_name)
+                    writer.add(file_name, width, height, class_id, xmin, ymin, xmax - xmin, ymax - ymin)
+                    annotation_count += 1
+                if progress_callback and (i + 1) % 1000 == 0:
+                    progress_callback(i + 1, len(xml_paths))
+    finally:
+        imported_images = writer.close()
+    return imported_images, labels, annotation_count, sorted(writer.skipped_images)
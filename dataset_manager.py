@@ -1,18 +1,97 @@
 import os
 import json
-from ultralytics import YOLO
-from PyQt6.QtCore import Qt, QDir, QSize, pyqtSignal, QRectF, QObject
-from PyQt6.QtGui import QPixmap, QImageReader, QColor # Import QColor
-from PyQt6.QtWidgets import QFileDialog, QListWidgetItem, QInputDialog, QLineEdit, QApplication, QMessageBox
+import sqlite3
+from collections import OrderedDict
+from PyQt6.QtCore import Qt, QDir, QSize, pyqtSignal, QRectF, QObject, QTimer, QSettings
+from PyQt6.QtGui import QPixmap, QImage, QImageReader, QImageIOHandler, QColor # Import QColor
+from PyQt6.QtWidgets import QFileDialog, QListWidgetItem, QInputDialog, QLineEdit, QMessageBox
 
 from widgets import ImageListItemWidget
 from canvas_widget import ZoomPanLabel
+from label_writer import LabelWriter
+from dataset_export import export_coco
+from dataset_import import import_coco, import_voc
+from dataset_split import build_split, parse_split_ratios, DEFAULT_SPLIT_RATIOS
+from box_store import BoxStore, BOX_STORE_FILENAME, BOX_STORE_JOURNAL_SUFFIX, build_box_store
+from workers import run_in_background
+from inference_backends import create_inference_backend, load_and_warm_up, INFERENCE_BACKENDS, DEFAULT_INFERENCE_BACKEND
+from detection_scheduler import DetectionScheduler
+from auto_label_pipeline import AutoLabelPipeline
+from inference_cache import InferenceCache
+from image_hashing import find_duplicate_groups
+from image_cache import image_cache, DEFAULT_IMAGE_CACHE_BUDGET_MB
+from label_query import parse_label_query, build_label_index, parse_normalized_boxes
+from archive_source import (ArchiveSource, ARCHIVE_EXTENSIONS, register_archive_source, source_for_folder,
+                            find_overlay_archive, open_image_reader, load_image)
+from video_source import VideoSource, VIDEO_EXTENSIONS, DEFAULT_FRAME_STRIDE, find_overlay_video, export_video_coco
+from class_remap import rewrite_label_classes, remap_class_ids, compact_class_mapping, DELETED_CLASS
 import bbox_utils # Import the C++ module
 
+MAX_LOADED_BACKENDS = 2 # Warmed up models kept in memory for quick re-import
+SETTINGS_ORGANIZATION = "pyqt_auto_labeller" # QSettings scope for the last session (dataset folder, model)
+MIN_DISPLAY_DECODE_WIDTH = 256 # Images are first decoded at the canvas width, but never below this
+MERGE_IOU_THRESHOLD = 0.5 # Auto-labels overlapping an existing box of the same class above this are dropped
+PROPAGATION_MATCH_IOU = 0.3 # Minimum IoU between a propagated box and the detection that refines it
+BACKEND_RELOAD_DELAY_MS = 500 # Thread count changes are collected this long before the model is reloaded
+BOX_STORE_SYNC_INTERVAL_MS = 2000 # Saves are collected this long before the box store journal is written
+BOX_STORE_MERGE_UPDATES = 1000 # Once this many images have saves not in the box store file, they are merged into a new file
+
+def _to_pixel_boxes(boxes):
+    """Converts [(class_id, QRectF), ...] into bbox_utils.PixelBoundingBox objects."""
+    pixel_boxes = []
+    for class_id, rect in boxes:
+        p_box = bbox_utils.PixelBoundingBox()
+        p_box.class_id = class_id
+        p_box.x = rect.x()
+        p_box.y = rect.y()
+        p_box.width = rect.width()
+        p_box.height = rect.height()
+        pixel_boxes.append(p_box)
+    return pixel_boxes
+
+def decode_for_display(image_path, display_width):
+    """Decodes an image for a first display display_width pixels wide. Safe to call on worker threads.
+
+    Images wider than display_width are decoded straight to that width with QImageReader's scaled
+    decode (DCT scaling for JPEG), so the full resolution is never materialized. Returns
+    (QImage, original size read from the header).
+    """
+    reader = open_image_reader(image_path)
+    original_size = reader.size()
+    rotated = bool(reader.transformation() & QImageIOHandler.Transformation.TransformationRotate90)
+    if original_size.isValid() and original_size.width() > display_width and not rotated:
+        display_height = max(1, round(original_size.height() * display_width / original_size.width()))
+        reader.setScaledSize(QSize(display_width, display_height))
+        return reader.read(), original_size
+    image = load_image(image_path) # Small enough already, or the header size may not match the decoded orientation
+    return image, image.size()
+
+def scan_dataset_folder(folder_path, supported_extensions):
+    """Worker function: lists the images of a dataset folder with their label status.
+
+    An archive or video overlay folder whose source is not open yet gets its source opened here
+    (from its cached index). Returns (newly opened source or None, bbox_utils image infos).
+    """
+    source = source_for_folder(folder_path)
+    opened_source = None
+    if source is None:
+        archive_path = find_overlay_archive(folder_path)
+        video_path = find_overlay_video(folder_path)
+        if archive_path:
+            source = opened_source = ArchiveSource(archive_path).open(supported_extensions)
+        elif video_path:
+            source = opened_source = VideoSource(video_path).open()
+    candidate_paths = source.image_paths() if source else None
+    return opened_source, bbox_utils.scan_images_and_labels(folder_path, supported_extensions, candidate_paths)
+
 class DatasetManager(QObject):
     labels_updated = pyqtSignal(list) # New signal to emit when labels are updated
     current_image_has_bounding_boxes = pyqtSignal(bool) # Signal to indicate if current image has bounding boxes
     yolo_model_loaded_signal = pyqtSignal(bool) # New signal to indicate if a YOLO model is loaded
+    dataset_loaded = pyqtSignal() # Emitted after the image list and labels.json of a new dataset have been loaded
+    label_file_changed = pyqtSignal(object, object) # (old_text, new_text) of a rewritten label file, None if absent
+    image_list_filtered = pyqtSignal() # The image list was rebuilt for a filter, query or status change
+    image_statuses_changed = pyqtSignal() # Statuses changed without rebuilding the image list
     
     def __init__(self, main_window):
         super().__init__() # Call the parent class's __init__ method
@@ -28,13 +107,67 @@ class DatasetManager(QObject):
         self.label_colors = {} # {label_id: QColor}
         self.has_unsaved_changes = False # New flag to track unsaved changes
         self.current_filter = "All" # Default filter
-        self.yolo_model = None
+        self.yolo_model = None # Inference backend instance, created lazily for yolo_model_path
+        self.inference_backend_name = DEFAULT_INFERENCE_BACKEND
+        self.inference_threads = 0 # 0 lets the backend pick the thread count
+        self._loaded_backends = OrderedDict() # {(backend name, model path, threads): warmed up backend}, most recent last
+        self._loading_backend_key = None # Key of the backend currently loading on a worker thread
+        self._backend_reload_timer = QTimer(self) # Coalesces reloads while the thread count is being changed
+        self._backend_reload_timer.setSingleShot(True)
+        self._backend_reload_timer.setInterval(BACKEND_RELOAD_DELAY_MS)
+        self._backend_reload_timer.timeout.connect(self._load_inference_backend)
+        self.confidence_threshold = 0.5
+        self.tile_size = 0 # Tiled inference tile size in pixels, 0 runs the model on the whole image
+        self.tile_overlap = 0.2 # Fraction of a tile shared with its neighbours
+        self.inference_cache = None # Raw detections of the loaded dataset, see _get_raw_detections
+        self.current_auto_label_boxes = [] # Boxes the last auto-label added to the current image, for re-thresholding
+        self.duplicate_of = {} # {image_path: first image of its near-duplicate cluster}, only for clustered images
+        self.duplicates_ready = False # False until the perceptual hash pass of the loaded dataset has finished
+        self.label_writer = LabelWriter() # Writes label files off the GUI thread
+        self.label_writer.write_finished.connect(self._on_label_file_written)
+        self.label_writer.write_failed.connect(self._on_label_file_write_failed)
+        self._status_save_timer = QTimer(self) # Coalesces status file writes after saves
+        self._status_save_timer.setSingleShot(True)
+        self._status_save_timer.setInterval(500)
+        self._status_save_timer.timeout.connect(self._save_image_statuses_in_background)
+        self.use_box_store = self._settings().value("use_box_store", False, type=bool)
+        self.box_store = None # BoxStore of the loaded dataset when use_box_store is on, see _open_box_store
+        self._box_store_rows = [] # Row of every image of image_files in box_store
+        self._box_store_building = False
+        self._box_store_stale = False # A label file changed while the box store was being built
+        self._box_store_syncing = False
+        self._box_store_sync_timer = QTimer(self) # Coalesces box store journal writes after saves
+        self._box_store_sync_timer.setSingleShot(True)
+        self._box_store_sync_timer.setInterval(BOX_STORE_SYNC_INTERVAL_MS)
+        self._box_store_sync_timer.timeout.connect(self._sync_box_store_in_background)
+        self._auto_label_pipeline = None # AutoLabelPipeline of a running batch auto-label
+        self._auto_label_snapshots = {} # {image path: boxes when the batch started}, to notice edits made meanwhile
+        self._prefetching = set() # Image paths being decoded ahead of display
+        self.label_index = None # bbox_utils.LabelIndex over image_files, built in the background after loading
+        self._label_index_rows = {} # {label file path: row of the image in label_index}
+        self._label_index_building = False
+        self._label_index_stale = False # A label file changed while the index was being built
+        self.label_query = None # Parsed query of the query box, None when empty
+        self.class_remap_running = False # Label files are being rewritten by a class delete/merge/remap or an annotation import
+        self._label_query_mask = None # One byte per image of image_files, 1 where label_query matches
+        self.dataset_loaded.connect(self.rebuild_label_index)
+        image_cache.set_budget(self._settings().value("image_cache_budget_mb", DEFAULT_IMAGE_CACHE_BUDGET_MB, type=int) * 1024 * 1024)
 
     def _get_image_status_filepath(self):
         if self.dataset_folder:
             return os.path.join(self.dataset_folder, "image_statuses.json")
         return None
 
+    def _get_label_filepath(self, image_path):
+        base_name, _ = os.path.splitext(os.path.basename(image_path))
+        return os.path.join(self.dataset_folder, base_name + ".txt")
+
+    def get_label_filepaths(self):
+        """Returns the label file path of every image in the dataset, in image_files order."""
+        if not self.dataset_folder:
+            return []
+        return [self._get_label_filepath(image_path) for image_path in self.image_files]
+
     def _save_image_statuses(self):
         filepath = self._get_image_status_filepath()
         if filepath:
@@ -47,6 +180,11 @@ class DatasetManager(QObject):
             except IOError as e:
                 self.main_window.statusBar.showMessage(f"Error saving image statuses: {e}")
 
+    def _save_image_statuses_in_background(self):
+        filepath = self._get_image_status_filepath()
+        if filepath:
+            self.label_writer.submit(filepath, json.dumps(self.image_labelled_status, indent=4), notify=False)
+
     def _load_image_statuses(self):
         filepath = self._get_image_status_filepath()
         if filepath and os.path.exists(filepath):
@@ -68,32 +206,16 @@ class DatasetManager(QObject):
             self.main_window.statusBar.showMessage("No image selected for auto-labeling.")
             return
 
-        if not hasattr(self, 'yolo_model_path') or not self.yolo_model_path:
+        if not self._has_detector():
             self.main_window.statusBar.showMessage("Please import a YOLO model first.")
             return
 
         try:
-            if self.yolo_model is None:
-                self.yolo_model = YOLO(self.yolo_model_path)
-            
-            results = self.yolo_model(self.current_image_path)
-            
-            raw_boxes_data = []
-            for result in results:
-                for box in result.boxes:
-                    x1, y1, x2, y2 = box.xyxy[0]
-                    conf = box.conf[0]
-                    class_id = int(box.cls[0])
-                    raw_boxes_data.append([float(x1), float(y1), float(x2), float(y2), float(conf), float(class_id)])
-            
-            # Use C++ function to process YOLO results
-            processed_pixel_boxes = bbox_utils.process_yolo_results(raw_boxes_data, 0.5) # 0.5 is confidence threshold
-            
-            new_boxes_qrectf = []
-            for p_box in processed_pixel_boxes:
-                new_boxes_qrectf.append((p_box.class_id, QRectF(p_box.x, p_box.y, p_box.width, p_box.height)))
+            existing_boxes = self.image_bounding_boxes[self.current_image_path]
+            new_boxes_qrectf = self._merge_new_boxes(existing_boxes, self._detect_boxes(self.current_image_path))
+            self.current_auto_label_boxes = new_boxes_qrectf
 
-            self.image_bounding_boxes[self.current_image_path].extend(new_boxes_qrectf)
+            existing_boxes.extend(new_boxes_qrectf)
             self.main_window.canvas_label.set_bounding_boxes(self.image_bounding_boxes[self.current_image_path])
             self._update_image_list_item_labelled_status(self.current_image_path, "auto-labelled") # Mark as auto-labelled
             self.set_unsaved_changes()
@@ -102,7 +224,12 @@ class DatasetManager(QObject):
             self.main_window.statusBar.showMessage(f"Error during auto-labeling: {e}")
 
     def auto_label_all_unlabelled_images(self):
-        if not hasattr(self, 'yolo_model_path') or not self.yolo_model_path:
+        if self._auto_label_pipeline is not None:
+            self._auto_label_pipeline.cancel() # The button stops a running batch
+            self.main_window.statusBar.showMessage("Stopping auto-labeling...")
+            return
+
+        if not self._has_detector():
             self.main_window.statusBar.showMessage("Please import a YOLO model first to auto-label all images.")
             return
 
@@ -119,54 +246,293 @@ class DatasetManager(QObject):
             self.main_window.statusBar.showMessage("No unlabelled images found to auto-label.")
             return
 
-        self.main_window.show_loading_cursor()
-        self.main_window.statusBar.showMessage(f"Starting auto-labeling for {len(unlabelled_images)} unlabelled images...")
-        
+        if self.class_remap_running:
+            self.main_window.statusBar.showMessage("Label files are being rewritten, auto-label again once the class update or import has finished.")
+            return
+
+        # Decoding, inference, post-processing and formatting run as overlapping stages on background
+        # threads; label texts come back in batches and are saved like any other save
+        jobs = [(image_path, self._get_label_filepath(image_path), list(self.image_bounding_boxes[image_path]))
+                for image_path in unlabelled_images]
         try:
-            if self.yolo_model is None:
-                self.yolo_model = YOLO(self.yolo_model_path)
+            pipeline = AutoLabelPipeline(self._get_detection_scheduler(), jobs, self.confidence_threshold, MERGE_IOU_THRESHOLD)
+        except Exception as e:
+            self.main_window.statusBar.showMessage(f"Error during batch auto-labeling: {e}")
+            return
+        self._auto_label_pipeline = pipeline
+        self._auto_label_snapshots = {image_path: existing_boxes for image_path, _, existing_boxes in jobs}
+        pipeline.batch_ready.connect(lambda results: self._on_auto_label_batch_ready(pipeline, results))
+        pipeline.progress.connect(lambda done, total: self._on_auto_label_progress(pipeline, done, total))
+        pipeline.failed.connect(lambda message: self._on_auto_label_failed(pipeline, message))
+        pipeline.finished.connect(lambda metrics: self._on_auto_label_finished(pipeline, metrics))
+        self.main_window.auto_label_all_button.setText("Stop Auto Labelling")
+        self.main_window.statusBar.showMessage(f"Starting auto-labeling for {len(unlabelled_images)} unlabelled images...")
+        pipeline.start()
+
+    def _on_auto_label_progress(self, pipeline, done, total):
+        if pipeline is self._auto_label_pipeline and not pipeline.is_cancelled():
+            self.main_window.statusBar.showMessage(f"Auto-labeling {done}/{total} images. Stages busy: {pipeline.metrics.summary()}")
+
+    def _on_auto_label_failed(self, pipeline, error_message):
+        if pipeline is self._auto_label_pipeline:
+            self.main_window.statusBar.showMessage(f"Error during batch auto-labeling: {error_message}")
+
+    def _on_auto_label_batch_ready(self, pipeline, results):
+        """Saves the label texts of a batch formatted by the pipeline and shows its boxes."""
+        if pipeline is not self._auto_label_pipeline:
+            return # Another dataset was loaded meanwhile
+        saved_paths, empty_paths, changed_paths = [], [], []
+        for image_path, label_path, new_boxes, label_text, error in results:
+            if error is not None:
+                self.main_window.statusBar.showMessage(f"Error auto-labeling {os.path.basename(image_path)}: {error}")
+                continue
+            # Add only the boxes that do not duplicate existing ones to the image's bounding box list
+            existing_boxes = self.image_bounding_boxes[image_path]
+            if image_path == self.current_image_path:
+                existing_boxes = self.main_window.canvas_label.get_bounding_boxes() # Includes unsaved edits, the canvas rebinds its list on undo
+                self.image_bounding_boxes[image_path] = existing_boxes
+            if existing_boxes != self._auto_label_snapshots.pop(image_path, existing_boxes):
+                changed_paths.append(image_path) # Edited while the pipeline ran, the formatted text is outdated
+            existing_boxes.extend(new_boxes)
+            self._submit_label_file(label_path, label_text)
+            (saved_paths if label_text is not None else empty_paths).append(image_path)
+            if image_path == self.current_image_path:
+                self.main_window.canvas_label.set_bounding_boxes(existing_boxes)
+                self.current_image_has_bounding_boxes.emit(bool(existing_boxes))
+        if saved_paths:
+            self.set_image_statuses(saved_paths, "auto-labelled")
+        if empty_paths:
+            self.set_image_statuses(empty_paths, "unlabelled")
+        if changed_paths:
+            self.save_labels_for_paths(changed_paths, status="auto-labelled")
+
+    def _on_auto_label_finished(self, pipeline, metrics):
+        if pipeline is not self._auto_label_pipeline:
+            return
+        self._auto_label_pipeline = None
+        self._auto_label_snapshots = {}
+        self.main_window.auto_label_all_button.setText("Auto Label All Unlabelled")
+        # After all images are processed, re-apply filter to refresh the list
+        filter_index = self.main_window.filter_combobox.findText(self.current_filter)
+        if filter_index != -1:
+            self.apply_filter(filter_index)
+        outcome = "stopped" if pipeline.is_cancelled() else "complete"
+        self.main_window.statusBar.showMessage(f"Auto-labeling all unlabelled images {outcome} in {metrics.elapsed():.1f} s. Stages busy: {metrics.summary()}")
+
+    def _stop_auto_labelling(self):
+        """Stops a running batch auto-label and ignores its remaining results, e.g. when another dataset is loaded.
+
+        Blocks until its threads are done with the detector and the inference cache, so both can be closed afterwards.
+        """
+        if self._auto_label_pipeline is not None:
+            self._auto_label_pipeline.cancel()
+            self._auto_label_pipeline.wait()
+            self._auto_label_pipeline = None
+            self._auto_label_snapshots = {}
+            self.main_window.auto_label_all_button.setText("Auto Label All Unlabelled")
+
+    def _get_inference_backend(self):
+        if self.yolo_model is None:
+            self.yolo_model = create_inference_backend(self.inference_backend_name, self.yolo_model_path, self.inference_threads)
+        return self.yolo_model
+
+    def _has_detector(self):
+        """True if auto-labeling can run: a model was imported, or the backend needs none."""
+        return bool(getattr(self, 'yolo_model_path', None)) or not INFERENCE_BACKENDS[self.inference_backend_name].requires_model_file
+
+    def _detector_name(self):
+        return os.path.basename(self.yolo_model_path) if getattr(self, 'yolo_model_path', None) else self.inference_backend_name
+
+    def _get_detection_scheduler(self):
+        return DetectionScheduler(self._get_inference_backend(), self.inference_cache, self.tile_size, self.tile_overlap)
+
+    def _get_raw_detections(self, image_path, run_inference=True):
+        """Returns the raw detections of the current model for an image.
+
+        Detections come from the inference cache when this model already ran on identical
+        image content; otherwise the model runs (unless run_inference is False) and the
+        result is stored. Returns None if nothing is cached and inference was not allowed.
+        """
+        scheduler = self._get_detection_scheduler()
+        if not run_inference:
+            return scheduler.cached_detections(image_path)
+        _, raw_boxes_data, error = next(scheduler.detect([image_path]))
+        if error is not None:
+            raise RuntimeError(error)
+        return raw_boxes_data
+
+    def _detect_boxes(self, image_path):
+        """Returns the detections above the confidence threshold as [(class_id, QRectF), ...]."""
+        raw_boxes_data = self._get_raw_detections(image_path)
+        return self._filter_raw_detections(raw_boxes_data)
+
+    def _filter_raw_detections(self, raw_boxes_data):
+        # Use C++ function to process YOLO results
+        processed_pixel_boxes = bbox_utils.process_yolo_results(raw_boxes_data, self.confidence_threshold)
+
+        new_boxes_qrectf = []
+        for p_box in processed_pixel_boxes:
+            new_boxes_qrectf.append((p_box.class_id, QRectF(p_box.x, p_box.y, p_box.width, p_box.height)))
+        return new_boxes_qrectf
+
+    def _merge_new_boxes(self, existing_boxes, detected_boxes):
+        """Returns the detected boxes that do not duplicate an existing box (or each other).
+
+        Existing boxes are never changed: on a conflict the human-drawn box wins.
+        """
+        if not existing_boxes and len(detected_boxes) < 2:
+            return detected_boxes
+        merged = bbox_utils.merge_detections(_to_pixel_boxes(existing_boxes), _to_pixel_boxes(detected_boxes), MERGE_IOU_THRESHOLD)
+        return [(p_box.class_id, QRectF(p_box.x, p_box.y, p_box.width, p_box.height)) for p_box in merged]
+
+    def propagate_boxes_from_previous(self, run_detector=True):
+        """Brings the boxes of the previous image in the list forward onto the current image.
+
+        The current boxes are replaced in one step that can be undone. When a model is loaded, each
+        carried box is matched to the current image's detections with bbox_utils.propagate_boxes and
+        takes the geometry of its match. With run_detector False only cached detections are used,
+        which keeps propagation on Next instant.
+        """
+        if not self.current_image_path:
+            self.main_window.statusBar.showMessage("No image selected to propagate boxes to.")
+            return
+        image_list = self.main_window.left_panel_list
+        row = image_list.currentRow()
+        widget = image_list.itemWidget(image_list.item(row - 1)) if row > 0 else None
+        if not isinstance(widget, ImageListItemWidget):
+            self.main_window.statusBar.showMessage("No previous image to propagate boxes from.")
+            return
+        previous_boxes = self._boxes_for_propagation(widget.image_path)
+        if not previous_boxes:
+            self.main_window.statusBar.showMessage(f"{os.path.basename(widget.image_path)} has no boxes to propagate.")
+            return
 
-            for i, image_path in enumerate(unlabelled_images):
-                self.main_window.statusBar.showMessage(f"Auto-labeling image {i+1}/{len(unlabelled_images)}: {os.path.basename(image_path)}")
-                QApplication.processEvents() # Allow UI to update
+        detections = []
+        if self.yolo_model is not None:
+            try:
+                raw_boxes_data = self._get_raw_detections(self.current_image_path, run_inference=run_detector)
+                detections = self._filter_raw_detections(raw_boxes_data) if raw_boxes_data else []
+            except Exception as e:
+                self.main_window.statusBar.showMessage(f"Error detecting boxes for propagation: {e}")
+        canvas = self.main_window.canvas_label
+        result = bbox_utils.propagate_boxes(_to_pixel_boxes(previous_boxes), _to_pixel_boxes(detections), PROPAGATION_MATCH_IOU,
+                                            True, canvas.original_width, canvas.original_height)
+        canvas.replace_bounding_boxes([(p_box.class_id, QRectF(p_box.x, p_box.y, p_box.width, p_box.height)) for p_box in result.boxes])
+        self.image_bounding_boxes[self.current_image_path] = canvas.get_bounding_boxes()
+        self.current_auto_label_boxes = []
+        self._update_image_list_item_labelled_status(self.current_image_path, "auto-labelled")
+        self.set_unsaved_changes()
+        self.current_image_has_bounding_boxes.emit(bool(result.boxes))
+        self.main_window.statusBar.showMessage(
+            f"Propagated {len(result.boxes)} boxes from {os.path.basename(widget.image_path)}: "
+            f"{result.refined} refined by detections, {result.carried} carried over.")
+
+    def _boxes_for_propagation(self, image_path):
+        """Returns the boxes of an image: the in-memory ones if it was opened, else those of its label file,
+        read like display_image does so saves that are still queued are seen.
+
+        Label files are converted with the current image's size, frames of a sequence share it.
+        """
+        if self.image_bounding_boxes.get(image_path):
+            return self.image_bounding_boxes[image_path]
+        width, height = self.main_window.canvas_label.original_width, self.main_window.canvas_label.original_height
+        if not width or not height:
+            return []
+        label_filepath = self._get_label_filepath(image_path)
+        if self.box_store is not None and self.box_store.row(label_filepath) is not None:
+            normalized_boxes = self.box_store.read_boxes(label_filepath) or []
+        else:
+            try:
+                label_text = self.label_writer.read_text(label_filepath) # Queued saves win over the file on disk
+            except (OSError, UnicodeDecodeError):
+                return []
+            normalized_boxes = parse_normalized_boxes(label_text) if label_text is not None else []
+        return [(class_id, QRectF((center_x - box_width / 2) * width, (center_y - box_height / 2) * height, box_width * width, box_height * height))
+                for class_id, center_x, center_y, box_width, box_height in normalized_boxes]
+
+    def _load_inference_backend(self):
+        """Loads and warms up the backend for the current model on a worker thread.
+
+        yolo_model_loaded_signal(True) is only emitted once the model is ready. A backend that
+        was loaded before for the same model, backend and thread count is reused immediately.
+        """
+        self._backend_reload_timer.stop() # A thread count change waiting to reload is covered by this load
+        if not self._has_detector():
+            self.yolo_model = None
+            self._loading_backend_key = None
+            self.yolo_model_loaded_signal.emit(False)
+            return
+        backend_key = (self.inference_backend_name, getattr(self, 'yolo_model_path', None), self.inference_threads)
+        if backend_key in self._loaded_backends:
+            self._loaded_backends.move_to_end(backend_key)
+            self.yolo_model = self._loaded_backends[backend_key]
+            self._loading_backend_key = None
+            self.main_window.statusBar.showMessage(f"YOLO model ready: {self._detector_name()}")
+            self.yolo_model_loaded_signal.emit(True)
+            return
 
-                try:
-                    results = self.yolo_model(image_path)
-                    
-                    raw_boxes_data = []
-                    for result in results:
-                        for box in result.boxes:
-                            x1, y1, x2, y2 = box.xyxy[0]
-                            conf = box.conf[0]
-                            class_id = int(box.cls[0])
-                            raw_boxes_data.append([float(x1), float(y1), float(x2), float(y2), float(conf), float(class_id)])
-                    
-                    processed_pixel_boxes = bbox_utils.process_yolo_results(raw_boxes_data, 0.5)
-                    
-                    new_boxes_qrectf = []
-                    for p_box in processed_pixel_boxes:
-                        new_boxes_qrectf.append((p_box.class_id, QRectF(p_box.x, p_box.y, p_box.width, p_box.height)))
-
-                    # Add new boxes to the image's bounding box list
-                    self.image_bounding_boxes[image_path].extend(new_boxes_qrectf)
-                    
-                    # Save labels for this image
-                    self.save_labels_for_path(image_path, status="auto-labelled")
-                    # The save_labels_for_path will now handle updating the status
-                except Exception as e:
-                    self.main_window.statusBar.showMessage(f"Error auto-labeling {os.path.basename(image_path)}: {e}")
-                    QApplication.processEvents()
-
-            self.main_window.statusBar.showMessage("Auto-labeling all unlabelled images complete.")
-            # After all images are processed, re-apply filter to refresh the list
-            filter_index = self.main_window.filter_combobox.findText(self.current_filter)
-            if filter_index != -1:
-                self.apply_filter(filter_index)
+        self.yolo_model = None
+        self._loading_backend_key = backend_key
+        self.yolo_model_loaded_signal.emit(False) # Auto-labeling stays disabled until the model is ready
+        self.main_window.statusBar.showMessage(f"Loading YOLO model: {self._detector_name()}...")
+        run_in_background(load_and_warm_up, backend_key, create_inference_backend(*backend_key),
+                          on_finished=self._on_inference_backend_loaded,
+                          on_error=lambda error_message: self._on_inference_backend_load_failed(backend_key, error_message))
+
+    def _on_inference_backend_loaded(self, result):
+        backend_key, backend = result
+        self._loaded_backends[backend_key] = backend
+        while len(self._loaded_backends) > MAX_LOADED_BACKENDS:
+            self._loaded_backends.popitem(last=False) # Drop the least recently used model
+        if backend_key != self._loading_backend_key:
+            return # Another model or backend was selected while this one was loading
+        self._loading_backend_key = None
+        self.yolo_model = backend
+        self.main_window.statusBar.showMessage(f"YOLO model ready: {self._detector_name()}")
+        self.yolo_model_loaded_signal.emit(True)
+
+    def _on_inference_backend_load_failed(self, backend_key, error_message):
+        if backend_key != self._loading_backend_key:
+            return # Another model or backend was selected while this one was loading
+        self._loading_backend_key = None
+        self.main_window.statusBar.showMessage(f"Error loading YOLO model: {error_message}")
+        self.yolo_model_loaded_signal.emit(False)
+
+    def set_confidence_threshold(self, threshold: float):
+        """Changes the auto-label threshold and re-filters the current image's cached detections."""
+        self.confidence_threshold = threshold
+        if not self.current_image_path or not self.current_auto_label_boxes or self.yolo_model is None:
+            return
+        raw_boxes_data = self._get_raw_detections(self.current_image_path, run_inference=False)
+        if raw_boxes_data is None:
+            return
 
-        except Exception as e:
-            self.main_window.statusBar.showMessage(f"Error during batch auto-labeling: {e}")
-        finally:
-            self.main_window.hide_loading_cursor()
+        # Swap the previously auto-added boxes for the re-filtered ones, keep everything else
+        previous_auto_boxes = set(id(box) for box in self.current_auto_label_boxes)
+        kept_boxes = [box for box in self.main_window.canvas_label.get_bounding_boxes() if id(box) not in previous_auto_boxes]
+        self.current_auto_label_boxes = self._merge_new_boxes(kept_boxes, self._filter_raw_detections(raw_boxes_data))
+        self.image_bounding_boxes[self.current_image_path] = kept_boxes + self.current_auto_label_boxes
+        self.main_window.canvas_label.set_bounding_boxes(self.image_bounding_boxes[self.current_image_path])
+        self.set_unsaved_changes()
+        self.main_window.statusBar.showMessage(f"Confidence {threshold:.2f}: {len(self.current_auto_label_boxes)} auto-labelled boxes.")
+
+    def set_tile_size(self, tile_size: int):
+        self.tile_size = tile_size
+        self.main_window.statusBar.showMessage(f"Tiled inference: {f'{tile_size} px tiles' if tile_size > 0 else 'off'}")
+
+    def set_tile_overlap(self, overlap: float):
+        self.tile_overlap = overlap
+        self.main_window.statusBar.showMessage(f"Tile overlap: {overlap:.0%}")
+
+    def set_inference_backend(self, backend_name: str):
+        self.inference_backend_name = backend_name
+        self.main_window.statusBar.showMessage(f"Inference backend: {backend_name}")
+        self._load_inference_backend()
+
+    def set_inference_threads(self, thread_count: int):
+        self.inference_threads = thread_count # Fixed when a session is created, so reload
+        self.main_window.statusBar.showMessage(f"Inference threads: {thread_count if thread_count > 0 else 'auto'}")
+        self._backend_reload_timer.start() # Once the value settles, not for every spin box step
 
     def set_unsaved_changes(self):
         self.has_unsaved_changes = True
@@ -175,18 +541,123 @@ class DatasetManager(QObject):
     def load_dataset(self):
         folder_path = QFileDialog.getExistingDirectory(self.main_window, "Select Dataset Folder")
         if folder_path:
-            self.dataset_folder = folder_path
-            self.main_window.show_loading_cursor()
-            try:
-                self.populate_image_list()
-                self.load_labels_from_json()
-                self.main_window.statusBar.showMessage(f"Dataset loaded: {os.path.basename(folder_path)}")
-            finally:
-                self.main_window.hide_loading_cursor()
+            self.open_dataset(folder_path)
         else:
             self.main_window.statusBar.showMessage("Dataset loading cancelled")
 
-    def populate_image_list(self):
+    def open_archive(self):
+        archive_filter = "Dataset Archives (" + " ".join(f"*{extension}" for extension in ARCHIVE_EXTENSIONS) + ")"
+        archive_path, _ = QFileDialog.getOpenFileName(self.main_window, "Open Dataset Archive", "", archive_filter)
+        if archive_path:
+            self.open_archive_dataset(archive_path)
+        else:
+            self.main_window.statusBar.showMessage("Archive loading cancelled")
+
+    def open_archive_dataset(self, archive_path: str):
+        """Opens a zip or tar archive as a dataset without extracting its images.
+
+        The archive is indexed on a worker thread (once, the index is cached). Images are read from
+        the archive; label files and everything else written for the dataset go to its overlay folder.
+        """
+        self.main_window.statusBar.showMessage(f"Indexing {os.path.basename(archive_path)}...")
+        run_in_background(lambda path: ArchiveSource(path).open(self._supported_image_extensions()), archive_path,
+                          on_finished=self._on_archive_opened,
+                          on_error=lambda message: self.main_window.statusBar.showMessage(f"Error opening archive: {message}"))
+
+    def _on_archive_opened(self, source):
+        register_archive_source(source)
+        self.open_dataset(source.overlay_folder)
+        if source.skipped_members:
+            self.main_window.statusBar.showMessage(f"Skipped {source.skipped_members} archived images whose file name was already taken.")
+
+    def open_video(self):
+        video_filter = "Videos (" + " ".join(f"*{extension}" for extension in VIDEO_EXTENSIONS) + ")"
+        video_path, _ = QFileDialog.getOpenFileName(self.main_window, "Open Video", "", video_filter)
+        if not video_path:
+            self.main_window.statusBar.showMessage("Video loading cancelled")
+            return
+        stride, ok = QInputDialog.getInt(self.main_window, "Open Video", "List every n-th frame:", DEFAULT_FRAME_STRIDE, 1, 10000)
+        if ok:
+            self.open_video_dataset(video_path, stride)
+
+    def open_video_dataset(self, video_path: str, stride: int = DEFAULT_FRAME_STRIDE):
+        """Opens a video as a dataset whose images are every stride-th frame, decoded on demand.
+
+        Labels are stored per frame index in the video's overlay folder; frames that have labels
+        stay in the list even if the stride changes later.
+        """
+        self.main_window.statusBar.showMessage(f"Opening {os.path.basename(video_path)}...")
+        run_in_background(lambda path: VideoSource(path, stride).open(), video_path,
+                          on_finished=self._on_video_opened,
+                          on_error=lambda message: self.main_window.statusBar.showMessage(f"Error opening video: {message}"))
+
+    def _on_video_opened(self, source):
+        previous_source = source_for_folder(source.overlay_folder)
+        register_archive_source(source)
+        if previous_source is not None and previous_source is not source:
+            previous_source.close()
+        self.open_dataset(source.overlay_folder)
+
+    def _supported_image_extensions(self):
+        return [extension.data().decode('ascii') for extension in QImageReader.supportedImageFormats()]
+
+    def open_dataset(self, folder_path: str, image_infos=None):
+        """Loads a dataset folder. image_infos is a scan made by scan_dataset_folder, the folder is scanned here if None."""
+        archive_path = find_overlay_archive(folder_path)
+        video_path = find_overlay_video(folder_path)
+        if image_infos is None and (archive_path or video_path) and source_for_folder(folder_path) is None:
+            # Reopening an archive or video dataset, e.g. from the last session; its index is cached
+            try:
+                if archive_path:
+                    register_archive_source(ArchiveSource(archive_path).open(self._supported_image_extensions()))
+                else:
+                    register_archive_source(VideoSource(video_path).open())
+            except (OSError, ValueError, ImportError) as e:
+                self.main_window.statusBar.showMessage(f"Error opening {os.path.basename(archive_path or video_path)}: {e}")
+                return
+        self.dataset_folder = folder_path
+        self.main_window.show_loading_cursor()
+        try:
+            self.populate_image_list(image_infos)
+            self.load_labels_from_json()
+            self.dataset_loaded.emit() # Image list and classes are both in place
+            self.main_window.statusBar.showMessage(f"Dataset loaded: {os.path.basename(folder_path)}")
+        finally:
+            self.main_window.hide_loading_cursor()
+        self._settings().setValue("last_dataset_folder", folder_path)
+
+    def _settings(self):
+        return QSettings(SETTINGS_ORGANIZATION, SETTINGS_ORGANIZATION)
+
+    def restore_last_session(self):
+        """Reopens the dataset and model of the previous session, if they still exist.
+
+        Called once the window has been painted. The folder is scanned on a worker thread, so the
+        window stays responsive until the image list is filled. The model is then loaded and warmed
+        up in the background like an imported one.
+        """
+        settings = self._settings()
+        folder_path = settings.value("last_dataset_folder", "", type=str)
+        model_path = settings.value("last_yolo_model_path", "", type=str)
+        if folder_path and os.path.isdir(folder_path):
+            self.main_window.statusBar.showMessage(f"Loading {os.path.basename(folder_path)}...")
+            run_in_background(scan_dataset_folder, folder_path, self._supported_image_extensions(),
+                              on_finished=lambda result: self._on_last_session_scanned(folder_path, model_path, result),
+                              on_error=lambda message: self.main_window.statusBar.showMessage(f"Error opening {os.path.basename(folder_path)}: {message}"))
+
+    def _on_last_session_scanned(self, folder_path, model_path, result):
+        opened_source, image_infos = result
+        if self.dataset_folder:
+            if opened_source is not None:
+                opened_source.close()
+            return # A dataset was opened meanwhile
+        if opened_source is not None:
+            register_archive_source(opened_source)
+        self.open_dataset(folder_path, image_infos)
+        if model_path and os.path.isfile(model_path):
+            self.set_yolo_model(model_path)
+
+    def populate_image_list(self, image_infos=None):
         if not self.dataset_folder:
             return
 
@@ -199,17 +670,36 @@ class DatasetManager(QObject):
         self.main_window.left_panel_list.clear()
         self.main_window.label_list_widget.clear()
         self.has_unsaved_changes = False # Reset on new dataset load
+        self.current_image_path = None # apply_filter displays the first image of the new list
+        self._stop_auto_labelling()
+        self.flush_pending_writes() # Finish writes to the previous dataset first
+        self.label_writer.forget()
+        self._close_box_store()
+        if self.inference_cache is not None:
+            self.inference_cache.close()
+        try:
+            self.inference_cache = InferenceCache(os.path.join(self.dataset_folder, ".inference_cache.sqlite"))
+        except sqlite3.Error as e:
+            self.inference_cache = None # Detections are not cached for this dataset, e.g. a read-only folder
+            self.main_window.statusBar.showMessage(f"Inference cache unavailable: {e}")
+        self.duplicate_of = {}
+        self.duplicates_ready = False
+        self.label_index = None # Rebuilt once dataset_loaded is emitted
+        self._label_index_rows = {}
+        self._label_query_mask = None
         self.current_filter = "All" # Reset filter on new dataset load
         self.main_window.filter_combobox.setCurrentText("All") # Reset combobox
         self.yolo_model_path = None # Clear YOLO model path on new dataset load
-        self.yolo_model = None # Clear loaded YOLO model
+        self.yolo_model = None # Clear loaded YOLO model (it stays cached in _loaded_backends)
+        self._loading_backend_key = None
         self.yolo_model_loaded_signal.emit(False) # Emit signal that model is not loaded
+        self._load_inference_backend() # Backends that need no model file stay available
 
-        supported_extensions_bytes = QImageReader.supportedImageFormats()
-        supported_extensions = [ext.data().decode('ascii') for ext in supported_extensions_bytes]
-
-        # Use the C++ function to scan images and their label status
-        image_infos = bbox_utils.scan_images_and_labels(self.dataset_folder, supported_extensions)
+        # Use the C++ function to scan images and their label status, unless the folder was scanned in the
+        # background already. Archive and video datasets list their images from the source's index; their
+        # label files are in the overlay folder like any others.
+        if image_infos is None:
+            _, image_infos = scan_dataset_folder(self.dataset_folder, self._supported_image_extensions())
 
         # Load previously saved statuses first
         self._load_image_statuses()
@@ -229,6 +719,192 @@ class DatasetManager(QObject):
         if not self.image_files:
             self.main_window.statusBar.showMessage("No images found in the selected folder.")
         # The first image will be displayed by apply_filter
+        self.find_near_duplicates()
+        self._open_box_store()
+
+    def find_near_duplicates(self):
+        """Hashes new or modified images in the background and groups near-duplicates for the duplicate filters."""
+        if not self.image_files:
+            return
+        dataset_folder = self.dataset_folder
+        run_in_background(find_duplicate_groups, dataset_folder, list(self.image_files),
+                          on_finished=lambda duplicate_of: self._on_near_duplicates_found(dataset_folder, duplicate_of),
+                          on_error=lambda message: self.main_window.statusBar.showMessage(f"Error finding duplicate images: {message}"),
+                          on_progress=lambda done, total: self.main_window.statusBar.showMessage(f"Hashing images: {done}/{total}"))
+
+    def _on_near_duplicates_found(self, dataset_folder, duplicate_of):
+        if dataset_folder != self.dataset_folder:
+            return # Another dataset was loaded meanwhile
+        self.duplicate_of = duplicate_of
+        self.duplicates_ready = True
+        cluster_count = len(set(duplicate_of.values()))
+        self.main_window.statusBar.showMessage(
+            f"Found {len(duplicate_of) - cluster_count} near-duplicate images in {cluster_count} groups.")
+        if self.current_filter in ("Hide Duplicates", "Duplicates Only"):
+            self.apply_filter(self.main_window.filter_combobox.findText(self.current_filter))
+
+    def export_coco_dataset(self):
+        """Exports all images and labels of the dataset to a COCO JSON file in the background."""
+        if not self.dataset_folder:
+            self.main_window.statusBar.showMessage("No dataset loaded.")
+            return
+        output_path, _ = QFileDialog.getSaveFileName(
+            self.main_window,
+            "Export COCO Annotations",
+            os.path.join(self.dataset_folder, "annotations.json"),
+            "COCO JSON (*.json)"
+        )
+        if not output_path:
+            self.main_window.statusBar.showMessage("COCO export cancelled.")
+            return
+
+        self.flush_pending_writes() # Export what is on disk, including the latest saves
+        self.main_window.statusBar.showMessage(f"Exporting {len(self.image_files)} images to COCO...")
+        source = source_for_folder(self.dataset_folder)
+        if isinstance(source, VideoSource):
+            # Frames only exist inside the video, the labelled ones are written out as JPEG files
+            run_in_background(export_video_coco, source, list(self.image_files), self.get_label_filepaths(),
+                              [dict(label) for label in self.labels], output_path,
+                              on_finished=self._on_coco_export_finished,
+                              on_error=lambda message: self.main_window.statusBar.showMessage(f"Error during COCO export: {message}"),
+                              on_progress=lambda done, total: self.main_window.statusBar.showMessage(f"Exporting to COCO: {done}/{total} frames"))
+            return
+        run_in_background(export_coco, self.dataset_folder, list(self.image_files), self.get_label_filepaths(),
+                          [dict(label) for label in self.labels], output_path,
+                          on_finished=self._on_coco_export_finished,
+                          on_error=lambda message: self.main_window.statusBar.showMessage(f"Error during COCO export: {message}"),
+                          on_progress=lambda done, total: self.main_window.statusBar.showMessage(f"Exporting to COCO: {done}/{total} images"))
+
+    def _on_coco_export_finished(self, result):
+        image_count, annotation_count, skipped_images = result
+        message = f"COCO export complete: {image_count} images, {annotation_count} annotations."
+        if skipped_images:
+            message += f" Skipped {len(skipped_images)} images with unreadable headers."
+        self.main_window.statusBar.showMessage(message)
+
+    def create_dataset_split(self):
+        """Links the labelled images into train/val/test folders with a data.yaml, in the background."""
+        if not self.dataset_folder:
+            self.main_window.statusBar.showMessage("No dataset loaded.")
+            return
+        if source_for_folder(self.dataset_folder) is not None:
+            # Links need real files, archived images and video frames only exist inside their source
+            self.main_window.statusBar.showMessage("Splits can only be created for dataset folders. Export to COCO instead.")
+            return
+        output_folder = QFileDialog.getExistingDirectory(self.main_window, "Select Split Output Folder", os.path.dirname(self.dataset_folder))
+        if not output_folder:
+            self.main_window.statusBar.showMessage("Split cancelled.")
+            return
+        if os.path.exists(os.path.join(output_folder, "images")) or os.path.exists(os.path.join(output_folder, "labels")):
+            self.main_window.statusBar.showMessage("The output folder already contains a split. Choose an empty folder.")
+            return
+        ratios_text, ok = QInputDialog.getText(self.main_window, "Create Split", "Train/val/test proportions:", QLineEdit.EchoMode.Normal, DEFAULT_SPLIT_RATIOS)
+        if not ok:
+            self.main_window.statusBar.showMessage("Split cancelled.")
+            return
+        try:
+            ratios = parse_split_ratios(ratios_text)
+        except ValueError as e:
+            self.main_window.statusBar.showMessage(f"Invalid split proportions: {e}")
+            return
+        seed, ok = QInputDialog.getInt(self.main_window, "Create Split", "Random seed:", 0, 0, 2**31 - 1)
+        if not ok:
+            self.main_window.statusBar.showMessage("Split cancelled.")
+            return
+
+        self.flush_pending_writes() # Link the label files as saved, including the latest edits
+        image_paths = [image_path for image_path in self.image_files
+                       if self.image_labelled_status.get(image_path, "unlabelled") != "unlabelled"]
+        if not image_paths:
+            self.main_window.statusBar.showMessage("No labelled images to split.")
+            return
+        label_paths = [self._get_label_filepath(image_path) for image_path in image_paths]
+        self.main_window.statusBar.showMessage(f"Splitting {len(image_paths)} labelled images...")
+        run_in_background(build_split, image_paths, label_paths, [dict(label) for label in self.labels], output_folder, ratios, seed,
+                          on_finished=lambda result: self._on_dataset_split_finished(output_folder, seed, result),
+                          on_error=lambda message: self.main_window.statusBar.showMessage(f"Error creating split: {message}"),
+                          on_progress=lambda done, total: self.main_window.statusBar.showMessage(f"Linking split: {done}/{total} images"))
+
+    def _on_dataset_split_finished(self, output_folder, seed, result):
+        counts, hard_links, symbolic_links, failed_files = result
+        sizes = ", ".join(f"{count} {split_name}" for split_name, count in counts.items())
+        message = f"Split created in {output_folder} (seed {seed}): {sizes}."
+        if symbolic_links:
+            message += f" {symbolic_links} of {hard_links + symbolic_links} files are symbolic links."
+        if failed_files:
+            message += f" Could not link {len(failed_files)} files, e.g. {os.path.basename(failed_files[0])}."
+        self.main_window.statusBar.showMessage(message)
+
+    def import_coco_annotations(self):
+        """Imports a COCO JSON file into the YOLO label files of the loaded dataset."""
+        if not self.dataset_folder:
+            self.main_window.statusBar.showMessage("No dataset loaded.")
+            return
+        coco_path, _ = QFileDialog.getOpenFileName(self.main_window, "Import COCO Annotations", self.dataset_folder, "COCO JSON (*.json)")
+        if coco_path:
+            self._start_annotation_import(import_coco, coco_path)
+        else:
+            self.main_window.statusBar.showMessage("COCO import cancelled.")
+
+    def import_voc_annotations(self):
+        """Imports a folder of Pascal VOC XML files into the YOLO label files of the loaded dataset."""
+        if not self.dataset_folder:
+            self.main_window.statusBar.showMessage("No dataset loaded.")
+            return
+        voc_folder = QFileDialog.getExistingDirectory(self.main_window, "Select Pascal VOC Annotations Folder", self.dataset_folder)
+        if voc_folder:
+            self._start_annotation_import(import_voc, voc_folder)
+        else:
+            self.main_window.statusBar.showMessage("VOC import cancelled.")
+
+    def _start_annotation_import(self, import_function, source_path):
+        if self.class_remap_running:
+            self.main_window.statusBar.showMessage("Label files are already being rewritten, import once that has finished.")
+            return
+        if self._auto_label_pipeline is not None:
+            self.main_window.statusBar.showMessage("Auto-labeling is running, import once it has finished or been stopped.")
+            return
+        self.flush_pending_writes() # Imported files replace label files, so finish queued writes first
+        self.class_remap_running = True # Saves wait until the import has rewritten the label files
+        self.main_window.statusBar.showMessage(f"Importing annotations from {os.path.basename(source_path)}...")
+        run_in_background(import_function, source_path, self.dataset_folder, list(self.image_files),
+                          [dict(label) for label in self.labels],
+                          on_finished=self._on_annotation_import_finished,
+                          on_error=self._on_annotation_import_failed,
+                          on_progress=lambda done, total: self.main_window.statusBar.showMessage(f"Importing annotations: {done} processed"))
+
+    def _on_annotation_import_failed(self, error_message):
+        self.class_remap_running = False
+        self.label_writer.forget() # Some label files may have been replaced
+        self._open_box_store(rebuild=True)
+        self.main_window.statusBar.showMessage(f"Error importing annotations: {error_message}")
+
+    def _on_annotation_import_finished(self, result):
+        imported_images, labels, annotation_count, skipped_images = result
+        self.class_remap_running = False
+        self.label_writer.forget() # Label files were replaced behind the writer's back
+        self._open_box_store(rebuild=True)
+
+        if labels != self.labels:
+            self.labels = labels
+            self.save_labels_to_json()
+            self.load_labels_from_json()
+
+        # One bulk status update instead of one per image
+        for image_path in imported_images:
+            self.image_labelled_status[image_path] = "labelled"
+        self._save_image_statuses()
+        filter_index = self.main_window.filter_combobox.findText(self.current_filter)
+        if filter_index != -1:
+            self.apply_filter(filter_index)
+        if self.current_image_path in imported_images:
+            self.display_image(self.current_image_path)
+        self.dataset_loaded.emit() # Label files changed in bulk, rescan statistics
+
+        message = f"Imported {annotation_count} annotations for {len(imported_images)} images."
+        if skipped_images:
+            message += f" Skipped {len(skipped_images)} images that are not in the dataset."
+        self.main_window.statusBar.showMessage(message)
 
     def display_image(self, image_path):
         if image_path in self.image_visibility and not self.image_visibility[image_path]:
@@ -238,7 +914,7 @@ class DatasetManager(QObject):
             self.current_image_path = None
             return
 
-        pixmap = QPixmap(image_path)
+        pixmap, original_size = self._get_display_pixmap(image_path)
         if pixmap.isNull():
             self.main_window.canvas_label.set_pixmap(QPixmap())
             self.main_window.canvas_label.clear_bounding_boxes()
@@ -246,9 +922,10 @@ class DatasetManager(QObject):
             self.current_image_path = None
             return
 
-        self.main_window.canvas_label.set_pixmap(pixmap)
-        self.main_window.canvas_label.fit_to_width() # Fit image to width after setting pixmap
         self.current_image_path = image_path
+        self.main_window.canvas_label.set_pixmap(pixmap, original_size) # Boxes stay in original pixels
+        self.main_window.canvas_label.fit_to_width() # Fit image to width after setting pixmap
+        self.current_auto_label_boxes = []
         self.main_window.statusBar.showMessage(f"Image dimensions: {self.main_window.canvas_label.original_width}x{self.main_window.canvas_label.original_height}")
         self.has_unsaved_changes = False # No unsaved changes after loading a new image
 
@@ -256,71 +933,147 @@ class DatasetManager(QObject):
         label_filename = os.path.splitext(os.path.basename(image_path))[0] + ".txt"
         label_filepath = os.path.join(self.dataset_folder, label_filename)
 
-        if os.path.exists(label_filepath):
-            try:
-                with open(label_filepath, 'r') as f:
-                    for line in f:
-                        parts = line.strip().split()
-                        if len(parts) >= 5:
-                            class_id = int(parts[0])
-                            center_x = float(parts[1])
-                            center_y = float(parts[2])
-                            width = float(parts[3])
-                            height = float(parts[4])
-
-                            original_width = self.main_window.canvas_label.original_width
-                            original_height = self.main_window.canvas_label.original_height
-
-                            if original_width is None or original_height is None or original_width == 0 or original_height == 0:
-                                self.main_window.statusBar.showMessage("Error: Original image dimensions not available for loading labels.")
-                                loaded_boxes = []
-                                break
-
-                            # Use C++ function for conversion
-                            normalized_box = bbox_utils.NormalizedBoundingBox()
-                            normalized_box.class_id = class_id
-                            normalized_box.center_x = center_x
-                            normalized_box.center_y = center_y
-                            normalized_box.width = width
-                            normalized_box.height = height
-                            
-                            pixel_boxes = bbox_utils.convert_from_yolo_format([normalized_box], original_width, original_height)
-                            if pixel_boxes:
-                                p_box = pixel_boxes[0]
-                                loaded_boxes.append((p_box.class_id, QRectF(p_box.x, p_box.y, p_box.width, p_box.height)))
+        try:
+            normalized_boxes = None # [(class_id, center_x, center_y, width, height), ...], None without a label file
+            if self.box_store is not None and self.box_store.row(label_filepath) is not None:
+                normalized_boxes = self.box_store.read_boxes(label_filepath) # No file system access
+            else:
+                label_text = self.label_writer.read_text(label_filepath) # Queued saves win over the file on disk
+                if label_text is not None:
+                    normalized_boxes = parse_normalized_boxes(label_text)
+            if normalized_boxes is not None:
+                original_width = self.main_window.canvas_label.original_width
+                original_height = self.main_window.canvas_label.original_height
+
+                if original_width is None or original_height is None or original_width == 0 or original_height == 0:
+                    self.main_window.statusBar.showMessage("Error: Original image dimensions not available for loading labels.")
+                    normalized_boxes = []
+
+                yolo_boxes = []
+                for class_id, center_x, center_y, width, height in normalized_boxes:
+                    normalized_box = bbox_utils.NormalizedBoundingBox()
+                    normalized_box.class_id = class_id
+                    normalized_box.center_x = center_x
+                    normalized_box.center_y = center_y
+                    normalized_box.width = width
+                    normalized_box.height = height
+                    yolo_boxes.append(normalized_box)
+
+                # Use C++ function for conversion, one call for all boxes
+                for p_box in bbox_utils.convert_from_yolo_format(yolo_boxes, original_width or 0, original_height or 0):
+                    loaded_boxes.append((p_box.class_id, QRectF(p_box.x, p_box.y, p_box.width, p_box.height)))
                 self.main_window.statusBar.showMessage(f"Labels loaded from {label_filename}. Found {len(loaded_boxes)} boxes.")
                 if loaded_boxes:
                     first_box = loaded_boxes[0][1]
                     self.main_window.statusBar.showMessage(f"First box: x={first_box.x():.2f}, y={first_box.y():.2f}, w={first_box.width():.2f}, h={first_box.height():.2f}")
-            except Exception as e:
-                self.main_window.statusBar.showMessage(f"Error loading labels from {label_filename}: {e}")
+        except Exception as e:
+            self.main_window.statusBar.showMessage(f"Error loading labels from {label_filename}: {e}")
         
         self.image_bounding_boxes[image_path] = loaded_boxes
         self.main_window.canvas_label.set_bounding_boxes(loaded_boxes)
 
         self.main_window.statusBar.showMessage(f"Displaying: {os.path.basename(image_path)}")
         self.current_image_has_bounding_boxes.emit(bool(loaded_boxes)) # Emit signal based on loaded boxes
+        self._prefetch_adjacent_images()
+
+    def _display_width(self):
+        return max(MIN_DISPLAY_DECODE_WIDTH, self.main_window.canvas_label.width())
+
+    def _is_display_pixmap_cached(self, image_path, display_width):
+        return image_cache.contains(("image", image_path)) or image_cache.contains(("display", image_path, display_width))
+
+    def _cache_display_image(self, image_path, display_width, image, original_size):
+        """Caches a decode_for_display result as a pixmap (GUI thread only) and returns it."""
+        pixmap = QPixmap.fromImage(image)
+        if not pixmap.isNull():
+            full_resolution = pixmap.size() == original_size
+            image_cache.put(("image", image_path) if full_resolution else ("display", image_path, display_width), pixmap)
+        return pixmap
+
+    def _get_display_pixmap(self, image_path):
+        """Returns (pixmap, original size) for showing an image, preferring a full resolution decode already cached."""
+        if image_cache.contains(("image", image_path)):
+            pixmap = image_cache.get(("image", image_path))
+            return pixmap, pixmap.size()
+        display_width = self._display_width()
+        if image_cache.contains(("display", image_path, display_width)):
+            return image_cache.get(("display", image_path, display_width)), open_image_reader(image_path).size()
+        image, original_size = decode_for_display(image_path, display_width)
+        return self._cache_display_image(image_path, display_width, image, original_size), original_size
+
+    def load_full_resolution_image(self):
+        """Replaces a reduced-size decode of the current image with its full resolution, decoded in the background."""
+        image_path = self.current_image_path
+        if not image_path:
+            return
+        if image_cache.contains(("image", image_path)):
+            self.main_window.canvas_label.replace_pixmap(image_cache.get(("image", image_path)))
+            return
+        self.main_window.statusBar.showMessage(f"Loading full resolution: {os.path.basename(image_path)}...")
+        run_in_background(lambda path: (path, load_image(path)), image_path, # QImage decodes safely off the GUI thread
+                          on_finished=self._on_full_resolution_image_loaded,
+                          on_error=lambda message: self.main_window.statusBar.showMessage(f"Error loading full resolution: {message}"))
+
+    def _on_full_resolution_image_loaded(self, result):
+        image_path, image = result
+        if image.isNull():
+            return
+        pixmap = QPixmap.fromImage(image)
+        image_cache.put(("image", image_path), pixmap)
+        if image_path == self.current_image_path:
+            self.main_window.canvas_label.replace_pixmap(pixmap)
+            self.main_window.statusBar.showMessage(f"Full resolution loaded: {os.path.basename(image_path)}")
+
+    def _prefetch_adjacent_images(self):
+        """Decodes the previous and next images of the list in the background into the image cache."""
+        image_list = self.main_window.left_panel_list
+        row = image_list.currentRow()
+        display_width = self._display_width()
+        for adjacent_row in (row + 1, row - 1):
+            widget = image_list.itemWidget(image_list.item(adjacent_row)) if 0 <= adjacent_row < image_list.count() else None
+            if not isinstance(widget, ImageListItemWidget):
+                continue
+            image_path = widget.image_path
+            if image_path in self._prefetching or self._is_display_pixmap_cached(image_path, display_width):
+                continue
+            self._prefetching.add(image_path)
+            run_in_background(lambda path, width: (path, width) + decode_for_display(path, width), image_path, display_width,
+                              on_finished=self._on_image_prefetched,
+                              on_error=lambda message, path=image_path: self._prefetching.discard(path))
+
+    def _on_image_prefetched(self, result):
+        image_path, display_width, image, original_size = result
+        self._prefetching.discard(image_path)
+        if not image.isNull() and not self._is_display_pixmap_cached(image_path, display_width):
+            self._cache_display_image(image_path, display_width, image, original_size) # Pixmaps may only be created on the GUI thread
+
+    def set_image_cache_budget(self, budget_mb: int):
+        image_cache.set_budget(budget_mb * 1024 * 1024)
+        self._settings().setValue("image_cache_budget_mb", budget_mb)
+        self.main_window.statusBar.showMessage(f"Image cache budget: {budget_mb} MB")
 
     def import_yolo_model(self):
-        """Opens a file dialog to select a YOLO model file (.pt)."""
+        """Opens a file dialog to select a YOLO model file (.pt, or an already exported .onnx)."""
         model_path, _ = QFileDialog.getOpenFileName(
             self.main_window,
             "Select YOLO Model",
             "", # Start directory
-            "YOLO Models (*.pt)"
+            "YOLO Models (*.pt *.onnx)"
         )
         if model_path:
-            self.yolo_model_path = model_path
-            self.main_window.statusBar.showMessage(f"YOLO model loaded: {os.path.basename(model_path)}")
-            self.yolo_model_loaded_signal.emit(True) # Emit signal that model is loaded
-            # Optionally, load the model here or lazily when auto_label_image is called
-            # For now, just store the path
+            self.set_yolo_model(model_path)
         else:
             self.yolo_model_path = None # Clear model path if selection is cancelled
             self.yolo_model = None # Clear loaded model
+            self._loading_backend_key = None
             self.main_window.statusBar.showMessage("YOLO model selection cancelled.")
             self.yolo_model_loaded_signal.emit(False) # Emit signal that model is not loaded
 
+    def set_yolo_model(self, model_path: str):
+        self.yolo_model_path = model_path
+        self._settings().setValue("last_yolo_model_path", model_path)
+        self._load_inference_backend() # Load and warm up in the background, emits the ready state
+
     def on_image_list_item_changed(self, current_item, previous_item):
         # Always update the bounding boxes from the canvas to the internal dictionary before any checks or saves
         if self.current_image_path:
@@ -376,6 +1129,17 @@ class DatasetManager(QObject):
         # The has_unsaved_changes flag is now managed by save_labels() or explicit discard.
         # No need to reset it here unconditionally.
 
+    def select_image(self, image_path):
+        """Selects an image in the image list, which displays it."""
+        image_list = self.main_window.left_panel_list
+        for row in range(image_list.count()):
+            widget = image_list.itemWidget(image_list.item(row))
+            if isinstance(widget, ImageListItemWidget) and widget.image_path == image_path:
+                image_list.setCurrentRow(row)
+                image_list.scrollToItem(image_list.item(row))
+                return
+        self.main_window.statusBar.showMessage(f"{os.path.basename(image_path)} is hidden by the current filter.")
+
     def on_visibility_changed(self, image_path, is_visible):
         self.image_visibility[image_path] = is_visible
         current_item = self.main_window.left_panel_list.currentItem()
@@ -400,14 +1164,8 @@ class DatasetManager(QObject):
                     if isinstance(loaded_labels, list):
                         self.labels = loaded_labels
                         self._assign_colors_to_labels() # Assign colors to loaded labels
-                        for label in self.labels:
-                            item = QListWidgetItem(label['name'])
-                            item.setData(Qt.ItemDataRole.UserRole, label['id'])
-                            self.main_window.label_list_widget.addItem(item)
+                        self._populate_label_list()
                         self.main_window.statusBar.showMessage(f"Labels loaded from labels.json")
-                        if self.labels:
-                            self.main_window.label_list_widget.setCurrentRow(0)
-                            self.current_label_id = self.labels[0]['id']
                         self.labels_updated.emit(self.labels) # Emit signal after loading labels
                     else:
                         self.main_window.statusBar.showMessage("Error: labels.json content is not a list.")
@@ -418,6 +1176,22 @@ class DatasetManager(QObject):
         else:
             self.main_window.statusBar.showMessage("No labels.json found. Starting with empty labels.")
 
+    def _populate_label_list(self, selected_label_id=None):
+        """Fills the label list from self.labels and selects selected_label_id, or the first label."""
+        label_list_widget = self.main_window.label_list_widget
+        label_list_widget.clear()
+        self.current_label_id = -1
+        selected_row = 0
+        for row, label in enumerate(self.labels):
+            item = QListWidgetItem(label['name'])
+            item.setData(Qt.ItemDataRole.UserRole, label['id'])
+            label_list_widget.addItem(item)
+            if label['id'] == selected_label_id:
+                selected_row = row
+        if self.labels:
+            label_list_widget.setCurrentRow(selected_row)
+            self.current_label_id = self.labels[selected_row]['id']
+
     def save_labels_to_json(self):
         if not self.dataset_folder:
             return
@@ -466,19 +1240,96 @@ class DatasetManager(QObject):
         # No need to update color here, as only name is changed
 
     def delete_label(self, label_id_to_delete, label_name_to_delete, current_item):
-        self.labels = [label for label in self.labels if label['id'] != label_id_to_delete]
-        row = self.main_window.label_list_widget.row(current_item)
-        self.main_window.label_list_widget.takeItem(row)
-        
-        if self.current_label_id == label_id_to_delete:
-            self.current_label_id = -1
-            if self.labels:
-                self.main_window.label_list_widget.setCurrentRow(0)
-                self.current_label_id = self.labels[0]['id']
+        """Deletes a label and removes its boxes from every label file of the dataset."""
+        remaining_labels = [dict(label) for label in self.labels if label['id'] != label_id_to_delete]
+        self._apply_class_mapping({label_id_to_delete: DELETED_CLASS}, remaining_labels, f"Deleted label '{label_name_to_delete}'")
+
+    def merge_labels(self, source_label_id, target_label_id):
+        """Relabels every box of source_label_id as target_label_id and removes the source label."""
+        names = {label['id']: label['name'] for label in self.labels}
+        remaining_labels = [dict(label) for label in self.labels if label['id'] != source_label_id]
+        self._apply_class_mapping({source_label_id: target_label_id}, remaining_labels,
+                                  f"Merged '{names.get(source_label_id)}' into '{names.get(target_label_id)}'")
+
+    def change_label_id(self, label_id, new_label_id):
+        """Gives a label a new class id and rewrites its boxes in every label file."""
+        if any(label['id'] == new_label_id for label in self.labels):
+            self.main_window.statusBar.showMessage(f"Class id {new_label_id} is already used, merge the labels instead.")
+            return
+        labels = [dict(label, id=new_label_id) if label['id'] == label_id else dict(label) for label in self.labels]
+        self._apply_class_mapping({label_id: new_label_id}, labels, f"Changed class id {label_id} to {new_label_id}")
+
+    def compact_label_ids(self):
+        """Renumbers the labels 0..n-1, closing the gaps left by deleted labels."""
+        class_mapping, labels = compact_class_mapping(self.labels)
+        if not class_mapping:
+            self.main_window.statusBar.showMessage("Class ids are already contiguous.")
+            return
+        self._apply_class_mapping(class_mapping, labels, f"Compacted class ids to 0-{len(labels) - 1}")
 
+    def _apply_class_mapping(self, class_mapping, new_labels, description):
+        """Rewrites the class ids of all label files on a worker thread, then switches to new_labels.
+
+        class_mapping maps old class ids to new ones, DELETED_CLASS removes the boxes. labels.json,
+        the label list, the canvas and in-memory boxes are only updated once the files are rewritten.
+        """
+        if self.class_remap_running:
+            self.main_window.statusBar.showMessage("A class update or import is already running.")
+            return
+        if self._auto_label_pipeline is not None:
+            self.main_window.statusBar.showMessage("Auto-labeling is running, update classes once it has finished or been stopped.")
+            return
+        if not self.dataset_folder:
+            self._on_class_remap_finished(class_mapping, new_labels, description, (0, 0, 0, []))
+            return
+        self.flush_pending_writes() # Queued writes must land before their files are rewritten
+        self.class_remap_running = True
+        self.main_window.statusBar.showMessage(f"{description}: rewriting label files...")
+        run_in_background(rewrite_label_classes, self.get_label_filepaths(), class_mapping,
+                          on_finished=lambda result: self._on_class_remap_finished(class_mapping, new_labels, description, result),
+                          on_error=self._on_class_remap_failed,
+                          on_progress=lambda done, total: self.main_window.statusBar.showMessage(f"{description}: {done}/{total} label files"))
+
+    def _on_class_remap_finished(self, class_mapping, new_labels, description, result):
+        files_changed, boxes_remapped, boxes_deleted, failed_files = result
+        self.class_remap_running = False
+        self.label_writer.forget() # Label files were rewritten behind the writer's back
+        self._open_box_store(rebuild=True)
+
+        selected_label_id = class_mapping.get(self.current_label_id, self.current_label_id)
+        self.labels = new_labels
+        self._assign_colors_to_labels() # Updates the canvas labels map
+        self._populate_label_list(selected_label_id)
         self.save_labels_to_json()
-        self.labels_updated.emit(self.labels) # Emit signal after deleting a label
-        self.main_window.statusBar.showMessage(f"Label '{label_name_to_delete}' deleted.")
+
+        # Boxes held in memory, including unsaved edits of the current image, follow the files
+        for image_path, boxes in self.image_bounding_boxes.items():
+            self.image_bounding_boxes[image_path] = remap_class_ids(boxes, class_mapping)
+        if self.current_image_path:
+            canvas_boxes = remap_class_ids(self.main_window.canvas_label.get_bounding_boxes(), class_mapping)
+            self.image_bounding_boxes[self.current_image_path] = canvas_boxes
+            self.main_window.canvas_label.set_bounding_boxes(canvas_boxes)
+            self.current_image_has_bounding_boxes.emit(bool(canvas_boxes))
+        self.current_auto_label_boxes = remap_class_ids(self.current_auto_label_boxes, class_mapping)
+
+        if self.dataset_folder:
+            self.set_label_query(self.main_window.label_query_edit.text()) # Class names may resolve to new ids
+            self.dataset_loaded.emit() # Label files changed in bulk, rescan statistics and the label index
+
+        message = f"{description}: {files_changed} label files updated, {boxes_remapped} boxes relabelled, {boxes_deleted} boxes removed."
+        if failed_files:
+            message += f" {len(failed_files)} files could not be written."
+            QMessageBox.warning(
+                self.main_window,
+                "Class Update Incomplete",
+                f"Could not rewrite {len(failed_files)} label files, for example:\n" + "\n".join(failed_files[:10])
+            )
+        self.main_window.statusBar.showMessage(message)
+
+    def _on_class_remap_failed(self, error_message):
+        self.class_remap_running = False
+        self.label_writer.forget()
+        self.main_window.statusBar.showMessage(f"Error updating classes: {error_message}")
 
     def save_labels(self):
         """Saves labels for the currently displayed image."""
@@ -488,81 +1339,300 @@ class DatasetManager(QObject):
         self.save_labels_for_path(self.current_image_path, status="labelled")
 
     def save_labels_for_path(self, image_path: str, status: str = "labelled"):
-        """Saves labels for a specific image path."""
+        """Saves labels for a specific image path.
+
+        The label file is written by the background LabelWriter; the list status is updated
+        right away and an error is only reported if the write fails.
+        """
         if not self.dataset_folder:
             self.main_window.statusBar.showMessage("No dataset folder loaded.")
             return
+        if self.class_remap_running:
+            self.main_window.statusBar.showMessage("Label files are being rewritten, save again once the class update or import has finished.")
+            self.has_unsaved_changes = True
+            return
 
-        self.main_window.show_loading_cursor()
-        try:
-            image_filename = os.path.basename(image_path)
-            base_name, _ = os.path.splitext(image_filename)
-            label_filename = base_name + ".txt"
-            label_filepath = os.path.join(self.dataset_folder, label_filename)
+        label_filepath = self._get_label_filepath(image_path)
+        label_filename = os.path.basename(label_filepath)
+        bounding_boxes = self.image_bounding_boxes.get(image_path, [])
 
-            bounding_boxes = self.image_bounding_boxes.get(image_path, [])
-            
-            if not bounding_boxes:
-                self.main_window.statusBar.showMessage(f"No bounding boxes to save for {os.path.basename(image_path)}.")
-                if os.path.exists(label_filepath):
-                    try:
-                        os.remove(label_filepath)
-                        self.main_window.statusBar.showMessage(f"Removed empty label file: {label_filename}")
-                        self._update_image_list_item_labelled_status(image_path, "unlabelled")
-                    except OSError as e:
-                        self.main_window.statusBar.showMessage(f"Error removing file {label_filename}: {e}")
-                self.has_unsaved_changes = False # No boxes, so no unsaved changes
-                self.current_image_has_bounding_boxes.emit(False) # No bounding boxes after saving
+        if not bounding_boxes:
+            self.main_window.statusBar.showMessage(f"No bounding boxes to save for {os.path.basename(image_path)}.")
+            self._submit_label_file(label_filepath, None) # Removes the label file if there is one
+            self._update_image_list_item_labelled_status(image_path, "unlabelled")
+            self.has_unsaved_changes = False # No boxes, so no unsaved changes
+            self.current_image_has_bounding_boxes.emit(False) # No bounding boxes after saving
+            return
+
+        original_width = self.main_window.canvas_label.original_width
+        original_height = self.main_window.canvas_label.original_height
+
+        # The canvas only knows the dimensions of the displayed image. For any other image,
+        # read the dimensions from the file header instead of decoding the whole image.
+        if image_path != self.current_image_path or not original_width or not original_height:
+            image_size = open_image_reader(image_path).size()
+            if not image_size.isValid() or image_size.isEmpty():
+                self.main_window.statusBar.showMessage(f"Error: Could not get original image dimensions for {os.path.basename(image_path)} for normalization.")
                 return
+            original_width = image_size.width()
+            original_height = image_size.height()
+
+        pixel_boxes_cpp = []
+        for class_id, rect in bounding_boxes:
+            if rect.width() <= 0 or rect.height() <= 0:
+                continue
+            p_box = bbox_utils.PixelBoundingBox()
+            p_box.class_id = class_id
+            p_box.x = rect.x()
+            p_box.y = rect.y()
+            p_box.width = rect.width()
+            p_box.height = rect.height()
+            pixel_boxes_cpp.append(p_box)
+
+        yolo_boxes = bbox_utils.convert_to_yolo_format(pixel_boxes_cpp, original_width, original_height)
+
+        # Use C++ function to format the YOLO labels into a string
+        yolo_string_content = bbox_utils.format_yolo_labels_to_string(yolo_boxes)
+        self._submit_label_file(label_filepath, yolo_string_content)
+
+        self.main_window.statusBar.showMessage(f"Labels saved to {label_filename}")
+        self._update_image_list_item_labelled_status(image_path, status) # Use the passed status
+        self.has_unsaved_changes = False # Labels are now saved
+
+    def _on_label_file_written(self, label_filepath, old_text, new_text):
+        self.label_file_changed.emit(old_text, new_text)
+        if self._label_index_building:
+            self._label_index_stale = True # The running build may have read the old content
+        elif self.label_index is not None and label_filepath in self._label_index_rows:
+            self.label_index.update(self._label_index_rows[label_filepath], new_text)
+            self._evaluate_label_query() # Takes effect the next time the filter is applied
+
+    def rebuild_label_index(self):
+        """Builds the label index of the loaded dataset on a worker thread."""
+        if not self.dataset_folder:
+            return
+        if self._label_index_building:
+            self._label_index_stale = True
+            return
+        self._label_index_building = True
+        self._label_index_stale = False
+        image_paths = list(self.image_files)
+        label_paths = self.get_label_filepaths()
+        run_in_background(build_label_index, image_paths, label_paths, self.box_store_for_images(),
+                          on_finished=lambda index: self._on_label_index_built(image_paths, label_paths, index),
+                          on_error=self._on_label_index_failed)
+
+    def _on_label_index_built(self, image_paths, label_paths, index):
+        self._label_index_building = False
+        if self._label_index_stale or image_paths != self.image_files:
+            self.rebuild_label_index() # Labels or the image list changed meanwhile
+            return
+        self.label_index = index
+        self._label_index_rows = {label_path: row for row, label_path in enumerate(label_paths)}
+        if self.label_query is not None:
+            self._evaluate_label_query()
+            self.apply_filter(self.main_window.filter_combobox.currentIndex())
+
+    def _on_label_index_failed(self, error_message):
+        self._label_index_building = False
+        self.main_window.statusBar.showMessage(f"Error indexing labels: {error_message}")
+
+    def _evaluate_label_query(self):
+        if self.label_query is None or self.label_index is None:
+            self._label_query_mask = None
+        else:
+            self._label_query_mask = self.label_index.query(self.label_query)
 
-            # Need to get original dimensions for the image being saved, not necessarily the currently displayed one
-            # This assumes original_width/height are properties of the image itself, not just the canvas
-            # For now, we'll use the canvas's dimensions, but this might need refinement if images have different sizes
-            original_width = self.main_window.canvas_label.original_width
-            original_height = self.main_window.canvas_label.original_height
-
-            # If the image being saved is not the current one, we might not have its dimensions readily available
-            # A more robust solution would store dimensions per image in image_bounding_boxes or a separate dict
-            if image_path != self.current_image_path or original_width is None or original_height is None or original_width == 0 or original_height == 0:
-                # Attempt to load dimensions if not current image or dimensions are missing
-                temp_pixmap = QPixmap(image_path)
-                if not temp_pixmap.isNull():
-                    original_width = temp_pixmap.width()
-                    original_height = temp_pixmap.height()
-                else:
-                    self.main_window.statusBar.showMessage(f"Error: Could not get original image dimensions for {os.path.basename(image_path)} for normalization.")
-                    return
+    def set_label_query(self, text: str):
+        """Parses the query box text and re-applies the image list filter with it."""
+        try:
+            self.label_query = parse_label_query(text, self.labels)
+        except ValueError as e:
+            self.main_window.statusBar.showMessage(f"Invalid query: {e}")
+            return
+        self._evaluate_label_query()
+        self.apply_filter(self.main_window.filter_combobox.currentIndex())
+
+    def _on_label_file_write_failed(self, label_filepath, error_message):
+        if self.current_image_path and self._get_label_filepath(self.current_image_path) == label_filepath:
+            self.has_unsaved_changes = True # Let the user retry saving the current image
+        self.main_window.statusBar.showMessage(f"Error saving {os.path.basename(label_filepath)}: {error_message}")
+        QMessageBox.warning(
+            self.main_window,
+            "Save Failed",
+            f"Could not write '{label_filepath}':\n{error_message}"
+        )
 
+    def flush_pending_writes(self):
+        """Blocks until all queued label and status writes are on disk. Called on close."""
+        self._status_save_timer.stop()
+        self.label_writer.flush()
+        self._sync_box_store()
+
+    def _submit_label_file(self, label_filepath, label_text):
+        """Queues a label file write (None removes the file) and mirrors it in the box store."""
+        self.label_writer.submit(label_filepath, label_text)
+        if self.box_store is not None:
+            if self.box_store.update(label_filepath, label_text):
+                self._box_store_sync_timer.start()
+        elif self._box_store_building:
+            self._box_store_stale = True # The running build may have read the old content
+
+    def set_box_store_enabled(self, enabled: bool):
+        """Turns the box store of the loaded dataset (and of datasets opened later) on or off."""
+        self.use_box_store = enabled
+        self._settings().setValue("use_box_store", enabled)
+        if enabled:
+            self._open_box_store()
+            return
+        self._close_box_store()
+        if self.dataset_folder:
+            for file_name in (BOX_STORE_FILENAME, BOX_STORE_FILENAME + BOX_STORE_JOURNAL_SUFFIX):
+                try:
+                    os.remove(os.path.join(self.dataset_folder, file_name)) # It would no longer follow saves
+                except OSError:
+                    pass
+        self.main_window.statusBar.showMessage("Box store disabled, labels are read from the label files.")
+
+    def _open_box_store(self, rebuild=False, build_if_unusable=True):
+        """Maps the box store of the loaded dataset, building it in the background if it is missing,
+        damaged, does not cover every image, or rebuild is set because label files changed in bulk."""
+        self._close_box_store()
+        if not self.use_box_store or not self.dataset_folder:
+            return
+        store_path = os.path.join(self.dataset_folder, BOX_STORE_FILENAME)
+        if not rebuild and os.path.exists(store_path):
+            try:
+                store = BoxStore(store_path).open()
+            except (OSError, ValueError) as e:
+                self.main_window.statusBar.showMessage(f"Rebuilding box store: {e}")
+            else:
+                rows = store.rows(self.get_label_filepaths())
+                if rows is not None:
+                    self.box_store = store
+                    self._box_store_rows = rows
+                    return
+                store.close() # Images were added since it was built
+        if build_if_unusable:
+            self._build_box_store()
 
-            with open(label_filepath, 'w') as f:
-                pixel_boxes_cpp = []
-                for class_id, rect in bounding_boxes:
-                    if rect.width() <= 0 or rect.height() <= 0:
-                        continue
-                    p_box = bbox_utils.PixelBoundingBox()
-                    p_box.class_id = class_id
-                    p_box.x = rect.x()
-                    p_box.y = rect.y()
-                    p_box.width = rect.width()
-                    p_box.height = rect.height()
-                    pixel_boxes_cpp.append(p_box)
-
-                yolo_boxes = bbox_utils.convert_to_yolo_format(pixel_boxes_cpp, original_width, original_height)
-                
-                # Use C++ function to format the YOLO labels into a string
-                yolo_string_content = bbox_utils.format_yolo_labels_to_string(yolo_boxes)
-                f.write(yolo_string_content)
-                
-            self.main_window.statusBar.showMessage(f"Labels saved to {label_filename}")
-            self._update_image_list_item_labelled_status(image_path, status) # Use the passed status
-            self.has_unsaved_changes = False # Labels are now saved
-            self._save_image_statuses() # Save statuses after updating
-        except IOError as e:
-            self.main_window.statusBar.showMessage(f"Error saving labels to {label_filename}: {e}")
-        except Exception as e:
-            self.main_window.statusBar.showMessage(f"An unexpected error occurred: {e}")
-        finally:
-            self.main_window.hide_loading_cursor()
+    def _build_box_store(self):
+        if self._box_store_building:
+            self._box_store_stale = True
+            return
+        self._box_store_building = True
+        self._box_store_stale = False
+        dataset_folder = self.dataset_folder
+        self.main_window.statusBar.showMessage(f"Building box store for {len(self.image_files)} images...")
+        run_in_background(build_box_store, list(self.image_files), self.get_label_filepaths(),
+                          os.path.join(dataset_folder, BOX_STORE_FILENAME),
+                          on_finished=lambda box_count: self._on_box_store_built(dataset_folder, box_count),
+                          on_error=self._on_box_store_failed)
+
+    def _on_box_store_built(self, dataset_folder, box_count):
+        self._box_store_building = False
+        if not self.use_box_store or not self.dataset_folder:
+            return
+        if self._box_store_stale:
+            # Labels changed meanwhile, or another dataset was loaded and is waiting for its own build
+            self._open_box_store(rebuild=dataset_folder == self.dataset_folder)
+            return
+        if dataset_folder != self.dataset_folder:
+            return
+        self._open_box_store(build_if_unusable=False)
+        if self.box_store is not None:
+            self.main_window.statusBar.showMessage(f"Box store ready: {box_count} boxes of {len(self.image_files)} images.")
+
+    def _on_box_store_failed(self, error_message):
+        self._box_store_building = False
+        self.main_window.statusBar.showMessage(f"Error building box store: {error_message}")
+
+    def _close_box_store(self):
+        self._box_store_sync_timer.stop()
+        if self.box_store is not None:
+            self.box_store.close()
+        self.box_store = None
+        self._box_store_rows = []
+
+    def _sync_box_store(self):
+        """Writes the journal of the saves mirrored in the box store, blocking."""
+        if self.box_store is not None:
+            self._box_store_sync_timer.stop()
+            try:
+                self.box_store.sync()
+            except OSError as e:
+                self.main_window.statusBar.showMessage(f"Error updating box store: {e}")
+
+    def _sync_box_store_in_background(self):
+        """Journals the saves mirrored in the box store, or merges them into a new store file once there are many."""
+        store = self.box_store
+        if store is None or not store.journal_outdated:
+            return
+        if self._box_store_syncing:
+            self._box_store_sync_timer.start() # Try again once the running write is done
+            return
+        self._box_store_syncing = True
+        if store.pending_update_count() < BOX_STORE_MERGE_UPDATES:
+            run_in_background(store.write_journal, *store.journal_snapshot(),
+                              on_finished=lambda _: self._on_box_store_journal_written(store),
+                              on_error=self._on_box_store_sync_failed)
+            return
+        generation = store.generation
+        rows, label_texts = store.take_pending_updates()
+        run_in_background(store.write_updates, rows, label_texts,
+                          on_finished=lambda temp_path: self._on_box_store_synced(store, generation, temp_path, rows, label_texts),
+                          on_error=self._on_box_store_sync_failed)
+
+    def _on_box_store_journal_written(self, store):
+        self._box_store_syncing = False
+        if store is self.box_store and store.journal_outdated:
+            self._box_store_sync_timer.start()
+
+    def _on_box_store_synced(self, store, generation, temp_path, rows, label_texts):
+        self._box_store_syncing = False
+        if store is not self.box_store or store.generation != generation:
+            os.remove(temp_path) # Closed, or the file was replaced meanwhile
+            return
+        try:
+            store.replace_file(temp_path, rows, label_texts)
+            store.sync() # Saves made during the merge, journaled against the new file
+        except (OSError, ValueError) as e:
+            self.main_window.statusBar.showMessage(f"Error updating box store: {e}")
+
+    def _on_box_store_sync_failed(self, error_message):
+        self._box_store_syncing = False
+        self.main_window.statusBar.showMessage(f"Error updating box store: {error_message}")
+
+    def box_store_for_images(self):
+        """Returns (box store buffer, row of every image of image_files, updated rows, their label texts) for
+        reading labels without opening label files, or None if the box store is off or not ready. The updates
+        are saves not in the file yet, to pass as updated_rows/updated_texts to the bbox_utils box store readers."""
+        if self.box_store is None:
+            return None
+        return (self.box_store.buffer, self._box_store_rows) + tuple(self.box_store.take_pending_updates())
+
+    def export_box_store_labels(self):
+        """Writes the labels of the box store as YOLO .txt files into a folder, in the background."""
+        if self.box_store is None:
+            self.main_window.statusBar.showMessage("Enable the box store first.")
+            return
+        output_folder = QFileDialog.getExistingDirectory(self.main_window, "Export Labels as YOLO TXT", self.dataset_folder)
+        if not output_folder:
+            self.main_window.statusBar.showMessage("Label export cancelled.")
+            return
+        if os.path.abspath(output_folder) == os.path.abspath(self.dataset_folder):
+            # The export would rewrite the live label files from a snapshot, overwriting saves made meanwhile
+            self.main_window.statusBar.showMessage("Choose a folder other than the dataset folder to export labels to.")
+            return
+        buffer, rows, updated_rows, updated_texts = self.box_store_for_images()
+        label_paths = [os.path.join(output_folder, os.path.basename(label_path)) for label_path in self.get_label_filepaths()]
+        self.main_window.statusBar.showMessage(f"Exporting labels of {len(rows)} images...")
+        run_in_background(bbox_utils.export_box_store_labels, buffer, rows, label_paths,
+                          updated_rows=updated_rows, updated_texts=updated_texts,
+                          on_finished=lambda failed_files: self.main_window.statusBar.showMessage(
+                              f"Labels exported to {output_folder}." if not failed_files else
+                              f"Labels exported to {output_folder}, {len(failed_files)} files could not be written."),
+                          on_error=lambda message: self.main_window.statusBar.showMessage(f"Error exporting labels: {message}"))
 
     def clear_labels(self):
         if self.current_image_path and self.current_image_path in self.image_bounding_boxes:
@@ -570,28 +1640,14 @@ class DatasetManager(QObject):
             self.main_window.canvas_label.clear_bounding_boxes()
             self.main_window.statusBar.showMessage("Bounding boxes cleared for current image.")
             self.current_image_has_bounding_boxes.emit(False) # No bounding boxes after clearing
-            
-            self.main_window.show_loading_cursor()
-            try:
-                # Also delete the corresponding label file
-                image_filename = os.path.basename(self.current_image_path)
-                base_name, _ = os.path.splitext(image_filename)
-                label_filename = base_name + ".txt"
-                label_filepath = os.path.join(self.dataset_folder, label_filename)
-                if os.path.exists(label_filepath):
-                    try:
-                        os.remove(label_filepath)
-                        self.main_window.statusBar.showMessage(f"Removed label file: {label_filename}")
-                        self.has_unsaved_changes = False # No unsaved changes after deleting the file
-                    except OSError as e:
-                        self.main_window.statusBar.showMessage(f"Error removing label file {label_filename}: {e}")
-                        self.has_unsaved_changes = True # If deletion failed, still consider it as having unsaved changes (e.g., if user wants to retry saving)
-                else:
-                    self.has_unsaved_changes = False # No label file existed, so no unsaved changes after clearing
 
-                self._update_image_list_item_labelled_status(self.current_image_path, "unlabelled")
-            finally:
-                self.main_window.hide_loading_cursor()
+            # Also delete the corresponding label file (in the background)
+            label_filepath = self._get_label_filepath(self.current_image_path)
+            self._submit_label_file(label_filepath, None)
+            self.has_unsaved_changes = False # Deletion failures are reported by _on_label_file_write_failed
+            self.main_window.statusBar.showMessage(f"Removed label file: {os.path.basename(label_filepath)}")
+
+            self._update_image_list_item_labelled_status(self.current_image_path, "unlabelled")
         else:
             self.main_window.statusBar.showMessage("No image selected or no bounding boxes to clear.")
 
@@ -613,9 +1669,51 @@ class DatasetManager(QObject):
             self.main_window.ui_manager.main_window.canvas_label.set_current_class_id(-1)
             self.main_window.statusBar.showMessage("No label selected.")
 
+    def save_labels_for_paths(self, image_paths, status: str = "labelled"):
+        """Saves the labels of many images at once.
+
+        The label files of all images are converted and formatted in one bbox_utils.format_yolo_label_texts
+        call on native threads, and statuses are updated in one pass. Images without boxes get their label
+        file removed and become unlabelled, like with save_labels_for_path.
+        """
+        if self.class_remap_running:
+            self.main_window.statusBar.showMessage("Label files are being rewritten, save again once the class update or import has finished.")
+            return
+        saved_paths, pixel_boxes_per_image, image_widths, image_heights = [], [], [], []
+        empty_paths = []
+        for image_path in image_paths:
+            pixel_boxes = _to_pixel_boxes(box for box in self.image_bounding_boxes.get(image_path, []) if box[1].width() > 0 and box[1].height() > 0)
+            if not pixel_boxes:
+                self._submit_label_file(self._get_label_filepath(image_path), None) # Removes the label file if there is one
+                empty_paths.append(image_path)
+                continue
+            if image_path == self.current_image_path and self.main_window.canvas_label.original_width:
+                width, height = self.main_window.canvas_label.original_width, self.main_window.canvas_label.original_height
+            else:
+                image_size = open_image_reader(image_path).size() # Header only, the image is not decoded
+                if not image_size.isValid() or image_size.isEmpty():
+                    self.main_window.statusBar.showMessage(f"Error: Could not get original image dimensions for {os.path.basename(image_path)} for normalization.")
+                    continue
+                width, height = image_size.width(), image_size.height()
+            saved_paths.append(image_path)
+            pixel_boxes_per_image.append(pixel_boxes)
+            image_widths.append(width)
+            image_heights.append(height)
+
+        label_texts = bbox_utils.format_yolo_label_texts(pixel_boxes_per_image, image_widths, image_heights)
+        for image_path, label_text in zip(saved_paths, label_texts):
+            self._submit_label_file(self._get_label_filepath(image_path), label_text)
+        if saved_paths:
+            self.set_image_statuses(saved_paths, status)
+        if empty_paths:
+            self.set_image_statuses(empty_paths, "unlabelled")
+        if self.current_image_path in saved_paths or self.current_image_path in empty_paths:
+            self.has_unsaved_changes = False
+
     def _update_image_list_item_labelled_status(self, image_path: str, status: str):
+        previous_status = self.image_labelled_status.get(image_path, "unlabelled")
         self.image_labelled_status[image_path] = status # Update internal status
-        self._save_image_statuses() # Save statuses immediately after update
+        self._status_save_timer.start() # Save statuses shortly, coalescing bursts of updates
         for i in range(self.main_window.left_panel_list.count()):
             item = self.main_window.left_panel_list.item(i)
             widget = self.main_window.left_panel_list.itemWidget(item)
@@ -623,10 +1721,42 @@ class DatasetManager(QObject):
                 widget.set_labelled_status(status)
                 break
         
-        # Re-apply the current filter to update the list display
-        filter_index = self.main_window.filter_combobox.findText(self.current_filter)
-        if filter_index != -1:
-            self.apply_filter(filter_index)
+        # Re-apply the current filter only if the change can affect which images it shows
+        if self.current_filter != "All" and previous_status != status:
+            filter_index = self.main_window.filter_combobox.findText(self.current_filter)
+            if filter_index != -1:
+                self.apply_filter(filter_index)
+                return
+        self.image_statuses_changed.emit()
+
+    def set_image_statuses(self, image_paths, status: str):
+        """Sets the status of many images in one batch: one status file write and at most one filter pass."""
+        image_paths = set(image_paths)
+        changed = any(self.image_labelled_status.get(image_path, "unlabelled") != status for image_path in image_paths)
+        for image_path in image_paths:
+            self.image_labelled_status[image_path] = status
+        self._status_save_timer.start()
+        image_list = self.main_window.left_panel_list
+        for row in range(image_list.count()):
+            widget = image_list.itemWidget(image_list.item(row))
+            if isinstance(widget, ImageListItemWidget) and widget.image_path in image_paths:
+                widget.set_labelled_status(status)
+        if self.current_filter != "All" and changed:
+            self.apply_filter(self.main_window.filter_combobox.currentIndex())
+        else:
+            self.image_statuses_changed.emit() # Statuses shown elsewhere changed
+
+    def reject_labels(self, image_paths):
+        """Removes the label files of many images and marks them unlabelled, e.g. rejected auto-labels."""
+        for image_path in image_paths:
+            self._submit_label_file(self._get_label_filepath(image_path), None)
+            self.image_bounding_boxes[image_path] = []
+            if image_path == self.current_image_path:
+                self.main_window.canvas_label.clear_bounding_boxes()
+                self.current_image_has_bounding_boxes.emit(False)
+                self.has_unsaved_changes = False
+        self.set_image_statuses(image_paths, "unlabelled")
+        self.main_window.statusBar.showMessage(f"Rejected the labels of {len(image_paths)} images.")
 
     def apply_filter(self, index: int):
         """Applies a filter to the image list based on the selected index."""
@@ -641,7 +1771,8 @@ class DatasetManager(QObject):
         self.main_window.left_panel_list.clear()
         
         filtered_image_paths = []
-        for image_path in self.image_files:
+        query_mask = self._label_query_mask if self.label_query is not None else None
+        for row, image_path in enumerate(self.image_files):
             should_be_visible = False
             current_status = self.image_labelled_status.get(image_path, "unlabelled")
 
@@ -653,6 +1784,13 @@ class DatasetManager(QObject):
                 should_be_visible = current_status == "unlabelled"
             elif filter_type == "Auto-labelled":
                 should_be_visible = current_status == "auto-labelled"
+            elif filter_type == "Hide Duplicates":
+                # Collapse every near-duplicate cluster to its first image
+                should_be_visible = self.duplicate_of.get(image_path, image_path) == image_path
+            elif filter_type == "Duplicates Only":
+                should_be_visible = image_path in self.duplicate_of
+            if should_be_visible and query_mask is not None:
+                should_be_visible = bool(query_mask[row]) # Query box predicates, evaluated natively on the label index
             
             self.image_visibility[image_path] = should_be_visible
 
@@ -678,8 +1816,7 @@ class DatasetManager(QObject):
                     item = self.main_window.left_panel_list.item(i)
                     widget = self.main_window.left_panel_list.itemWidget(item)
                     if isinstance(widget, ImageListItemWidget) and widget.image_path == self.current_image_path:
-                        self.main_window.left_panel_list.setCurrentItem(item)
-                        self.display_image(self.current_image_path)
+                        self.main_window.left_panel_list.setCurrentItem(item) # The canvas keeps the image and its unsaved edits
                         break
                 else: # If current image not found in new list, select the first one
                     self.main_window.left_panel_list.setCurrentRow(0)
@@ -701,3 +1838,8 @@ class DatasetManager(QObject):
         self.main_window.left_panel_list.currentItemChanged.connect(self.on_image_list_item_changed)
 
         self.main_window.statusBar.showMessage(f"Filter applied: {filter_type}. Displaying {len(filtered_image_paths)} images.")
+        if self.label_query is not None and query_mask is None:
+            self.main_window.statusBar.showMessage(f"Filter applied: {filter_type}. Still indexing labels, the query is not applied yet.")
+        if filter_type in ("Hide Duplicates", "Duplicates Only") and not self.duplicates_ready:
+            self.main_window.statusBar.showMessage(f"Filter applied: {filter_type}. Still hashing images, duplicates are not known yet.")
+        self.image_list_filtered.emit()
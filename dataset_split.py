@@ -0,0 +1,98 @@
+import os
+import json
+import random
+from collections import Counter
+
+import bbox_utils # Import the C++ module
+
+SPLIT_NAMES = ("train", "val", "test")
+DEFAULT_SPLIT_RATIOS = "80/10/10" # Train/val/test percentages offered in the split dialog
+
+def parse_split_ratios(text):
+    """Parses "80/10/10" (or "0.8 0.1 0.1") into three fractions summing to 1. Raises ValueError."""
+    parts = text.replace(",", "/").replace(" ", "/").split("/")
+    try:
+        values = [float(part) for part in parts if part]
+    except ValueError:
+        values = []
+    if len(values) == 2:
+        values.append(0.0)
+    if len(values) != len(SPLIT_NAMES) or any(value < 0 for value in values) or sum(values) <= 0 or values[0] <= 0:
+        raise ValueError(f"Expected train/val/test proportions like {DEFAULT_SPLIT_RATIOS}")
+    total = sum(values)
+    return [value / total for value in values]
+
+def stratified_split(class_sets, ratios, seed):
+    """Returns the split index of every image, keeping each class's images in proportion across splits.
+
+    Multi-label iterative stratification: images are visited from the rarest class they contain to
+    the most common one (in a seeded random order within a class) and each goes to the split that
+    still lacks the most images of that class. Images without boxes are spread by total demand.
+    The same class sets, ratios and seed always give the same split.
+    """
+    rng = random.Random(seed)
+    order = list(range(len(class_sets)))
+    rng.shuffle(order)
+    class_counts = Counter(class_id for classes in class_sets for class_id in classes)
+    rarest = [min(classes, key=class_counts.__getitem__) if classes else None for classes in class_sets]
+    order.sort(key=lambda i: class_counts[rarest[i]] if rarest[i] is not None else len(class_sets) + 1) # Stable, keeps the shuffle within ties
+
+    splits = [split for split, ratio in enumerate(ratios) if ratio > 0]
+    class_demand = {class_id: [count * ratio for ratio in ratios] for class_id, count in class_counts.items()}
+    split_demand = [len(class_sets) * ratio for ratio in ratios]
+    assignment = [0] * len(class_sets)
+    for i in order:
+        demand = class_demand[rarest[i]] if rarest[i] is not None else split_demand
+        best = splits[0]
+        for split in splits[1:]:
+            if demand[split] > demand[best] or (demand[split] == demand[best] and split_demand[split] > split_demand[best]):
+                best = split
+        assignment[i] = best
+        split_demand[best] -= 1
+        for class_id in class_sets[i]:
+            class_demand[class_id][best] -= 1
+    return assignment
+
+def write_data_yaml(output_folder, labels, split_names):
+    """Writes the YOLO data.yaml of a split folder, with class names from labels.json."""
+    lines = ["# Generated from labels.json", f"path: {json.dumps(os.path.abspath(output_folder))}"]
+    for split_name in split_names:
+        lines.append(f"{split_name}: images/{split_name}")
+    lines.append("names:")
+    for label in sorted(labels, key=lambda label: label['id']):
+        lines.append(f"  {label['id']}: {json.dumps(label['name'])}") # JSON strings are valid YAML scalars
+    with open(os.path.join(output_folder, "data.yaml"), 'w') as f:
+        f.write("\n".join(lines) + "\n")
+
+def build_split(image_paths, label_paths, labels, output_folder, ratios, seed, prefer_symlinks=False, progress_callback=None):
+    """Worker function: splits images into train/val/test and materializes them as links in output_folder.
+
+    Creates the YOLO layout images/<split>/ and labels/<split>/ with hard links (symbolic links
+    across file systems, or if prefer_symlinks) to the dataset files, and data.yaml. Class sets
+    are read natively. Returns ({split name: image count}, hard links, symbolic links, failed files).
+    """
+    class_sets = bbox_utils.read_label_class_sets(label_paths)
+    assignment = stratified_split(class_sets, ratios, seed)
+    if progress_callback:
+        progress_callback(0, len(image_paths))
+
+    split_names = [name for name, ratio in zip(SPLIT_NAMES, ratios) if ratio > 0]
+    for split_name in split_names:
+        os.makedirs(os.path.join(output_folder, "images", split_name), exist_ok=True)
+        os.makedirs(os.path.join(output_folder, "labels", split_name), exist_ok=True)
+    sources, targets = [], []
+    counts = Counter()
+    for image_path, label_path, classes, split in zip(image_paths, label_paths, class_sets, assignment):
+        split_name = SPLIT_NAMES[split]
+        counts[split_name] += 1
+        sources.append(image_path)
+        targets.append(os.path.join(output_folder, "images", split_name, os.path.basename(image_path)))
+        if classes or os.path.exists(label_path):
+            sources.append(label_path)
+            targets.append(os.path.join(output_folder, "labels", split_name, os.path.basename(label_path)))
+
+    result = bbox_utils.link_files(sources, targets, prefer_symlinks)
+    write_data_yaml(output_folder, labels, split_names)
+    if progress_callback:
+        progress_callback(len(image_paths), len(image_paths))
+    return {name: counts[name] for name in split_names}, result.hard_links, result.symbolic_links, result.failed_files
@@ -0,0 +1,176 @@
+import os
+import time
+import threading
+import weakref
+from collections import deque
+from contextlib import nullcontext
+from concurrent.futures import ThreadPoolExecutor
+
+from archive_source import load_image
+from inference_backends import predict_tiled, image_to_rgb_array
+
+DECODE_WORKERS = max(1, min(4, (os.cpu_count() or 1))) # Threads decoding images ahead of the detector
+INFERENCE_WORKERS = 2 # Batches run concurrently on backends that are thread-safe
+BATCHES_IN_FLIGHT = 2 # Batches queued per inference worker, bounds the decoded images held in memory
+
+_serial_locks = weakref.WeakKeyDictionary() # {backend: lock}, serializes backends that are not thread-safe
+
+class StageMetrics:
+    """Busy time of the stages of a pipeline, to show which stage limits its throughput.
+
+    A stage's utilization is its busy time divided by the wall time its workers were available:
+    a stage near 100% is the bottleneck, stages well below it spend their time waiting on others.
+    May be updated from several threads.
+    """
+
+    def __init__(self, stages=()):
+        """stages lists the stage names in pipeline order, for the summary."""
+        self._lock = threading.Lock()
+        self._started = time.perf_counter()
+        self._busy = dict.fromkeys(stages, 0.0) # {stage: seconds}
+        self._workers = dict.fromkeys(stages, 1) # {stage: number of threads running it}
+        self._items = dict.fromkeys(stages, 0) # {stage: images processed}
+
+    def set_workers(self, stage, worker_count):
+        with self._lock:
+            self._workers[stage] = worker_count
+            self._busy.setdefault(stage, 0.0)
+            self._items.setdefault(stage, 0)
+
+    def add(self, stage, seconds, items=1):
+        with self._lock:
+            self._busy[stage] = self._busy.get(stage, 0.0) + seconds
+            self._items[stage] = self._items.get(stage, 0) + items
+
+    def elapsed(self):
+        return time.perf_counter() - self._started
+
+    def utilization(self):
+        """Returns {stage: fraction of its workers' time spent busy}, in pipeline order."""
+        elapsed = max(self.elapsed(), 1e-9)
+        with self._lock:
+            return {stage: min(1.0, busy / (elapsed * self._workers.get(stage, 1))) for stage, busy in self._busy.items()}
+
+    def summary(self):
+        """Returns e.g. "decode 41%, inference 97%, post-process 3%, write 5% (bottleneck: inference)"."""
+        utilization = self.utilization()
+        if not utilization:
+            return ""
+        stages = ", ".join(f"{stage} {fraction:.0%}" for stage, fraction in utilization.items())
+        bottleneck = max(utilization, key=utilization.get)
+        if utilization[bottleneck] < 0.5:
+            return stages # Every stage mostly waited, e.g. on cached results or the GUI thread
+        return f"{stages} (bottleneck: {bottleneck})"
+
+def _backend_lock(backend):
+    lock = _serial_locks.get(backend)
+    if lock is None:
+        lock = _serial_locks.setdefault(backend, threading.Lock())
+    return lock
+
+class DetectionScheduler:
+    """Runs a DetectorBackend over many images: cache lookups, decoding, batching and parallel calls.
+
+    Images already seen by the same model (same cache_key and tile settings) are answered from
+    the inference cache. The others are decoded on a thread pool ahead of the detector and sent
+    in batches of the backend's max_batch_size; batches run concurrently only if the backend is
+    thread_safe. Any backend gets the same treatment, built-in or plugin.
+    """
+
+    def __init__(self, backend, inference_cache=None, tile_size=0, tile_overlap=0.2, metrics=None):
+        self.backend = backend
+        self.metrics = metrics # Optional StageMetrics, records the "decode" and "inference" stages
+        self.inference_cache = inference_cache
+        self.tile_size = tile_size
+        self.tile_overlap = tile_overlap
+        self.model_key = backend.cache_key()
+        if tile_size > 0:
+            self.model_key += f":tiles{tile_size}/{tile_overlap:.2f}" # Tiled runs give different detections
+
+    def cached_detections(self, image_path):
+        """Returns the cached raw detections of an image, or None if this model never ran on it."""
+        if self.inference_cache is None:
+            return None
+        return self.inference_cache.get(self.model_key, self.inference_cache.image_digest(image_path))
+
+    def detect(self, image_paths):
+        """Yields (image path, raw detections or None, error message or None) for every image, in order.
+
+        Raw detections are [[x1, y1, x2, y2, conf, class_id], ...] in original image pixels. A
+        failing image or batch is reported through the error message and does not stop the run.
+        """
+        batch_size = 1 if self.tile_size > 0 else max(1, int(self.backend.max_batch_size))
+        inference_workers = INFERENCE_WORKERS if self.backend.thread_safe else 1
+        batches = deque()
+        if self.metrics is not None:
+            self.metrics.set_workers("decode", DECODE_WORKERS)
+            self.metrics.set_workers("inference", inference_workers)
+        with ThreadPoolExecutor(DECODE_WORKERS) as decoders, ThreadPoolExecutor(inference_workers) as runners:
+            for start in range(0, len(image_paths), batch_size):
+                batch_paths = image_paths[start:start + batch_size]
+                prepared = [decoders.submit(self._prepare, image_path) for image_path in batch_paths]
+                batches.append(runners.submit(self._run_batch, batch_paths, prepared))
+                while len(batches) > inference_workers * BATCHES_IN_FLIGHT:
+                    yield from batches.popleft().result()
+            while batches:
+                yield from batches.popleft().result()
+
+    def _prepare(self, image_path):
+        """Decoder thread: returns (image digest, cached detections or None, RGB array or None)."""
+        started = time.perf_counter()
+        try:
+            return self._decode(image_path)
+        finally:
+            if self.metrics is not None:
+                self.metrics.add("decode", time.perf_counter() - started)
+
+    def _decode(self, image_path):
+        image_digest = None
+        if self.inference_cache is not None:
+            image_digest = self.inference_cache.image_digest(image_path)
+            raw_boxes_data = self.inference_cache.get(self.model_key, image_digest)
+            if raw_boxes_data is not None:
+                return image_digest, raw_boxes_data, None
+        if self.tile_size > 0:
+            return image_digest, None, None # predict_tiled decodes and crops the image itself
+        image = load_image(image_path)
+        if image.isNull():
+            raise ValueError(f"Could not decode {os.path.basename(image_path)}")
+        return image_digest, None, image_to_rgb_array(image)
+
+    def _run_batch(self, image_paths, prepared):
+        """Inference thread: runs the detector on the images of a batch that were not cached."""
+        results = {}
+        misses = [] # [(image path, image digest, RGB array or None), ...]
+        for image_path, future in zip(image_paths, prepared):
+            try:
+                image_digest, raw_boxes_data, image = future.result()
+            except Exception as e:
+                results[image_path] = (None, str(e))
+                continue
+            if raw_boxes_data is not None:
+                results[image_path] = (raw_boxes_data, None)
+            else:
+                misses.append((image_path, image_digest, image))
+
+        if misses:
+            lock = nullcontext() if self.backend.thread_safe else _backend_lock(self.backend)
+            try:
+                with lock:
+                    started = time.perf_counter() # Time spent waiting for the lock is not inference
+                    if self.tile_size > 0:
+                        detections = [predict_tiled(self.backend, image_path, self.tile_size, self.tile_overlap) for image_path, _, _ in misses]
+                    else:
+                        detections = [boxes.tolist() for boxes in self.backend.predict_batch([image for _, _, image in misses])]
+                    if self.metrics is not None:
+                        self.metrics.add("inference", time.perf_counter() - started, len(misses))
+            except Exception as e:
+                detections = None
+                for image_path, _, _ in misses:
+                    results[image_path] = (None, str(e))
+            if detections is not None:
+                for (image_path, image_digest, _), raw_boxes_data in zip(misses, detections):
+                    if self.inference_cache is not None:
+                        self.inference_cache.put(self.model_key, image_digest, raw_boxes_data)
+                    results[image_path] = (raw_boxes_data, None)
+        return [(image_path,) + results[image_path] for image_path in image_paths]
@@ -0,0 +1,105 @@
+import threading
+from collections import OrderedDict
+from PyQt6.QtGui import QImage
+
+DEFAULT_IMAGE_CACHE_BUDGET_MB = 1024
+
+def image_cost(image):
+    """Returns the number of bytes held by a QPixmap or QImage."""
+    if isinstance(image, QImage):
+        return image.sizeInBytes()
+    return image.width() * image.height() * max(image.depth(), 8) // 8
+
+class ImageCache:
+    """LRU cache of decoded images and scaled pixmaps, bounded by a total byte budget.
+
+    Every entry is charged its decoded size; least recently used entries are evicted once
+    the budget is exceeded. Keys are tuples whose first element names the kind of entry,
+    e.g. ("image", path), ("thumbnail", path, size) or ("scaled", pixmap key, zoom).
+    QImages may be stored from worker threads; QPixmaps only on the GUI thread.
+    """
+
+    def __init__(self, budget_bytes=DEFAULT_IMAGE_CACHE_BUDGET_MB * 1024 * 1024):
+        self._lock = threading.Lock()
+        self._entries = OrderedDict() # {key: (value, cost)}, most recently used last
+        self.budget_bytes = budget_bytes
+        self.used_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    def contains(self, key):
+        """Checks for an entry without counting a hit or miss or refreshing it."""
+        with self._lock:
+            return key in self._entries
+
+    def put(self, key, value, cost=None):
+        if cost is None:
+            cost = image_cost(value)
+        with self._lock:
+            if key in self._entries:
+                self.used_bytes -= self._entries.pop(key)[1]
+            if cost > self.budget_bytes:
+                return # Would evict everything else and still not fit
+            self._entries[key] = (value, cost)
+            self.used_bytes += cost
+            self._evict()
+
+    def get_or_load(self, key, loader):
+        """Returns the cached value for key, or calls loader(), caches its result and returns it.
+
+        Null images returned by loader are passed through without being cached.
+        """
+        value = self.get(key)
+        if value is None:
+            value = loader()
+            if not value.isNull():
+                self.put(key, value)
+        return value
+
+    def discard(self, key):
+        with self._lock:
+            if key in self._entries:
+                self.used_bytes -= self._entries.pop(key)[1]
+
+    def set_budget(self, budget_bytes):
+        with self._lock:
+            self.budget_bytes = budget_bytes
+            self._evict()
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.used_bytes = 0
+
+    def statistics(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'entries': len(self._entries),
+                'used_bytes': self.used_bytes,
+                'budget_bytes': self.budget_bytes,
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': self.hits / lookups if lookups else 0.0,
+                'evictions': self.evictions,
+            }
+
+    def _evict(self):
+        while self.used_bytes > self.budget_bytes and self._entries:
+            _, (_, cost) = self._entries.popitem(last=False)
+            self.used_bytes -= cost
+            self.evictions += 1
+
+# Shared by the canvas, the image list thumbnails and prefetching
+image_cache = ImageCache()
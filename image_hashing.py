@@ -0,0 +1,99 @@
+import os
+import json
+from concurrent.futures import ThreadPoolExecutor
+from PyQt6.QtCore import QSize
+from PyQt6.QtGui import QImage
+
+import bbox_utils # Import the C++ module
+from label_writer import write_text_atomically
+from archive_source import open_image_reader, image_signature
+
+IMAGE_HASHES_FILENAME = "image_hashes.json"
+HASH_THUMBNAIL_SIZE = 32 # Images are decoded straight to this size, then hashed natively
+HASH_DECODE_THREADS = 8
+HASH_BATCH_SIZE = 4096 # Thumbnails hashed per native call
+DUPLICATE_MAX_DISTANCE = 4 # Hamming distance up to which two images count as near-duplicates
+
+def _decode_thumbnail(image_path):
+    """Returns the image as HASH_THUMBNAIL_SIZE^2 grayscale bytes, or None if it cannot be decoded.
+
+    The reader is asked for the reduced size up front, so JPEGs are decoded at a fraction of
+    their resolution instead of being decoded fully and scaled afterwards.
+    """
+    reader = open_image_reader(image_path)
+    reader.setScaledSize(QSize(HASH_THUMBNAIL_SIZE, HASH_THUMBNAIL_SIZE))
+    image = reader.read()
+    if image.isNull():
+        return None
+    image = image.convertToFormat(QImage.Format.Format_Grayscale8)
+    if image.width() != HASH_THUMBNAIL_SIZE or image.height() != HASH_THUMBNAIL_SIZE:
+        image = image.scaled(HASH_THUMBNAIL_SIZE, HASH_THUMBNAIL_SIZE)
+    pixels = image.constBits()
+    pixels.setsize(image.sizeInBytes())
+    data = bytes(pixels)
+    stride = image.bytesPerLine()
+    if stride == HASH_THUMBNAIL_SIZE:
+        return data
+    return b"".join(data[row * stride:row * stride + HASH_THUMBNAIL_SIZE] for row in range(HASH_THUMBNAIL_SIZE))
+
+def _load_hash_file(hash_file_path):
+    try:
+        with open(hash_file_path, 'r') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+def update_image_hashes(dataset_folder, image_paths, progress_callback=None):
+    """Returns {image path: 64-bit dHash} for the dataset, hashing only new or modified images.
+
+    Hashes are stored in image_hashes.json in the dataset folder, keyed by the path relative to
+    the dataset together with file size and modification time. Images that cannot be decoded
+    are left out of the result.
+    """
+    hash_file_path = os.path.join(dataset_folder, IMAGE_HASHES_FILENAME)
+    stored = _load_hash_file(hash_file_path) # {relative path: [size, mtime_ns, hash hex]}
+    updated = {}
+    hashes = {}
+    stale_paths = []
+    for image_path in image_paths:
+        relative_path = os.path.relpath(image_path, dataset_folder)
+        try:
+            size, mtime_ns = image_signature(image_path)
+        except OSError:
+            continue
+        entry = stored.get(relative_path)
+        if entry and entry[0] == size and entry[1] == mtime_ns:
+            updated[relative_path] = entry
+            hashes[image_path] = int(entry[2], 16)
+        else:
+            stale_paths.append((image_path, relative_path, (size, mtime_ns)))
+
+    with ThreadPoolExecutor(max_workers=HASH_DECODE_THREADS) as decoder:
+        for start in range(0, len(stale_paths), HASH_BATCH_SIZE):
+            batch = stale_paths[start:start + HASH_BATCH_SIZE]
+            thumbnails = list(decoder.map(_decode_thumbnail, [item[0] for item in batch]))
+            decoded = [(item, thumbnail) for item, thumbnail in zip(batch, thumbnails) if thumbnail is not None]
+            batch_hashes = bbox_utils.compute_dhashes(b"".join(thumbnail for _, thumbnail in decoded), len(decoded),
+                                                      HASH_THUMBNAIL_SIZE, HASH_THUMBNAIL_SIZE)
+            for ((image_path, relative_path, (size, mtime_ns)), _), image_hash in zip(decoded, batch_hashes):
+                updated[relative_path] = [size, mtime_ns, f"{image_hash:016x}"]
+                hashes[image_path] = image_hash
+            if progress_callback:
+                progress_callback(min(start + HASH_BATCH_SIZE, len(stale_paths)), len(stale_paths))
+
+    if stale_paths or len(updated) != len(stored):
+        write_text_atomically(hash_file_path, json.dumps(updated, separators=(",", ":")))
+    return hashes
+
+def find_duplicate_groups(dataset_folder, image_paths, max_distance=DUPLICATE_MAX_DISTANCE, progress_callback=None):
+    """Worker function: updates the stored hashes and clusters near-duplicate images.
+
+    Returns {image path: path of the first image of its cluster} for images in clusters of two or more.
+    """
+    hashes = update_image_hashes(dataset_folder, image_paths, progress_callback)
+    hashed_paths = [path for path in image_paths if path in hashes]
+    clusters = bbox_utils.find_near_duplicate_clusters([hashes[path] for path in hashed_paths], max_distance)
+    cluster_sizes = {}
+    for first_index in clusters:
+        cluster_sizes[first_index] = cluster_sizes.get(first_index, 0) + 1
+    return {path: hashed_paths[first_index] for path, first_index in zip(hashed_paths, clusters) if cluster_sizes[first_index] > 1}
@@ -0,0 +1,293 @@
+import os
+import sys
+import time
+import hashlib
+from importlib.metadata import entry_points
+from PyQt6.QtGui import QImage
+
+import bbox_utils # Import the C++ module
+from inference_cache import file_digest, RAW_BOX_FIELDS
+from archive_source import load_image, is_archived_image
+
+RAW_DETECTION_CONFIDENCE = 0.05 # Raw detections are kept down to this, thresholds are applied later
+NMS_IOU_THRESHOLD = 0.45
+DEFAULT_INPUT_SIZE = 640
+TILE_BATCH_SIZE = 8 # Tiles sent to the model per call
+TILE_MATCH_THRESHOLD = 0.5 # Intersection over the smaller box above which tile detections are merged
+DETECTOR_ENTRY_POINT_GROUP = "pyqt_auto_labeller.detectors"
+FAKE_DETECTOR_SECONDS_PER_IMAGE = 0.0 # Simulated inference time of FakeDetectorBackend
+
+class DetectorBackend:
+    """Interface of the detectors used for auto-labeling.
+
+    A backend is created with (model_path, intra_op_threads), loaded and warmed up on a worker
+    thread, and then called through predict_batch. Capability flags tell the DetectionScheduler
+    how to drive it: up to max_batch_size images go into one call, and calls run in parallel
+    only if thread_safe. Third-party backends are registered under the DETECTOR_ENTRY_POINT_GROUP
+    entry point group and appear in the backend list like the built-in ones.
+    """
+    name = ""
+    max_batch_size = 1 # Images per predict_batch call
+    thread_safe = False # predict_batch may be called from several threads at once
+    requires_model_file = True # False for backends that need no imported model
+
+    def __init__(self, model_path, intra_op_threads=0):
+        self.model_path = model_path
+        self.intra_op_threads = intra_op_threads
+
+    def load(self):
+        pass
+
+    def warmup(self):
+        pass
+
+    def predict_batch(self, images):
+        """Returns one float32 array of shape (N, 6) per image, rows [x1, y1, x2, y2, conf, class_id] in image pixels.
+
+        images are decoded (height, width, 3) uint8 RGB arrays.
+        """
+        raise NotImplementedError
+
+    def predict_images(self, images):
+        """Runs predict_batch over QImages. Returns one raw detection list per image."""
+        return [boxes.tolist() for boxes in self.predict_batch([image_to_rgb_array(image) for image in images])]
+
+    def predict(self, image_path):
+        """Returns raw detections [x1, y1, x2, y2, conf, class_id] of an image file in original image pixels."""
+        image = load_image(image_path)
+        if image.isNull():
+            raise ValueError(f"Could not decode {os.path.basename(image_path)}")
+        return self.predict_images([image])[0]
+
+    def cache_key(self):
+        """Identifies the backend and model content for the inference cache. Hashed once per backend."""
+        if getattr(self, '_cache_key', None) is None:
+            self._cache_key = f"{self.name}:{file_digest(self.model_path)}"
+        return self._cache_key
+
+def image_to_rgb_array(image: QImage):
+    """Returns a QImage as a contiguous (height, width, 3) uint8 RGB array."""
+    import numpy as np
+    image = image.convertToFormat(QImage.Format.Format_RGB888)
+    pixels = image.constBits()
+    pixels.setsize(image.sizeInBytes())
+    rows = np.frombuffer(pixels, dtype=np.uint8).reshape(image.height(), image.bytesPerLine())
+    return rows[:, :image.width() * 3].reshape(image.height(), image.width(), 3).copy()
+
+def _raw_boxes_array(raw_boxes_data):
+    import numpy as np
+    return np.asarray(raw_boxes_data, dtype=np.float32).reshape(-1, RAW_BOX_FIELDS)
+
+class UltralyticsBackend(DetectorBackend):
+    """Runs the imported .pt model through ultralytics.YOLO (PyTorch)."""
+    name = "Ultralytics (PyTorch)"
+    max_batch_size = 16
+
+    def __init__(self, model_path, intra_op_threads=0):
+        super().__init__(model_path, intra_op_threads)
+        self.model = None
+
+    def load(self):
+        if self.model is None:
+            from ultralytics import YOLO # Imported on first use, it pulls in torch
+            if self.intra_op_threads > 0:
+                import torch
+                torch.set_num_threads(self.intra_op_threads)
+            self.model = YOLO(self.model_path)
+
+    def warmup(self):
+        """Runs one dummy forward pass so the first real image does not pay graph and allocator setup."""
+        import numpy as np
+        self.load()
+        self.model(np.zeros((DEFAULT_INPUT_SIZE, DEFAULT_INPUT_SIZE, 3), dtype=np.uint8), verbose=False)
+
+    def predict(self, image_path):
+        self.load()
+        if is_archived_image(image_path):
+            return super().predict(image_path) # Ultralytics can only open real files
+        results = self.model(image_path, conf=RAW_DETECTION_CONFIDENCE, verbose=False)
+        return self._raw_boxes(results[0])
+
+    def predict_batch(self, images):
+        self.load()
+        results = self.model([image[:, :, ::-1] for image in images], conf=RAW_DETECTION_CONFIDENCE, verbose=False) # Ultralytics expects BGR arrays
+        return [_raw_boxes_array(self._raw_boxes(result)) for result in results]
+
+    def _raw_boxes(self, result):
+        raw_boxes_data = []
+        for box in result.boxes:
+            x1, y1, x2, y2 = box.xyxy[0]
+            conf = box.conf[0]
+            class_id = int(box.cls[0])
+            raw_boxes_data.append([float(x1), float(y1), float(x2), float(y2), float(conf), float(class_id)])
+        return raw_boxes_data
+
+def get_cached_onnx_path(model_path):
+    """Returns the path of the ONNX export of a .pt model, exporting it on first use.
+
+    The export is cached beside the model and keyed by the model's size and modification
+    time, so replacing the .pt file triggers a new export.
+    """
+    stat = os.stat(model_path)
+    key = hashlib.sha1(f"{os.path.abspath(model_path)}:{stat.st_size}:{stat.st_mtime_ns}".encode()).hexdigest()[:12]
+    base_path, _ = os.path.splitext(model_path)
+    cached_path = f"{base_path}.{key}.onnx"
+    if not os.path.exists(cached_path):
+        from ultralytics import YOLO # Only needed to export
+        exported_path = YOLO(model_path).export(format="onnx", imgsz=DEFAULT_INPUT_SIZE)
+        os.replace(exported_path, cached_path)
+    return cached_path
+
+class OnnxRuntimeBackend(DetectorBackend):
+    """Runs an ONNX export of the model on the ONNX Runtime CPU provider.
+
+    Letterboxing, output decoding and NMS are done natively in bbox_utils.
+    """
+    name = "ONNX Runtime (CPU)"
+    thread_safe = True # InferenceSession.run may be called concurrently
+
+    def __init__(self, model_path, intra_op_threads=0):
+        super().__init__(model_path, intra_op_threads) # 0 lets ONNX Runtime use all physical cores
+        self.session = None
+        self.input_name = None
+        self.input_size = DEFAULT_INPUT_SIZE
+        self.dynamic_batch = False
+
+    @property
+    def max_batch_size(self):
+        return 16 if self.dynamic_batch else 1 # Fixed batch-1 exports run images one by one
+
+    def load(self):
+        if self.session is None:
+            import onnxruntime
+            onnx_path = self.model_path if self.model_path.endswith(".onnx") else get_cached_onnx_path(self.model_path)
+            options = onnxruntime.SessionOptions()
+            options.intra_op_num_threads = self.intra_op_threads
+            options.graph_optimization_level = onnxruntime.GraphOptimizationLevel.ORT_ENABLE_ALL
+            self.session = onnxruntime.InferenceSession(onnx_path, options, providers=["CPUExecutionProvider"])
+            model_input = self.session.get_inputs()[0]
+            self.input_name = model_input.name
+            if isinstance(model_input.shape[2], int):
+                self.input_size = model_input.shape[2]
+            self.dynamic_batch = not isinstance(model_input.shape[0], int)
+
+    def warmup(self):
+        """Runs one dummy forward pass so the first real image does not pay allocator setup."""
+        import numpy as np
+        self.load()
+        self.session.run(None, {self.input_name: np.zeros((1, 3, self.input_size, self.input_size), dtype=np.float32)})
+
+    def predict_batch(self, images):
+        """Letterboxes the images natively and runs them in a single session run if the model has a dynamic batch axis."""
+        import numpy as np
+        self.load()
+        letterboxed = []
+        for image in images:
+            height, width = image.shape[:2]
+            tensor, scale, pad_x, pad_y = bbox_utils.letterbox_image(image, width, height, width * 3, self.input_size)
+            letterboxed.append((tensor, scale, pad_x, pad_y, width, height))
+
+        if self.dynamic_batch and len(letterboxed) > 1:
+            batch_output = self.session.run(None, {self.input_name: np.concatenate([item[0] for item in letterboxed])})[0]
+            outputs = [batch_output[i:i + 1] for i in range(len(letterboxed))]
+        else:
+            outputs = [self.session.run(None, {self.input_name: item[0]})[0] for item in letterboxed]
+
+        return [_raw_boxes_array(bbox_utils.decode_yolo_output(output, RAW_DETECTION_CONFIDENCE, NMS_IOU_THRESHOLD, scale, pad_x, pad_y, width, height))
+                for output, (_, scale, pad_x, pad_y, width, height) in zip(outputs, letterboxed)]
+
+class FakeDetectorBackend(DetectorBackend):
+    """Detector without model weights, for benchmarking the auto-labeling pipeline.
+
+    Returns a few deterministic boxes per image, derived from its pixels, so repeated runs
+    (and the inference cache) behave like a real model. FAKE_DETECTOR_SECONDS_PER_IMAGE adds
+    a simulated inference cost.
+    """
+    name = "Fake (benchmark)"
+    max_batch_size = 32
+    thread_safe = True
+    requires_model_file = False
+
+    def cache_key(self):
+        return f"{self.name}:v1"
+
+    def predict_batch(self, images):
+        import numpy as np
+        if FAKE_DETECTOR_SECONDS_PER_IMAGE > 0:
+            time.sleep(FAKE_DETECTOR_SECONDS_PER_IMAGE * len(images))
+        results = []
+        for image in images:
+            height, width = image.shape[:2]
+            rng = np.random.default_rng(int(image[::max(1, height // 16), ::max(1, width // 16)].sum()))
+            count = int(rng.integers(0, 6))
+            sizes = rng.uniform(0.05, 0.3, size=(count, 2)) * (width, height)
+            origins = rng.uniform(0, 1, size=(count, 2)) * ((width, height) - sizes)
+            boxes = np.empty((count, RAW_BOX_FIELDS), dtype=np.float32)
+            boxes[:, 0:2] = origins
+            boxes[:, 2:4] = origins + sizes
+            boxes[:, 4] = rng.uniform(0.3, 1.0, size=count)
+            boxes[:, 5] = rng.integers(0, 3, size=count)
+            results.append(boxes)
+        return results
+
+def _tile_origins(length, tile_size, stride):
+    if length <= tile_size:
+        return [0]
+    origins = list(range(0, length - tile_size, stride))
+    origins.append(length - tile_size) # Last tile is flush with the far edge
+    return origins
+
+def predict_tiled(backend, image_path, tile_size, overlap):
+    """Returns raw detections of an image run as overlapping tiles, in original image pixels.
+
+    The image is decoded once and tiles are cropped from it in memory. Tiles are sent to the
+    backend in batches together with one downscaled full-image pass (for objects larger than
+    a tile), and the detections of all passes are merged by bbox_utils.merge_tile_detections.
+    """
+    image = load_image(image_path)
+    if image.isNull():
+        raise ValueError(f"Could not decode {os.path.basename(image_path)}")
+    width, height = image.width(), image.height()
+    stride = max(1, int(tile_size * (1.0 - overlap)))
+    tiles = [(x, y) for y in _tile_origins(height, tile_size, stride) for x in _tile_origins(width, tile_size, stride)]
+    if len(tiles) == 1:
+        return backend.predict_images([image])[0]
+
+    jobs = [(0, 0, image)] + [(x, y, image.copy(x, y, min(tile_size, width - x), min(tile_size, height - y))) for x, y in tiles]
+    raw_boxes_data = []
+    for start in range(0, len(jobs), TILE_BATCH_SIZE):
+        batch = jobs[start:start + TILE_BATCH_SIZE]
+        for (offset_x, offset_y, _), tile_boxes in zip(batch, backend.predict_images([job[2] for job in batch])):
+            for x1, y1, x2, y2, conf, class_id in tile_boxes:
+                raw_boxes_data.append([x1 + offset_x, y1 + offset_y, x2 + offset_x, y2 + offset_y, conf, class_id])
+    return bbox_utils.merge_tile_detections(raw_boxes_data, TILE_MATCH_THRESHOLD, width, height)
+
+def discover_detector_backends():
+    """Returns {name: backend class} of the built-in backends and those registered as entry points.
+
+    A plugin package registers its DetectorBackend subclass in its packaging metadata, e.g.
+    [project.entry-points."pyqt_auto_labeller.detectors"] my_detector = "my_package:MyDetector".
+    Plugins that fail to import are skipped with a warning.
+    """
+    backends = {backend.name: backend for backend in (UltralyticsBackend, OnnxRuntimeBackend, FakeDetectorBackend)}
+    for entry_point in entry_points(group=DETECTOR_ENTRY_POINT_GROUP):
+        try:
+            backend = entry_point.load()
+        except Exception as e:
+            print(f"Skipping detector plugin {entry_point.name}: {e}", file=sys.stderr)
+            continue
+        backends.setdefault(backend.name or entry_point.name, backend)
+    return backends
+
+INFERENCE_BACKENDS = discover_detector_backends()
+DEFAULT_INFERENCE_BACKEND = UltralyticsBackend.name
+
+def create_inference_backend(name, model_path, intra_op_threads=0):
+    return INFERENCE_BACKENDS[name](model_path, intra_op_threads)
+
+def load_and_warm_up(backend_key, backend):
+    """Worker function: loads a backend and runs its warm-up pass. Returns (backend_key, backend)."""
+    backend.load()
+    backend.warmup()
+    backend.cache_key() # Hash the model file here rather than on the first auto-label
+    return backend_key, backend
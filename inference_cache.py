@@ -0,0 +1,82 @@
+import hashlib
+import sqlite3
+import threading
+from array import array
+
+from archive_source import image_signature, is_archived_image, archived_image_digest
+
+RAW_BOX_FIELDS = 6 # [x1, y1, x2, y2, conf, class_id]
+
+def file_digest(path, chunk_size=1 << 20):
+    """Returns the SHA-1 hex digest of a file's content."""
+    digest = hashlib.sha1()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+class InferenceCache:
+    """Per-dataset store of raw detections, keyed by model hash and image content hash.
+
+    Raw detections are kept before any confidence threshold is applied, so a different
+    threshold can be applied later without running the model again. Image digests are
+    remembered per path together with size and mtime, so unchanged images are only hashed once.
+    The cache may be used from several threads. It keeps SQLite's default rollback journal, since
+    WAL mode needs shared memory that network file systems do not provide.
+    Raises sqlite3.Error if the database cannot be opened or created, e.g. in a read-only folder.
+    """
+
+    def __init__(self, db_path):
+        self._lock = threading.Lock()
+        self._connection = sqlite3.connect(db_path, check_same_thread=False)
+        try:
+            with self._lock:
+                self._connection.execute("PRAGMA journal_mode=DELETE") # WAL mode sticks to a database, switch older caches back
+                self._connection.execute("PRAGMA synchronous=NORMAL")
+                self._connection.execute(
+                    "CREATE TABLE IF NOT EXISTS image_digests (path TEXT PRIMARY KEY, size INTEGER, mtime_ns INTEGER, digest TEXT)")
+                self._connection.execute(
+                    "CREATE TABLE IF NOT EXISTS detections (model_key TEXT, image_digest TEXT, boxes BLOB, PRIMARY KEY (model_key, image_digest))")
+                self._connection.commit()
+        except sqlite3.Error:
+            self._connection.close()
+            raise
+
+    def image_digest(self, image_path):
+        size, mtime_ns = image_signature(image_path)
+        with self._lock:
+            row = self._connection.execute(
+                "SELECT size, mtime_ns, digest FROM image_digests WHERE path = ?", (image_path,)).fetchone()
+        if row and row[0] == size and row[1] == mtime_ns:
+            return row[2]
+
+        digest = archived_image_digest(image_path) if is_archived_image(image_path) else file_digest(image_path)
+        with self._lock:
+            self._connection.execute("INSERT OR REPLACE INTO image_digests VALUES (?, ?, ?, ?)",
+                                     (image_path, size, mtime_ns, digest))
+            self._connection.commit()
+        return digest
+
+    def get(self, model_key, image_digest):
+        """Returns the cached raw detections, or None if this model never ran on this image."""
+        with self._lock:
+            row = self._connection.execute(
+                "SELECT boxes FROM detections WHERE model_key = ? AND image_digest = ?", (model_key, image_digest)).fetchone()
+        if row is None:
+            return None
+        values = array('d')
+        values.frombytes(row[0])
+        return [values[i:i + RAW_BOX_FIELDS].tolist() for i in range(0, len(values), RAW_BOX_FIELDS)]
+
+    def put(self, model_key, image_digest, raw_boxes):
+        values = array('d')
+        for box in raw_boxes:
+            values.extend(box[:RAW_BOX_FIELDS])
+        with self._lock:
+            self._connection.execute("INSERT OR REPLACE INTO detections VALUES (?, ?, ?)",
+                                     (model_key, image_digest, values.tobytes()))
+            self._connection.commit()
+
+    def close(self):
+        with self._lock:
+            self._connection.close()
@@ -0,0 +1,102 @@
+import re
+
+import bbox_utils # Import the C++ module
+from archive_source import read_image_sizes
+
+LABEL_QUERY_HELP = "e.g. class:3 -class:car boxes>50 minsize<10 maxsize>500 name:frame_"
+
+_COMPARISON_PATTERN = re.compile(r"^(boxes|minsize|maxsize)(<=|>=|<|>|=)(\d+(?:\.\d+)?)$")
+
+def parse_normalized_boxes(label_text):
+    """Returns [(class_id, center_x, center_y, width, height), ...] of YOLO label text, skipping invalid lines."""
+    boxes = []
+    for line in label_text.splitlines():
+        parts = line.split()
+        if len(parts) < 5:
+            continue
+        try:
+            boxes.append((int(parts[0]), float(parts[1]), float(parts[2]), float(parts[3]), float(parts[4])))
+        except ValueError:
+            continue
+    return boxes
+
+def _resolve_class(token, labels):
+    """Returns the class id for a numeric id or a label name (case-insensitive)."""
+    if token.lstrip("-").isdigit():
+        return int(token)
+    for label in labels:
+        if label['name'].lower() == token.lower():
+            return label['id']
+    raise ValueError(f"Unknown class '{token}'")
+
+def parse_label_query(text, labels):
+    """Parses an image list query into a bbox_utils.LabelQuery, or returns None for an empty query.
+
+    Terms are separated by whitespace and must all match:
+      class:3 / class:car,person   image has boxes of every listed class (ids or label names)
+      -class:3                     image has no box of that class
+      boxes>50, boxes<=2, boxes=0  number of boxes
+      minsize<10                   some box has a side shorter than 10 pixels
+      maxsize>500                  some box has a side longer than 500 pixels
+      name:frame_ (or a bare word) file name contains the text
+    Raises ValueError for terms that cannot be parsed.
+    """
+    terms = text.split()
+    if not terms:
+        return None
+
+    query = bbox_utils.LabelQuery()
+    required_classes = []
+    excluded_classes = []
+    name_parts = []
+    for term in terms:
+        lowered = term.lower()
+        comparison = _COMPARISON_PATTERN.match(lowered)
+        if lowered.startswith(("class:", "-class:", "!class:")):
+            class_ids = [_resolve_class(token, labels) for token in term.split(":", 1)[1].split(",") if token]
+            (required_classes if lowered.startswith("class:") else excluded_classes).extend(class_ids)
+        elif lowered.startswith("name:"):
+            name_parts.append(lowered[5:])
+        elif comparison:
+            field, operator, value = comparison.groups()
+            if field == "boxes":
+                count = int(float(value))
+                if operator in (">", ">=", "="):
+                    query.min_boxes = max(query.min_boxes, count + 1 if operator == ">" else count)
+                if operator in ("<", "<=", "="):
+                    upper = count - 1 if operator == "<" else count
+                    if upper < 0:
+                        raise ValueError(f"'{term}' matches no image") # max_boxes = -1 would mean no limit
+                    query.max_boxes = upper if query.max_boxes < 0 else min(query.max_boxes, upper)
+            elif field == "minsize" and operator == "<":
+                query.smaller_than = float(value)
+            elif field == "maxsize" and operator == ">":
+                query.larger_than = float(value)
+            else:
+                raise ValueError(f"Unsupported comparison '{term}', use minsize<N or maxsize>N")
+        elif ":" in term:
+            raise ValueError(f"Unknown query term '{term}'")
+        else:
+            name_parts.append(lowered)
+
+    if len(name_parts) > 1:
+        raise ValueError("Only one file name term is supported")
+    query.required_classes = required_classes
+    query.excluded_classes = excluded_classes
+    query.name_contains = name_parts[0] if name_parts else ""
+    return query
+
+def build_label_index(image_paths, label_paths, box_store=None):
+    """Worker function: returns a bbox_utils.LabelIndex over the given images.
+
+    box_store is an optional (box store buffer, rows, updated rows, updated texts) tuple from
+    DatasetManager.box_store_for_images to read the boxes and image sizes from instead of the
+    label files and image headers.
+    """
+    index = bbox_utils.LabelIndex()
+    if box_store is not None:
+        store_buffer, rows, updated_rows, updated_texts = box_store
+        index.build_from_box_store(image_paths, store_buffer, rows, updated_rows=updated_rows, updated_texts=updated_texts)
+    else:
+        index.build(image_paths, label_paths, image_sizes=read_image_sizes(image_paths) or [])
+    return index
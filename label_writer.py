@@ -0,0 +1,152 @@
+import os
+import hashlib
+import queue
+import tempfile
+import threading
+from PyQt6.QtCore import QObject, pyqtSignal
+
+_UMASK = os.umask(0o022) # os.umask can only be read by setting it, done once at import before any worker thread
+os.umask(_UMASK)
+
+def _content_digest(text):
+    if text is None:
+        return None # The file does not exist
+    return hashlib.sha1(text.encode('utf-8')).digest()
+
+def write_text_atomically(path: str, text: str):
+    """Writes text to a temporary file beside path and renames it over path.
+
+    The file keeps the mode of the file it replaces, or gets the umask default if it is new
+    (mkstemp alone would leave it readable by its owner only).
+    """
+    directory = os.path.dirname(path) or "."
+    try:
+        mode = os.stat(path).st_mode & 0o7777
+    except FileNotFoundError:
+        mode = 0o666 & ~_UMASK
+    fd, temp_path = tempfile.mkstemp(dir=directory, prefix="." + os.path.basename(path) + ".", suffix=".tmp")
+    try:
+        with os.fdopen(fd, 'w') as f:
+            if hasattr(os, 'fchmod'):
+                os.fchmod(f.fileno(), mode)
+            f.write(text)
+        os.replace(temp_path, path)
+    except BaseException:
+        try:
+            os.remove(temp_path)
+        except OSError:
+            pass
+        raise
+
+class LabelWriter(QObject):
+    """Background writer for label files.
+
+    Each path is always handled by the same worker thread, so writes to one file are applied
+    in submission order while different files are written concurrently. The digest of the
+    content known to be on disk is remembered per path, so resubmitting unchanged content
+    costs no disk I/O at all. Text that is queued but not written yet is kept per path, so
+    read_text returns what was last submitted rather than a stale file.
+    """
+    write_finished = pyqtSignal(str, object, object) # (path, old_text, new_text), None means the file is absent
+    write_failed = pyqtSignal(str, str) # (path, error message)
+
+    def __init__(self, num_threads: int = 4):
+        super().__init__()
+        self._digest_lock = threading.Lock()
+        self._known_digests = {} # {path: digest of the content on disk, None if the file is absent}
+        self._pending = {} # {path: [writes not applied yet, last submitted text]}
+        self._queues = [queue.Queue() for _ in range(num_threads)]
+        self._threads = []
+        for job_queue in self._queues:
+            thread = threading.Thread(target=self._run, args=(job_queue,), daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+    def submit(self, path: str, text, notify: bool = True):
+        """Queues text to be written to path. text=None removes the file.
+
+        write_finished is only emitted for submissions with notify=True that changed the file.
+        """
+        with self._digest_lock:
+            pending = self._pending.setdefault(path, [0, None])
+            pending[0] += 1
+            pending[1] = text
+        job_queue = self._queues[hash(path) % len(self._queues)]
+        job_queue.put((path, text, notify))
+
+    def read_text(self, path: str):
+        """Returns the content of path, None if the file does not exist.
+
+        A submitted write that is not on disk yet wins over the file. Content read from disk is
+        recorded like note_disk_content. Raises OSError or UnicodeDecodeError if the file cannot be read.
+        """
+        with self._digest_lock:
+            if path in self._pending:
+                return self._pending[path][1]
+        try:
+            with open(path, 'r') as f:
+                text = f.read()
+        except FileNotFoundError:
+            text = None
+        self.note_disk_content(path, text)
+        return text
+
+    def note_disk_content(self, path: str, text):
+        """Records content that was just read from disk, so an unchanged save can be skipped."""
+        with self._digest_lock:
+            self._known_digests[path] = _content_digest(text)
+
+    def forget(self):
+        """Drops all remembered digests, e.g. when another dataset is loaded."""
+        with self._digest_lock:
+            self._known_digests = {}
+
+    def flush(self):
+        """Blocks until every submitted write has been applied."""
+        for job_queue in self._queues:
+            job_queue.join()
+
+    def _run(self, job_queue):
+        while True:
+            path, text, notify = job_queue.get()
+            try:
+                self._write(path, text, notify)
+            finally:
+                with self._digest_lock:
+                    pending = self._pending[path]
+                    pending[0] -= 1
+                    if pending[0] == 0:
+                        del self._pending[path]
+                job_queue.task_done()
+
+    def _write(self, path, text, notify):
+        new_digest = _content_digest(text)
+        with self._digest_lock:
+            if path in self._known_digests and self._known_digests[path] == new_digest:
+                return # Unchanged since we last read or wrote it
+
+        try:
+            try:
+                with open(path, 'r') as f:
+                    old_text = f.read()
+            except FileNotFoundError:
+                old_text = None
+
+            if _content_digest(old_text) != new_digest:
+                if text is None:
+                    os.remove(path)
+                else:
+                    write_text_atomically(path, text)
+            else:
+                notify = False # Already on disk, nothing changed
+
+            with self._digest_lock:
+                self._known_digests[path] = new_digest
+        except (OSError, UnicodeDecodeError) as e:
+            with self._digest_lock:
+                self._known_digests.pop(path, None) # State on disk is unknown now
+            self.write_failed.emit(path, str(e))
+            return
+
+        if notify:
+            self.write_finished.emit(path, old_text, text)
@@ -1,9 +1,25 @@
 import sys
+import time
+_startup_marks = [("start", time.perf_counter())]
+
 from PyQt6.QtWidgets import QApplication
 from main_window_core import MainWindow
+_startup_marks.append(("imports", time.perf_counter()))
+
+def print_startup_report(marks):
+    """Prints the time spent in each startup phase, up to the first paint of the window."""
+    print("Startup timing:")
+    for (_, previous), (name, timestamp) in zip(marks, marks[1:]):
+        print(f"  {name:<20}{(timestamp - previous) * 1000:8.1f} ms")
+    print(f"  {'time to first paint':<20}{(marks[-1][1] - marks[0][1]) * 1000:8.1f} ms")
 
 if __name__ == "__main__":
     app = QApplication(sys.argv)
+    _startup_marks.append(("QApplication", time.perf_counter()))
     window = MainWindow()
+    _startup_marks.append(("MainWindow", time.perf_counter()))
+    if "--startup-timing" in sys.argv:
+        # first_painted fires before the deferred session restore starts
+        window.first_painted.connect(lambda: print_startup_report(_startup_marks + [("first paint", time.perf_counter())]))
     window.show()
     sys.exit(app.exec())
@@ -1,45 +1,112 @@
 import os
 import sys
-from PyQt6.QtWidgets import QMainWindow, QInputDialog, QLineEdit, QApplication
-from PyQt6.QtCore import Qt
+from PyQt6.QtWidgets import QMainWindow, QInputDialog, QLineEdit, QApplication, QMessageBox
+from PyQt6.QtCore import Qt, QTimer, pyqtSignal
 
 # Import custom widget and styles
 from styles import DARK_THEME
 
+from image_cache import image_cache
+
 # Import new managers
 from ui_manager import UIManager
 from dataset_manager import DatasetManager
+from statistics_manager import StatisticsManager
+from validation_manager import ValidationManager
 
 class MainWindow(QMainWindow):
+    first_painted = pyqtSignal() # Emitted once, right after the window has been painted for the first time
+
     def __init__(self):
         super().__init__()
+        self._first_paint_done = False
         self.ui_manager = UIManager(self)
         self.dataset_manager = DatasetManager(self)
+        self.statistics_manager = StatisticsManager(self)
+        self.validation_manager = ValidationManager(self)
         self.ui_manager.setup_ui()
         self.apply_theme() # Call apply_theme here
         self.connect_signals()
+
+    def paintEvent(self, event):
+        super().paintEvent(event)
+        if not self._first_paint_done:
+            self._first_paint_done = True
+            QTimer.singleShot(0, self._on_first_paint) # Let the rest of this frame finish first
+
+    def _on_first_paint(self):
+        self.first_painted.emit()
+        # Deferred startup work: reopen the previous dataset only once the window is on screen
+        QTimer.singleShot(0, self.dataset_manager.restore_last_session)
     def connect_signals(self):
         # Connect UI signals to DatasetManager methods
         self.ui_manager.main_window.load_dataset_action.triggered.connect(self.dataset_manager.load_dataset)
+        self.ui_manager.main_window.open_archive_action.triggered.connect(self.dataset_manager.open_archive)
+        self.ui_manager.main_window.open_video_action.triggered.connect(self.dataset_manager.open_video)
+        self.ui_manager.main_window.export_coco_action.triggered.connect(self.dataset_manager.export_coco_dataset)
+        self.ui_manager.main_window.create_split_action.triggered.connect(self.dataset_manager.create_dataset_split)
+        self.ui_manager.main_window.import_coco_action.triggered.connect(self.dataset_manager.import_coco_annotations)
+        self.ui_manager.main_window.import_voc_action.triggered.connect(self.dataset_manager.import_voc_annotations)
+        self.ui_manager.main_window.image_cache_action.triggered.connect(self._image_cache_dialog)
+        self.ui_manager.main_window.box_store_action.setChecked(self.dataset_manager.use_box_store)
+        self.ui_manager.main_window.box_store_action.toggled.connect(self.dataset_manager.set_box_store_enabled)
+        self.ui_manager.main_window.export_labels_action.triggered.connect(self.dataset_manager.export_box_store_labels)
+        self.ui_manager.main_window.inference_backend_combobox.currentTextChanged.connect(self.dataset_manager.set_inference_backend)
+        self.ui_manager.main_window.inference_threads_spinbox.valueChanged.connect(self.dataset_manager.set_inference_threads)
+        self.ui_manager.main_window.confidence_slider.valueChanged.connect(self._on_confidence_slider_changed)
+        self.ui_manager.main_window.tile_size_spinbox.valueChanged.connect(self.dataset_manager.set_tile_size)
+        self.ui_manager.main_window.tile_overlap_spinbox.valueChanged.connect(lambda value: self.dataset_manager.set_tile_overlap(value / 100))
         self.ui_manager.main_window.left_panel_list.currentItemChanged.connect(self.dataset_manager.on_image_list_item_changed)
         self.ui_manager.main_window.label_list_widget.currentItemChanged.connect(self.dataset_manager.on_label_selected)
         self.ui_manager.main_window.filter_combobox.currentIndexChanged.connect(self.dataset_manager.apply_filter)
+        self.ui_manager.main_window.label_query_edit.editingFinished.connect(
+            lambda: self.dataset_manager.set_label_query(self.ui_manager.main_window.label_query_edit.text()))
         self.ui_manager.main_window.add_label_button.clicked.connect(self._add_label_dialog)
         self.ui_manager.main_window.edit_label_button.clicked.connect(self._edit_label_dialog)
         self.ui_manager.main_window.delete_label_button.clicked.connect(self._delete_label_dialog)
+        self.ui_manager.main_window.merge_label_button.clicked.connect(self._merge_label_dialog)
+        self.ui_manager.main_window.change_label_id_button.clicked.connect(self._change_label_id_dialog)
+        self.ui_manager.main_window.compact_label_ids_button.clicked.connect(self._compact_label_ids_dialog)
         self.ui_manager.main_window.annotate_button.clicked.connect(self._set_annotate_mode)
         self.ui_manager.main_window.select_button.clicked.connect(self._set_select_mode)
         self.ui_manager.main_window.save_labels_button.clicked.connect(self.dataset_manager.save_labels)
         self.ui_manager.main_window.clear_labels_button.clicked.connect(self.dataset_manager.clear_labels)
         self.ui_manager.main_window.previous_image_button.clicked.connect(self._previous_image)
         self.ui_manager.main_window.next_image_button.clicked.connect(self._next_image)
+        self.ui_manager.main_window.propagate_boxes_button.clicked.connect(lambda: self.dataset_manager.propagate_boxes_from_previous())
         self.ui_manager.main_window.canvas_label.label_needed_signal.connect(self.ui_manager.main_window.statusBar.showMessage)
         self.ui_manager.main_window.canvas_label.bounding_box_added.connect(self.dataset_manager.set_unsaved_changes)
+        self.ui_manager.main_window.canvas_label.full_resolution_needed.connect(self.dataset_manager.load_full_resolution_image)
         self.ui_manager.main_window.toggle_visibility_button.clicked.connect(self._toggle_bounding_box_visibility)
         # Pass the labels map to the canvas widget when labels are loaded or changed
         self.dataset_manager.labels_updated.connect(self.ui_manager.main_window.canvas_label.set_labels_map)
         self.dataset_manager.current_image_has_bounding_boxes.connect(self._update_toggle_visibility_button_state)
         self.dataset_manager.yolo_model_loaded_signal.connect(self._update_auto_label_button_state) # Connect new signal
+        # Keep the statistics panel in sync: full scan on dataset load, incremental updates after saves
+        self.dataset_manager.dataset_loaded.connect(self.statistics_manager.recompute)
+        self.dataset_manager.label_file_changed.connect(self.statistics_manager.update_label_file)
+        self.statistics_manager.statistics_updated.connect(self.ui_manager.update_statistics_panel)
+        self.dataset_manager.labels_updated.connect(self._refresh_statistics_panel_labels)
+        self.ui_manager.main_window.refresh_statistics_button.clicked.connect(self.statistics_manager.recompute)
+        # Label checks: full pass on dataset load, the saved file only after each save
+        self.dataset_manager.dataset_loaded.connect(self.validation_manager.validate)
+        self.dataset_manager.labels_updated.connect(self.validation_manager.set_labels)
+        self.dataset_manager.label_writer.write_finished.connect(self.validation_manager.update_label_file)
+        self.validation_manager.report_updated.connect(lambda: self.ui_manager.update_validation_panel(self.validation_manager))
+        self.validation_manager.file_issues_changed.connect(lambda label_path: self.ui_manager.update_validation_file(self.validation_manager, label_path))
+        self.ui_manager.main_window.validate_labels_button.clicked.connect(self.validation_manager.validate)
+        self.ui_manager.main_window.validation_tree.itemActivated.connect(self._on_validation_item_activated)
+        self.ui_manager.main_window.validation_tree.itemClicked.connect(self._on_validation_item_activated)
+        # Review grid: shows the images of the filtered image list
+        review_grid = self.ui_manager.main_window.review_grid
+        self.ui_manager.main_window.review_grid_action.toggled.connect(self._set_review_grid_visible)
+        self.dataset_manager.image_list_filtered.connect(self._refresh_review_grid)
+        self.dataset_manager.image_statuses_changed.connect(review_grid.model.refresh_statuses) # Repaints statuses, keeps selection, scroll and loaded cells
+        self.dataset_manager.labels_updated.connect(lambda labels: review_grid.set_label_colors(dict(self.dataset_manager.label_colors)))
+        self.dataset_manager.label_writer.write_finished.connect(lambda label_path, old_text, new_text: review_grid.model.update_label_file(label_path, new_text))
+        review_grid.accept_requested.connect(lambda image_paths: self.dataset_manager.set_image_statuses(image_paths, "labelled"))
+        review_grid.reject_requested.connect(self._reject_review_images)
+        review_grid.image_activated.connect(self._open_review_image)
 
     def apply_theme(self):
         self.ui_manager.apply_theme()
@@ -95,7 +162,52 @@ class MainWindow(QMainWindow):
 
         label_id_to_delete = current_item.data(Qt.ItemDataRole.UserRole)
         label_name_to_delete = current_item.text()
-        self.dataset_manager.delete_label(label_id_to_delete, label_name_to_delete, current_item)
+        answer = QMessageBox.question(self, "Delete Label",
+                                      f"Delete '{label_name_to_delete}' and remove its boxes from every label file?")
+        if answer == QMessageBox.StandardButton.Yes:
+            self.dataset_manager.delete_label(label_id_to_delete, label_name_to_delete, current_item)
+
+    def _merge_label_dialog(self):
+        current_item = self.ui_manager.main_window.label_list_widget.currentItem()
+        if not current_item:
+            self.ui_manager.main_window.statusBar.showMessage("No label selected to merge.")
+            return
+
+        source_label_id = current_item.data(Qt.ItemDataRole.UserRole)
+        targets = [label for label in self.dataset_manager.labels if label['id'] != source_label_id]
+        if not targets:
+            self.ui_manager.main_window.statusBar.showMessage("There is no other label to merge into.")
+            return
+        target_names = [f"{label['name']} ({label['id']})" for label in targets]
+        target_name, ok = QInputDialog.getItem(self, "Merge Label", f"Merge '{current_item.text()}' into:", target_names, 0, False)
+        if ok:
+            self.dataset_manager.merge_labels(source_label_id, targets[target_names.index(target_name)]['id'])
+
+    def _change_label_id_dialog(self):
+        current_item = self.ui_manager.main_window.label_list_widget.currentItem()
+        if not current_item:
+            self.ui_manager.main_window.statusBar.showMessage("No label selected to change.")
+            return
+
+        label_id = current_item.data(Qt.ItemDataRole.UserRole)
+        new_label_id, ok = QInputDialog.getInt(self, "Change Class ID", f"New class id for '{current_item.text()}':", label_id, 0, 100000)
+        if ok and new_label_id != label_id:
+            self.dataset_manager.change_label_id(label_id, new_label_id)
+
+    def _compact_label_ids_dialog(self):
+        answer = QMessageBox.question(self, "Compact Class IDs",
+                                      "Renumber the class ids 0..n-1 in labels.json and every label file?")
+        if answer == QMessageBox.StandardButton.Yes:
+            self.dataset_manager.compact_label_ids()
+
+    def _image_cache_dialog(self):
+        stats = image_cache.statistics()
+        summary = (f"{stats['entries']} entries, {stats['used_bytes'] / 1048576:.1f} of {stats['budget_bytes'] / 1048576:.0f} MB used\n"
+                   f"Hit rate {stats['hit_rate']:.1%} ({stats['hits']} hits, {stats['misses']} misses), {stats['evictions']} evictions\n\n"
+                   "Memory budget (MB):")
+        budget_mb, ok = QInputDialog.getInt(self, "Image Cache", summary, stats['budget_bytes'] // 1048576, 64, 65536, 64)
+        if ok:
+            self.dataset_manager.set_image_cache_budget(budget_mb)
 
     def keyPressEvent(self, event):
         if event.key() == Qt.Key.Key_S and event.modifiers() == Qt.KeyboardModifier.ControlModifier:
@@ -122,6 +234,46 @@ class MainWindow(QMainWindow):
         if hasattr(self.ui_manager.main_window, 'auto_label_all_button'):
             self.ui_manager.main_window.auto_label_all_button.setEnabled(is_model_loaded)
 
+    def _refresh_statistics_panel_labels(self, labels: list):
+        # Class names in the statistics panel come from the label list
+        self.ui_manager.update_statistics_panel(self.statistics_manager.statistics)
+
+    def _on_validation_item_activated(self, item, column):
+        image_path = item.data(0, Qt.ItemDataRole.UserRole)
+        if image_path:
+            self.dataset_manager.select_image(image_path)
+        else:
+            self.ui_manager.main_window.statusBar.showMessage(f"{item.text(0)} has no image in the dataset.")
+
+    def _set_review_grid_visible(self, visible: bool):
+        central_stack = self.ui_manager.main_window.central_stack
+        central_stack.setCurrentWidget(self.ui_manager.main_window.review_grid if visible else self.ui_manager.main_window.canvas_widget)
+        self._refresh_review_grid()
+
+    def _refresh_review_grid(self):
+        if not self.ui_manager.main_window.review_grid_action.isChecked():
+            return # Refreshed when the grid is shown
+        dataset_manager = self.dataset_manager
+        visible_images = [(image_path, label_path) for image_path, label_path in zip(dataset_manager.image_files, dataset_manager.get_label_filepaths())
+                          if dataset_manager.image_visibility.get(image_path, True)]
+        self.ui_manager.main_window.review_grid.set_images([image_path for image_path, _ in visible_images],
+                                                           [label_path for _, label_path in visible_images],
+                                                           dataset_manager.image_labelled_status)
+
+    def _reject_review_images(self, image_paths):
+        answer = QMessageBox.question(self, "Reject Labels", f"Delete the label files of {len(image_paths)} images?")
+        if answer == QMessageBox.StandardButton.Yes:
+            self.dataset_manager.reject_labels(image_paths)
+
+    def _open_review_image(self, image_path):
+        self.ui_manager.main_window.review_grid_action.setChecked(False)
+        self.dataset_manager.select_image(image_path)
+
+    def _on_confidence_slider_changed(self, value: int):
+        threshold = value / 100
+        self.ui_manager.main_window.confidence_label.setText(f"Confidence: {threshold:.2f}")
+        self.dataset_manager.set_confidence_threshold(threshold)
+
     def _previous_image(self):
         current_row = self.ui_manager.main_window.left_panel_list.currentRow()
         if current_row > 0:
@@ -133,10 +285,16 @@ class MainWindow(QMainWindow):
         current_row = self.ui_manager.main_window.left_panel_list.currentRow()
         if current_row < self.ui_manager.main_window.left_panel_list.count() - 1:
             self.ui_manager.main_window.left_panel_list.setCurrentRow(current_row + 1)
+            dataset_manager = self.dataset_manager
+            if (self.ui_manager.main_window.auto_propagate_checkbox.isChecked() and dataset_manager.current_image_path
+                    and self.ui_manager.main_window.left_panel_list.currentRow() == current_row + 1
+                    and not dataset_manager.image_bounding_boxes.get(dataset_manager.current_image_path)):
+                dataset_manager.propagate_boxes_from_previous(run_detector=False) # Cached detections only, Next stays instant
         else:
             self.ui_manager.main_window.statusBar.showMessage("Already at the last image.")
 
     def closeEvent(self, event):
+        self.dataset_manager.flush_pending_writes() # Flush barrier: wait for queued label writes
         self.dataset_manager.save_labels_to_json()
         self.dataset_manager._save_image_statuses() # Save image statuses on close
         super().closeEvent(event)
@@ -0,0 +1,234 @@
+import os
+from PyQt6.QtCore import Qt, QAbstractListModel, QModelIndex, QRect, QRectF, QSize, QTimer, pyqtSignal
+from PyQt6.QtGui import QColor, QPen
+from PyQt6.QtWidgets import (
+    QWidget, QVBoxLayout, QHBoxLayout, QLabel, QPushButton, QListView, QStyledItemDelegate, QStyle, QAbstractItemView
+)
+
+from archive_source import open_image_reader
+from label_query import parse_normalized_boxes
+from image_cache import image_cache
+from workers import run_in_background
+
+REVIEW_THUMBNAIL_SIZE = 192 # Longest side of a grid thumbnail in pixels
+REVIEW_CELL_MARGIN = 6
+REVIEW_CAPTION_HEIGHT = 18
+REVIEW_LOAD_BATCH = 8 # Cells decoded per worker job
+STATUS_COLORS = {"labelled": QColor("#4CAF50"), "auto-labelled": QColor("#FFC107")} # Same as the image list
+
+def load_review_cells(jobs, thumbnail_size):
+    """Worker function: decodes thumbnails and reads label files for [(image path, label path), ...].
+
+    Thumbnails are decoded straight to thumbnail_size and stored in the image cache.
+    Returns [(image path, boxes), ...] with boxes as returned by parse_normalized_boxes.
+    """
+    results = []
+    for image_path, label_path in jobs:
+        key = ("review", image_path, thumbnail_size)
+        if not image_cache.contains(key):
+            reader = open_image_reader(image_path)
+            size = reader.size()
+            if size.isValid():
+                reader.setScaledSize(size.scaled(thumbnail_size, thumbnail_size, Qt.AspectRatioMode.KeepAspectRatio).expandedTo(QSize(1, 1)))
+            image_cache.put(key, reader.read())
+        try:
+            with open(label_path, 'r') as f:
+                boxes = parse_normalized_boxes(f.read())
+        except OSError:
+            boxes = []
+        results.append((image_path, boxes))
+    return results
+
+class ReviewGridModel(QAbstractListModel):
+    """Images of the review grid. Thumbnails and boxes are loaded on demand, only for cells being painted."""
+    ImagePathRole = Qt.ItemDataRole.UserRole
+    StatusRole = Qt.ItemDataRole.UserRole + 1
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self._image_paths = []
+        self._label_paths = []
+        self._rows_by_label_path = {}
+        self._statuses = {}
+        self._boxes = {} # {image path: boxes}, present once the cell has been loaded
+        self._pending = set() # Image paths queued or loading
+        self._queued_rows = []
+        self._generation = 0 # Results of loads started before the last reset are dropped
+        self.is_row_visible = lambda row: True # Set by the view
+        self._load_timer = QTimer(self)
+        self._load_timer.setSingleShot(True)
+        self._load_timer.timeout.connect(self._start_loads) # Collects the requests of one paint pass
+
+    def set_images(self, image_paths, label_paths, statuses):
+        self.beginResetModel()
+        self._image_paths = list(image_paths)
+        self._label_paths = list(label_paths)
+        self._rows_by_label_path = {label_path: row for row, label_path in enumerate(self._label_paths)}
+        self._statuses = statuses
+        self._boxes = {}
+        self._pending = set()
+        self._queued_rows = []
+        self._generation += 1
+        self.endResetModel()
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self._image_paths)
+
+    def data(self, index, role=Qt.ItemDataRole.DisplayRole):
+        if not index.isValid():
+            return None
+        image_path = self._image_paths[index.row()]
+        if role == Qt.ItemDataRole.DisplayRole:
+            return os.path.basename(image_path)
+        if role == self.ImagePathRole:
+            return image_path
+        if role == self.StatusRole:
+            return self._statuses.get(image_path, "unlabelled")
+        return None
+
+    def cell(self, row):
+        """Returns (thumbnail QImage, boxes) of a row, or None and queues a background load if not loaded yet."""
+        image_path = self._image_paths[row]
+        thumbnail = image_cache.get(("review", image_path, REVIEW_THUMBNAIL_SIZE))
+        boxes = self._boxes.get(image_path)
+        if thumbnail is not None and boxes is not None:
+            return thumbnail, boxes
+        if image_path not in self._pending:
+            self._pending.add(image_path)
+            self._queued_rows.append(row)
+            self._load_timer.start()
+        return None
+
+    def _start_loads(self):
+        rows = []
+        for row in self._queued_rows:
+            if self.is_row_visible(row):
+                rows.append(row)
+            else:
+                self._pending.discard(self._image_paths[row]) # Scrolled away, requested again when painted
+        self._queued_rows = []
+        generation = self._generation
+        for start in range(0, len(rows), REVIEW_LOAD_BATCH):
+            batch_rows = rows[start:start + REVIEW_LOAD_BATCH]
+            jobs = [(self._image_paths[row], self._label_paths[row]) for row in batch_rows]
+            run_in_background(load_review_cells, jobs, REVIEW_THUMBNAIL_SIZE,
+                              on_finished=lambda results, batch_rows=batch_rows: self._on_cells_loaded(generation, batch_rows, results))
+
+    def _on_cells_loaded(self, generation, rows, results):
+        if generation != self._generation:
+            return
+        for image_path, boxes in results:
+            self._pending.discard(image_path)
+            self._boxes[image_path] = boxes
+        self.dataChanged.emit(self.index(min(rows)), self.index(max(rows)))
+
+    def update_label_file(self, label_path, label_text):
+        """Updates the boxes of a cell after its label file was written (None if it was removed)."""
+        row = self._rows_by_label_path.get(label_path)
+        if row is None or self._image_paths[row] not in self._boxes:
+            return
+        self._boxes[self._image_paths[row]] = parse_normalized_boxes(label_text) if label_text else []
+        self.dataChanged.emit(self.index(row), self.index(row))
+
+    def refresh_statuses(self):
+        if self._image_paths:
+            self.dataChanged.emit(self.index(0), self.index(len(self._image_paths) - 1), [self.StatusRole])
+
+class ReviewGridDelegate(QStyledItemDelegate):
+    """Paints a grid cell: the thumbnail, its boxes in label colors, the file name and the status."""
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.label_colors = {} # {class_id: QColor}
+
+    def sizeHint(self, option, index):
+        side = REVIEW_THUMBNAIL_SIZE + 2 * REVIEW_CELL_MARGIN
+        return QSize(side, side + REVIEW_CAPTION_HEIGHT)
+
+    def paint(self, painter, option, index):
+        painter.save()
+        cell_rect = option.rect.adjusted(REVIEW_CELL_MARGIN // 2, REVIEW_CELL_MARGIN // 2, -REVIEW_CELL_MARGIN // 2, -REVIEW_CELL_MARGIN // 2)
+        selected = bool(option.state & QStyle.StateFlag.State_Selected)
+        painter.fillRect(cell_rect, option.palette.highlight() if selected else QColor("#202020"))
+
+        image_area = QRect(cell_rect.x() + REVIEW_CELL_MARGIN // 2, cell_rect.y() + REVIEW_CELL_MARGIN // 2,
+                           REVIEW_THUMBNAIL_SIZE, REVIEW_THUMBNAIL_SIZE)
+        cell = index.model().cell(index.row())
+        if cell is None:
+            painter.fillRect(image_area, QColor("#303030")) # Loading
+        else:
+            thumbnail, boxes = cell
+            if not thumbnail.isNull():
+                size = thumbnail.size().scaled(image_area.size(), Qt.AspectRatioMode.KeepAspectRatio)
+                target = QRect(image_area.x() + (image_area.width() - size.width()) // 2,
+                               image_area.y() + (image_area.height() - size.height()) // 2, size.width(), size.height())
+                painter.drawImage(target, thumbnail)
+                for class_id, center_x, center_y, width, height in boxes:
+                    painter.setPen(QPen(self.label_colors.get(class_id, QColor("white")), 1.5))
+                    painter.drawRect(QRectF(target.x() + (center_x - width / 2) * target.width(),
+                                            target.y() + (center_y - height / 2) * target.height(),
+                                            width * target.width(), height * target.height()))
+
+        caption_rect = QRect(cell_rect.x() + 4, image_area.bottom() + 2, cell_rect.width() - 8, REVIEW_CAPTION_HEIGHT)
+        status = index.data(ReviewGridModel.StatusRole)
+        if status in STATUS_COLORS:
+            painter.fillRect(QRect(caption_rect.x(), caption_rect.y() + 5, 8, 8), STATUS_COLORS[status])
+            caption_rect.adjust(12, 0, 0, 0)
+        painter.setPen(option.palette.highlightedText().color() if selected else QColor("#DDDDDD"))
+        name = painter.fontMetrics().elidedText(index.data(), Qt.TextElideMode.ElideMiddle, caption_rect.width())
+        painter.drawText(caption_rect, Qt.AlignmentFlag.AlignVCenter | Qt.AlignmentFlag.AlignLeft, name)
+        painter.restore()
+
+class ReviewGridWidget(QWidget):
+    """Contact sheet of the images in the image list, for accepting or rejecting many auto-labels at once."""
+    accept_requested = pyqtSignal(list) # Image paths whose labels were accepted
+    reject_requested = pyqtSignal(list) # Image paths whose labels were rejected
+    image_activated = pyqtSignal(str) # Image double-clicked, to be opened on the canvas
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        layout = QVBoxLayout(self)
+        buttons_layout = QHBoxLayout()
+        self.summary_label = QLabel("")
+        buttons_layout.addWidget(self.summary_label, 1)
+        self.select_all_button = QPushButton("Select All")
+        self.accept_button = QPushButton("Accept Selected")
+        self.reject_button = QPushButton("Reject Selected")
+        for button in (self.select_all_button, self.accept_button, self.reject_button):
+            buttons_layout.addWidget(button)
+        layout.addLayout(buttons_layout)
+
+        self.model = ReviewGridModel(self)
+        self.delegate = ReviewGridDelegate(self)
+        self.view = QListView()
+        self.view.setViewMode(QListView.ViewMode.IconMode)
+        self.view.setResizeMode(QListView.ResizeMode.Adjust)
+        self.view.setMovement(QListView.Movement.Static)
+        self.view.setUniformItemSizes(True) # Lets the view lay out 100k cells without asking for each size
+        self.view.setLayoutMode(QListView.LayoutMode.Batched)
+        self.view.setSelectionMode(QAbstractItemView.SelectionMode.ExtendedSelection)
+        self.view.setModel(self.model)
+        self.view.setItemDelegate(self.delegate)
+        layout.addWidget(self.view)
+        self.model.is_row_visible = self._is_row_visible
+
+        self.select_all_button.clicked.connect(self.view.selectAll)
+        self.accept_button.clicked.connect(lambda: self._emit_for_selection(self.accept_requested))
+        self.reject_button.clicked.connect(lambda: self._emit_for_selection(self.reject_requested))
+        self.view.doubleClicked.connect(lambda index: self.image_activated.emit(index.data(ReviewGridModel.ImagePathRole)))
+
+    def set_images(self, image_paths, label_paths, statuses):
+        self.model.set_images(image_paths, label_paths, statuses)
+        self.summary_label.setText(f"{len(image_paths)} images")
+
+    def set_label_colors(self, label_colors):
+        self.delegate.label_colors = label_colors
+        self.view.viewport().update()
+
+    def _is_row_visible(self, row):
+        return self.view.visualRect(self.model.index(row)).intersects(self.view.viewport().rect())
+
+    def _emit_for_selection(self, signal):
+        image_paths = [index.data(ReviewGridModel.ImagePathRole) for index in self.view.selectionModel().selectedIndexes()]
+        if image_paths:
+            signal.emit(image_paths)
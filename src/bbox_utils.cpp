@@ -1,10 +1,28 @@
 #include <pybind11/pybind11.h>
 #include <pybind11/stl.h> // For std::vector, std::string, etc.
+#include <pybind11/numpy.h> // For image tensors exchanged with inference runtimes
 #include <random>
 #include <string>
 #include <iomanip>    // For std::hex, std::setfill, std::setw
 #include <sstream>    // For std::stringstream
 #include <filesystem> // For directory iteration and path manipulation
+#include <fstream>    // For reading label files
+#include <thread>     // For the native worker threads
+#include <atomic>     // For distributing work items across threads
+#include <optional>   // For label files that may not exist
+#include <map>
+#include <unordered_set>
+#include <unordered_map> // For box store updates keyed by row
+#include <cmath>
+#include <cstdlib>    // For strtol / strtod
+#include <cstring>    // For memchr
+#include <cstdio>     // For snprintf
+#include <algorithm>
+#include <numeric>    // For std::iota
+#include <cstdint>
+#include <limits>
+#include <cctype>
+#include <bitset>     // For a portable popcount
 
 namespace py = pybind11;
 namespace fs = std::filesystem; // Alias for convenience
@@ -36,6 +54,1108 @@ struct PixelBoundingBox
     double height;
 };
 
+// Histogram layout used by DatasetStatistics. The layout is fixed so that statistics
+// computed on different threads (or incrementally after a save) can always be merged.
+const int STATISTICS_BOXES_PER_IMAGE_BINS = 51; // 0..49 boxes, last bin counts 50 or more
+const int STATISTICS_SIZE_BINS = 20;            // sqrt(w * h) of the normalized box over [0, 1]
+const int STATISTICS_ASPECT_RATIO_BINS = 16;    // log2(w / h) over [-4, 4]
+const double STATISTICS_ASPECT_RATIO_LOG2_RANGE = 4.0;
+
+// Structure holding aggregated statistics over a set of label files
+struct DatasetStatistics
+{
+    long long total_label_files = 0;   // Label files that exist on disk
+    long long empty_label_files = 0;   // Label files that exist but contain no boxes
+    long long missing_label_files = 0; // Images without a label file
+    long long total_boxes = 0;
+    long long invalid_lines = 0;       // Lines with fewer than 5 fields or unparsable numbers
+    std::map<int, long long> class_counts;
+    std::vector<long long> boxes_per_image = std::vector<long long>(STATISTICS_BOXES_PER_IMAGE_BINS, 0);
+    std::vector<long long> box_size_histogram = std::vector<long long>(STATISTICS_SIZE_BINS, 0);
+    std::vector<long long> aspect_ratio_histogram = std::vector<long long>(STATISTICS_ASPECT_RATIO_BINS, 0);
+
+    // Adds (sign = 1) or removes (sign = -1) the contribution of another statistics object
+    void merge(const DatasetStatistics &other, int sign)
+    {
+        total_label_files += sign * other.total_label_files;
+        empty_label_files += sign * other.empty_label_files;
+        missing_label_files += sign * other.missing_label_files;
+        total_boxes += sign * other.total_boxes;
+        invalid_lines += sign * other.invalid_lines;
+        for (const auto &entry : other.class_counts)
+        {
+            long long &count = class_counts[entry.first];
+            count += sign * entry.second;
+            if (count == 0)
+            {
+                class_counts.erase(entry.first);
+            }
+        }
+        for (size_t i = 0; i < boxes_per_image.size(); ++i)
+            boxes_per_image[i] += sign * other.boxes_per_image[i];
+        for (size_t i = 0; i < box_size_histogram.size(); ++i)
+            box_size_histogram[i] += sign * other.box_size_histogram[i];
+        for (size_t i = 0; i < aspect_ratio_histogram.size(); ++i)
+            aspect_ratio_histogram[i] += sign * other.aspect_ratio_histogram[i];
+    }
+};
+
+// Helper to pick the number of worker threads for a given amount of work
+unsigned int resolve_thread_count(int requested_threads, size_t work_items)
+{
+    unsigned int count = requested_threads > 0 ? static_cast<unsigned int>(requested_threads) : std::thread::hardware_concurrency();
+    if (count == 0)
+    {
+        count = 1;
+    }
+    if (work_items < count)
+    {
+        count = static_cast<unsigned int>(std::max<size_t>(work_items, 1));
+    }
+    return count;
+}
+
+// Helper that runs fn(worker_index, item_index) for every item, spreading the items over worker threads.
+// fn must not throw and must not touch Python objects.
+template <typename Fn>
+void parallel_for(size_t item_count, int requested_threads, Fn fn)
+{
+    unsigned int worker_count = resolve_thread_count(requested_threads, item_count);
+    if (worker_count <= 1)
+    {
+        for (size_t i = 0; i < item_count; ++i)
+        {
+            fn(0, i);
+        }
+        return;
+    }
+
+    std::atomic<size_t> next_item(0);
+    std::vector<std::thread> workers;
+    workers.reserve(worker_count);
+    for (unsigned int w = 0; w < worker_count; ++w)
+    {
+        workers.emplace_back([&, w]()
+                             {
+            size_t i;
+            while ((i = next_item.fetch_add(1)) < item_count)
+            {
+                fn(w, i);
+            } });
+    }
+    for (auto &worker : workers)
+    {
+        worker.join();
+    }
+}
+
+// Helper to read a whole file into a string. Returns false if the file cannot be opened.
+bool read_file_to_string(const std::string &path, std::string &content)
+{
+    std::ifstream file(path, std::ios::in | std::ios::binary);
+    if (!file)
+    {
+        return false;
+    }
+    file.seekg(0, std::ios::end);
+    std::streampos size = file.tellg();
+    if (size < 0)
+    {
+        return false;
+    }
+    content.resize(static_cast<size_t>(size));
+    file.seekg(0, std::ios::beg);
+    if (size > 0)
+    {
+        file.read(&content[0], size);
+    }
+    return true;
+}
+
+// Helper that parses YOLO label text line by line, calling on_box for every valid line.
+// Returns the number of non-empty lines that could not be parsed, including lines with nan or inf values.
+template <typename Fn>
+long long parse_yolo_label_text(const std::string &text, Fn on_box)
+{
+    long long invalid_lines = 0;
+    const char *cursor = text.c_str();
+    const char *end = cursor + text.size();
+    while (cursor < end)
+    {
+        const char *line_end = static_cast<const char *>(memchr(cursor, '\n', end - cursor));
+        if (line_end == nullptr)
+        {
+            line_end = end;
+        }
+        std::string line(cursor, line_end);
+        cursor = line_end + 1;
+
+        if (line.find_first_not_of(" \t\r") == std::string::npos)
+        {
+            continue; // Blank line
+        }
+
+        const char *p = line.c_str();
+        char *next = nullptr;
+        NormalizedBoundingBox box;
+        long class_id = std::strtol(p, &next, 10);
+        bool ok = next != p;
+        double values[4];
+        for (int i = 0; ok && i < 4; ++i)
+        {
+            p = next;
+            values[i] = std::strtod(p, &next);
+            ok = next != p && std::isfinite(values[i]); // strtod also accepts nan and inf
+        }
+        if (!ok)
+        {
+            ++invalid_lines;
+            continue;
+        }
+        box.class_id = static_cast<int>(class_id);
+        box.center_x = values[0];
+        box.center_y = values[1];
+        box.width = values[2];
+        box.height = values[3];
+        on_box(box);
+    }
+    return invalid_lines;
+}
+
+// Helper that adds the contribution of one box to a statistics object
+void accumulate_box_statistics(const NormalizedBoundingBox &box, DatasetStatistics &stats)
+{
+    ++stats.class_counts[box.class_id];
+    if (box.width > 0 && box.height > 0)
+    {
+        double size = std::sqrt(box.width * box.height);
+        int size_bin = static_cast<int>(size * STATISTICS_SIZE_BINS);
+        size_bin = std::max(0, std::min(STATISTICS_SIZE_BINS - 1, size_bin));
+        ++stats.box_size_histogram[size_bin];
+
+        double log_ratio = std::log2(box.width / box.height);
+        double position = (log_ratio + STATISTICS_ASPECT_RATIO_LOG2_RANGE) / (2 * STATISTICS_ASPECT_RATIO_LOG2_RANGE);
+        int ratio_bin = static_cast<int>(position * STATISTICS_ASPECT_RATIO_BINS);
+        ratio_bin = std::max(0, std::min(STATISTICS_ASPECT_RATIO_BINS - 1, ratio_bin));
+        ++stats.aspect_ratio_histogram[ratio_bin];
+    }
+}
+
+// Helper that counts one existing label file with box_count boxes in a statistics object
+void accumulate_label_file_statistics(long long box_count, DatasetStatistics &stats)
+{
+    ++stats.total_label_files;
+    stats.total_boxes += box_count;
+    if (box_count == 0)
+    {
+        ++stats.empty_label_files;
+    }
+    int count_bin = static_cast<int>(std::min<long long>(box_count, STATISTICS_BOXES_PER_IMAGE_BINS - 1));
+    ++stats.boxes_per_image[count_bin];
+}
+
+// Helper that adds the contribution of one label file's text to a statistics object
+void accumulate_label_text_statistics(const std::string &text, DatasetStatistics &stats)
+{
+    long long box_count = 0;
+    stats.invalid_lines += parse_yolo_label_text(text, [&](const NormalizedBoundingBox &box)
+                                                 {
+        ++box_count;
+        accumulate_box_statistics(box, stats); });
+    accumulate_label_file_statistics(box_count, stats);
+}
+
+// Function to compute the statistics contribution of a single label file's content.
+// Passing None describes an image without a label file.
+DatasetStatistics compute_label_text_statistics(const std::optional<std::string> &text)
+{
+    DatasetStatistics stats;
+    if (text)
+    {
+        accumulate_label_text_statistics(*text, stats);
+    }
+    else
+    {
+        ++stats.missing_label_files;
+        ++stats.boxes_per_image[0];
+    }
+    return stats;
+}
+
+// Function to scan many label files in a single multithreaded pass and aggregate their statistics
+DatasetStatistics compute_label_statistics(const std::vector<std::string> &label_paths, int num_threads)
+{
+    unsigned int worker_count = resolve_thread_count(num_threads, label_paths.size());
+    std::vector<DatasetStatistics> partial_stats(worker_count);
+
+    parallel_for(label_paths.size(), static_cast<int>(worker_count), [&](unsigned int worker, size_t i)
+                 {
+        std::string content;
+        DatasetStatistics &stats = partial_stats[worker];
+        if (read_file_to_string(label_paths[i], content))
+        {
+            accumulate_label_text_statistics(content, stats);
+        }
+        else
+        {
+            ++stats.missing_label_files;
+            ++stats.boxes_per_image[0];
+        } });
+
+    DatasetStatistics total;
+    for (const auto &stats : partial_stats)
+    {
+        total.merge(stats, 1);
+    }
+    return total;
+}
+
+std::vector<PixelBoundingBox> convert_from_yolo_format(
+    const std::vector<NormalizedBoundingBox> &yolo_boxes,
+    double original_width,
+    double original_height);
+
+// Helpers to read big/little endian integers from a byte buffer
+unsigned int read_be16(const unsigned char *p) { return (p[0] << 8) | p[1]; }
+unsigned int read_be32(const unsigned char *p) { return (static_cast<unsigned int>(p[0]) << 24) | (p[1] << 16) | (p[2] << 8) | p[3]; }
+unsigned int read_le16(const unsigned char *p) { return p[0] | (p[1] << 8); }
+unsigned int read_le24(const unsigned char *p) { return p[0] | (p[1] << 8) | (p[2] << 16); }
+unsigned int read_le32(const unsigned char *p) { return p[0] | (p[1] << 8) | (p[2] << 16) | (static_cast<unsigned int>(p[3]) << 24); }
+
+// Function to read the pixel dimensions of an image from its file header only (JPEG, PNG, GIF, BMP, WEBP).
+// Returns (0, 0) if the format is not recognised or the header is damaged.
+std::pair<int, int> read_image_size(const std::string &path)
+{
+    std::ifstream file(path, std::ios::in | std::ios::binary);
+    if (!file)
+    {
+        return {0, 0};
+    }
+    unsigned char header[32] = {0};
+    file.read(reinterpret_cast<char *>(header), sizeof(header));
+    std::streamsize header_size = file.gcount();
+
+    // PNG: signature followed by the IHDR chunk
+    if (header_size >= 24 && memcmp(header, "\x89PNG\r\n\x1a\n", 8) == 0)
+    {
+        return {static_cast<int>(read_be32(header + 16)), static_cast<int>(read_be32(header + 20))};
+    }
+    // GIF: logical screen descriptor
+    if (header_size >= 10 && (memcmp(header, "GIF87a", 6) == 0 || memcmp(header, "GIF89a", 6) == 0))
+    {
+        return {static_cast<int>(read_le16(header + 6)), static_cast<int>(read_le16(header + 8))};
+    }
+    // BMP: BITMAPINFOHEADER (height is negative for top-down bitmaps)
+    if (header_size >= 26 && header[0] == 'B' && header[1] == 'M')
+    {
+        int width = static_cast<int>(read_le32(header + 18));
+        int height = static_cast<int>(read_le32(header + 22));
+        return {width, std::abs(height)};
+    }
+    // WEBP: RIFF container with a VP8, VP8L or VP8X chunk
+    if (header_size >= 30 && memcmp(header, "RIFF", 4) == 0 && memcmp(header + 8, "WEBP", 4) == 0)
+    {
+        if (memcmp(header + 12, "VP8 ", 4) == 0)
+        {
+            return {static_cast<int>(read_le16(header + 26) & 0x3FFF), static_cast<int>(read_le16(header + 28) & 0x3FFF)};
+        }
+        if (memcmp(header + 12, "VP8L", 4) == 0)
+        {
+            unsigned int bits = read_le32(header + 21);
+            return {static_cast<int>((bits & 0x3FFF) + 1), static_cast<int>(((bits >> 14) & 0x3FFF) + 1)};
+        }
+        if (memcmp(header + 12, "VP8X", 4) == 0)
+        {
+            return {static_cast<int>(read_le24(header + 24) + 1), static_cast<int>(read_le24(header + 27) + 1)};
+        }
+        return {0, 0};
+    }
+    // JPEG: walk the marker segments until a start-of-frame marker
+    if (header_size >= 4 && header[0] == 0xFF && header[1] == 0xD8)
+    {
+        file.clear();
+        file.seekg(2, std::ios::beg);
+        unsigned char marker[4];
+        while (file.read(reinterpret_cast<char *>(marker), 2))
+        {
+            if (marker[0] != 0xFF)
+            {
+                return {0, 0};
+            }
+            unsigned char type = marker[1];
+            if (type == 0xFF)
+            {
+                file.seekg(-1, std::ios::cur); // Fill byte, re-read from the second 0xFF
+                continue;
+            }
+            if (type == 0xD8 || type == 0x01 || (type >= 0xD0 && type <= 0xD7))
+            {
+                continue; // Markers without a length field
+            }
+            if (!file.read(reinterpret_cast<char *>(marker), 2))
+            {
+                break;
+            }
+            unsigned int segment_length = read_be16(marker);
+            bool is_start_of_frame = type >= 0xC0 && type <= 0xCF && type != 0xC4 && type != 0xC8 && type != 0xCC;
+            if (is_start_of_frame)
+            {
+                unsigned char frame[5];
+                if (!file.read(reinterpret_cast<char *>(frame), 5))
+                {
+                    break;
+                }
+                return {static_cast<int>(read_be16(frame + 3)), static_cast<int>(read_be16(frame + 1))};
+            }
+            if (segment_length < 2)
+            {
+                break;
+            }
+            file.seekg(segment_length - 2, std::ios::cur);
+        }
+    }
+    return {0, 0};
+}
+
+// Helper to escape a string for embedding in JSON output
+std::string json_escape(const std::string &text)
+{
+    std::string escaped;
+    escaped.reserve(text.size() + 2);
+    for (unsigned char c : text)
+    {
+        switch (c)
+        {
+        case '"':
+            escaped += "\\\"";
+            break;
+        case '\\':
+            escaped += "\\\\";
+            break;
+        case '\n':
+            escaped += "\\n";
+            break;
+        case '\r':
+            escaped += "\\r";
+            break;
+        case '\t':
+            escaped += "\\t";
+            break;
+        default:
+            if (c < 0x20)
+            {
+                char buffer[8];
+                snprintf(buffer, sizeof(buffer), "\\u%04x", c);
+                escaped += buffer;
+            }
+            else
+            {
+                escaped += static_cast<char>(c);
+            }
+        }
+    }
+    return escaped;
+}
+
+// Structure holding one chunk of a COCO document as comma separated JSON fragments
+struct CocoChunk
+{
+    std::string images_json;      // Image objects, without the surrounding brackets
+    std::string annotations_json; // Annotation objects, without the surrounding brackets
+    long long image_count = 0;
+    long long annotation_count = 0;
+    std::vector<std::string> failed_images; // Images whose dimensions could not be read
+};
+
+// Function to convert a chunk of images and their YOLO label files into COCO JSON fragments.
+// Image headers and label files are read in parallel; ids are assigned sequentially from
+// first_image_id and first_annotation_id so that consecutive chunks can be concatenated.
+// image_sizes, if not empty, gives the (width, height) of every image instead of its header,
+// e.g. for archived images that have no file on disk.
+CocoChunk build_coco_chunk(
+    const std::vector<std::string> &image_paths,
+    const std::vector<std::string> &label_paths,
+    const std::vector<std::string> &file_names,
+    long long first_image_id,
+    long long first_annotation_id,
+    int num_threads,
+    const std::vector<std::pair<int, int>> &image_sizes)
+{
+    size_t count = std::min(image_paths.size(), std::min(label_paths.size(), file_names.size()));
+    if (!image_sizes.empty() && image_sizes.size() != count)
+        throw std::invalid_argument("build_coco_chunk: expected one image size per image");
+    std::vector<std::pair<int, int>> sizes(count);
+    std::vector<std::vector<NormalizedBoundingBox>> boxes(count);
+
+    parallel_for(count, num_threads, [&](unsigned int, size_t i)
+                 {
+        sizes[i] = image_sizes.empty() ? read_image_size(image_paths[i]) : image_sizes[i];
+        std::string content;
+        if (sizes[i].first > 0 && sizes[i].second > 0 && read_file_to_string(label_paths[i], content))
+        {
+            parse_yolo_label_text(content, [&](const NormalizedBoundingBox &box)
+                                  { boxes[i].push_back(box); });
+        } });
+
+    CocoChunk chunk;
+    std::stringstream images;
+    std::stringstream annotations;
+    images << std::setprecision(10);
+    annotations << std::setprecision(10);
+    long long annotation_id = first_annotation_id;
+    for (size_t i = 0; i < count; ++i)
+    {
+        int width = sizes[i].first;
+        int height = sizes[i].second;
+        if (width <= 0 || height <= 0)
+        {
+            chunk.failed_images.push_back(image_paths[i]);
+            continue;
+        }
+        long long image_id = first_image_id + static_cast<long long>(i);
+        if (chunk.image_count > 0)
+        {
+            images << ",\n";
+        }
+        images << "{\"id\": " << image_id << ", \"file_name\": \"" << json_escape(file_names[i])
+               << "\", \"width\": " << width << ", \"height\": " << height << "}";
+        ++chunk.image_count;
+
+        std::vector<NormalizedBoundingBox> normalized_boxes = boxes[i];
+        std::vector<PixelBoundingBox> pixel_boxes = convert_from_yolo_format(normalized_boxes, width, height);
+        for (const auto &p_box : pixel_boxes)
+        {
+            if (p_box.width <= 0 || p_box.height <= 0)
+            {
+                continue;
+            }
+            if (chunk.annotation_count > 0)
+            {
+                annotations << ",\n";
+            }
+            annotations << "{\"id\": " << annotation_id++ << ", \"image_id\": " << image_id
+                        << ", \"category_id\": " << p_box.class_id
+                        << ", \"bbox\": [" << p_box.x << ", " << p_box.y << ", " << p_box.width << ", " << p_box.height << "]"
+                        << ", \"area\": " << p_box.width * p_box.height << ", \"iscrowd\": 0}";
+            ++chunk.annotation_count;
+        }
+    }
+    chunk.images_json = images.str();
+    chunk.annotations_json = annotations.str();
+    return chunk;
+}
+
+// Helper to compute the intersection over union of two boxes given as [x1, y1, x2, y2, ...]
+double box_iou_xyxy(const std::vector<double> &a, const std::vector<double> &b)
+{
+    double inter_w = std::min(a[2], b[2]) - std::max(a[0], b[0]);
+    double inter_h = std::min(a[3], b[3]) - std::max(a[1], b[1]);
+    if (inter_w <= 0 || inter_h <= 0)
+    {
+        return 0.0;
+    }
+    double intersection = inter_w * inter_h;
+    double union_area = (a[2] - a[0]) * (a[3] - a[1]) + (b[2] - b[0]) * (b[3] - b[1]) - intersection;
+    return union_area > 0 ? intersection / union_area : 0.0;
+}
+
+// Function to run greedy non-maximum suppression on raw detections [x1, y1, x2, y2, conf, class_id].
+// With class_aware set, only boxes of the same class suppress each other.
+std::vector<std::vector<double>> non_max_suppression(
+    const std::vector<std::vector<double>> &raw_boxes,
+    double iou_threshold,
+    bool class_aware,
+    int max_detections)
+{
+    std::vector<size_t> order;
+    for (size_t i = 0; i < raw_boxes.size(); ++i)
+    {
+        if (raw_boxes[i].size() >= 6)
+        {
+            order.push_back(i);
+        }
+    }
+    std::sort(order.begin(), order.end(), [&](size_t a, size_t b)
+              { return raw_boxes[a][4] > raw_boxes[b][4]; });
+
+    std::vector<std::vector<double>> kept;
+    for (size_t index : order)
+    {
+        const auto &candidate = raw_boxes[index];
+        bool suppressed = false;
+        for (const auto &existing : kept)
+        {
+            if (class_aware && existing[5] != candidate[5])
+            {
+                continue;
+            }
+            if (box_iou_xyxy(existing, candidate) > iou_threshold)
+            {
+                suppressed = true;
+                break;
+            }
+        }
+        if (!suppressed)
+        {
+            kept.push_back(candidate);
+            if (max_detections > 0 && static_cast<int>(kept.size()) >= max_detections)
+            {
+                break;
+            }
+        }
+    }
+    return kept;
+}
+
+// Structure describing how an image was letterboxed into the square network input
+struct LetterboxInfo
+{
+    double scale;
+    double pad_x;
+    double pad_y;
+};
+
+// Function to letterbox an RGB888 image into a normalized float CHW tensor of shape (1, 3, size, size).
+// The image is resized with bilinear interpolation keeping its aspect ratio and padded with gray (114).
+py::tuple letterbox_image(py::buffer rgb_data, int width, int height, int bytes_per_line, int target_size)
+{
+    py::buffer_info info = rgb_data.request();
+    if (width <= 0 || height <= 0 || target_size <= 0 || static_cast<long long>(bytes_per_line) < static_cast<long long>(width) * 3 ||
+        info.size * info.itemsize < static_cast<py::ssize_t>(bytes_per_line) * height)
+    {
+        throw std::invalid_argument("letterbox_image: image buffer does not match the given dimensions");
+    }
+    const unsigned char *pixels = static_cast<const unsigned char *>(info.ptr);
+
+    LetterboxInfo letterbox;
+    letterbox.scale = std::min(static_cast<double>(target_size) / width, static_cast<double>(target_size) / height);
+    int resized_w = std::max(1, static_cast<int>(std::round(width * letterbox.scale)));
+    int resized_h = std::max(1, static_cast<int>(std::round(height * letterbox.scale)));
+    // The image is placed at a whole pixel offset, which is also the pad decode_yolo_output subtracts
+    int offset_x = (target_size - resized_w) / 2;
+    int offset_y = (target_size - resized_h) / 2;
+    letterbox.pad_x = offset_x;
+    letterbox.pad_y = offset_y;
+
+    py::array_t<float> tensor({1, 3, target_size, target_size});
+    float *out = tensor.mutable_data();
+    size_t plane = static_cast<size_t>(target_size) * target_size;
+    {
+        py::gil_scoped_release release;
+        std::fill(out, out + 3 * plane, 114.0f / 255.0f);
+        double x_ratio = static_cast<double>(width) / resized_w;
+        double y_ratio = static_cast<double>(height) / resized_h;
+        for (int y = 0; y < resized_h; ++y)
+        {
+            double src_y = std::max(0.0, (y + 0.5) * y_ratio - 0.5);
+            int y0 = std::min(static_cast<int>(src_y), height - 1);
+            int y1 = std::min(y0 + 1, height - 1);
+            double fy = src_y - y0;
+            const unsigned char *row0 = pixels + static_cast<size_t>(y0) * bytes_per_line;
+            const unsigned char *row1 = pixels + static_cast<size_t>(y1) * bytes_per_line;
+            size_t out_row = static_cast<size_t>(y + offset_y) * target_size + offset_x;
+            for (int x = 0; x < resized_w; ++x)
+            {
+                double src_x = std::max(0.0, (x + 0.5) * x_ratio - 0.5);
+                int x0 = std::min(static_cast<int>(src_x), width - 1);
+                int x1 = std::min(x0 + 1, width - 1);
+                double fx = src_x - x0;
+                for (int c = 0; c < 3; ++c)
+                {
+                    double top = row0[x0 * 3 + c] * (1 - fx) + row0[x1 * 3 + c] * fx;
+                    double bottom = row1[x0 * 3 + c] * (1 - fx) + row1[x1 * 3 + c] * fx;
+                    out[c * plane + out_row + x] = static_cast<float>((top * (1 - fy) + bottom * fy) / 255.0);
+                }
+            }
+        }
+    }
+    return py::make_tuple(tensor, letterbox.scale, letterbox.pad_x, letterbox.pad_y);
+}
+
+// Function to decode a YOLOv8-style output tensor of shape (1, 4 + num_classes, num_anchors) into raw
+// detections [x1, y1, x2, y2, conf, class_id] in original image pixels, followed by class-aware NMS.
+std::vector<std::vector<double>> decode_yolo_output(
+    py::array_t<float, py::array::c_style | py::array::forcecast> output,
+    double confidence_threshold,
+    double iou_threshold,
+    double scale,
+    double pad_x,
+    double pad_y,
+    double original_width,
+    double original_height,
+    int max_detections)
+{
+    if (output.ndim() != 3 || output.shape(1) < 5)
+    {
+        throw std::invalid_argument("decode_yolo_output: expected an output of shape (1, 4 + num_classes, num_anchors)");
+    }
+    const float *data = output.data();
+    size_t rows = static_cast<size_t>(output.shape(1));
+    size_t anchors = static_cast<size_t>(output.shape(2));
+
+    py::gil_scoped_release release;
+    std::vector<std::vector<double>> candidates;
+    for (size_t a = 0; a < anchors; ++a)
+    {
+        int best_class = -1;
+        float best_score = 0.0f;
+        for (size_t row = 4; row < rows; ++row)
+        {
+            float score = data[row * anchors + a];
+            if (score > best_score)
+            {
+                best_score = score;
+                best_class = static_cast<int>(row - 4);
+            }
+        }
+        if (best_class < 0 || best_score < confidence_threshold)
+        {
+            continue;
+        }
+        double cx = (data[a] - pad_x) / scale;
+        double cy = (data[anchors + a] - pad_y) / scale;
+        double w = data[2 * anchors + a] / scale;
+        double h = data[3 * anchors + a] / scale;
+        double x1 = std::max(0.0, cx - w / 2);
+        double y1 = std::max(0.0, cy - h / 2);
+        double x2 = std::min(original_width, cx + w / 2);
+        double y2 = std::min(original_height, cy + h / 2);
+        candidates.push_back({x1, y1, x2, y2, static_cast<double>(best_score), static_cast<double>(best_class)});
+    }
+    return non_max_suppression(candidates, iou_threshold, true, max_detections);
+}
+
+// Spatial index over pixel boxes: a uniform grid whose cell size follows the typical box size.
+// Boxes are stored as separate coordinate arrays so candidate IoU checks run over contiguous memory.
+class BoxGridIndex
+{
+public:
+    BoxGridIndex(double cell_size, double max_x, double max_y, size_t capacity)
+        : cell_size_(std::max(8.0, cell_size))
+    {
+        columns_ = std::min<long long>(4096, static_cast<long long>(std::max(1.0, max_x) / cell_size_) + 1);
+        rows_ = std::min<long long>(4096, static_cast<long long>(std::max(1.0, max_y) / cell_size_) + 1);
+        cells_.resize(static_cast<size_t>(columns_ * rows_));
+        x1_.reserve(capacity);
+        y1_.reserve(capacity);
+        x2_.reserve(capacity);
+        y2_.reserve(capacity);
+        class_ids_.reserve(capacity);
+    }
+
+    // Builds an index over boxes, with room for the later_boxes that may be inserted afterwards.
+    // Extent and cell size cover both sets, so boxes inserted later spread over the grid too.
+    static BoxGridIndex from_boxes(const std::vector<PixelBoundingBox> &boxes, const std::vector<PixelBoundingBox> &later_boxes)
+    {
+        double total_size = 0;
+        size_t sized_boxes = 0;
+        double max_x = 1, max_y = 1;
+        for (const auto *box_set : {&boxes, &later_boxes})
+        {
+            for (const auto &box : *box_set)
+            {
+                if (box.width <= 0 || box.height <= 0)
+                    continue;
+                total_size += std::max(box.width, box.height);
+                ++sized_boxes;
+                max_x = std::max(max_x, box.x + box.width);
+                max_y = std::max(max_y, box.y + box.height);
+            }
+        }
+        double cell_size = sized_boxes == 0 ? 64.0 : 2.0 * total_size / sized_boxes;
+        BoxGridIndex index(cell_size, max_x, max_y, boxes.size() + later_boxes.size());
+        for (const auto &box : boxes)
+        {
+            index.insert(box);
+        }
+        return index;
+    }
+
+    void insert(const PixelBoundingBox &box)
+    {
+        int index = static_cast<int>(x1_.size());
+        x1_.push_back(box.x);
+        y1_.push_back(box.y);
+        x2_.push_back(box.x + box.width);
+        y2_.push_back(box.y + box.height);
+        class_ids_.push_back(box.class_id);
+        seen_.push_back(0);
+        add_to_cells(index, box);
+    }
+
+    // Grows the indexed box at index to also cover box
+    void expand(int index, const PixelBoundingBox &box)
+    {
+        x1_[index] = std::min(x1_[index], box.x);
+        y1_[index] = std::min(y1_[index], box.y);
+        x2_[index] = std::max(x2_[index], box.x + box.width);
+        y2_[index] = std::max(y2_[index], box.y + box.height);
+        PixelBoundingBox grown;
+        grown.x = x1_[index];
+        grown.y = y1_[index];
+        grown.width = x2_[index] - x1_[index];
+        grown.height = y2_[index] - y1_[index];
+        add_to_cells(index, grown); // Cells it already occupied may be listed twice, queries skip repeats
+    }
+
+    bool overlaps(const PixelBoundingBox &box, double threshold, bool class_aware, bool intersection_over_smaller = false)
+    {
+        return find_overlap(box, threshold, class_aware, intersection_over_smaller) >= 0;
+    }
+
+    // Returns the index of an indexed box (of the same class when class_aware) overlapping box above threshold, or -1.
+    // Overlap is IoU, or intersection over the smaller area when intersection_over_smaller is set.
+    int find_overlap(const PixelBoundingBox &box, double threshold, bool class_aware, bool intersection_over_smaller = false)
+    {
+        ++query_stamp_;
+        double bx1 = box.x, by1 = box.y, bx2 = box.x + box.width, by2 = box.y + box.height;
+        double box_area = box.width * box.height;
+        auto check = [&](int i)
+        {
+            if (seen_[i] == query_stamp_)
+                return false;
+            seen_[i] = query_stamp_;
+            if (class_aware && class_ids_[i] != box.class_id)
+                return false;
+            double inter_w = std::min(bx2, x2_[i]) - std::max(bx1, x1_[i]);
+            double inter_h = std::min(by2, y2_[i]) - std::max(by1, y1_[i]);
+            if (inter_w <= 0 || inter_h <= 0)
+                return false;
+            double intersection = inter_w * inter_h;
+            double other_area = (x2_[i] - x1_[i]) * (y2_[i] - y1_[i]);
+            double denominator = intersection_over_smaller ? std::min(box_area, other_area) : box_area + other_area - intersection;
+            return denominator > 0 && intersection / denominator > threshold;
+        };
+        for (int i : large_boxes_)
+            if (check(i))
+                return i;
+        long long c0, r0, c1, r1;
+        cell_range(box, c0, r0, c1, r1);
+        for (long long r = r0; r <= r1; ++r)
+            for (long long c = c0; c <= c1; ++c)
+                for (int i : cells_[static_cast<size_t>(r * columns_ + c)])
+                    if (check(i))
+                        return i;
+        return -1;
+    }
+
+private:
+    void add_to_cells(int index, const PixelBoundingBox &box)
+    {
+        long long c0, r0, c1, r1;
+        cell_range(box, c0, r0, c1, r1);
+        if ((c1 - c0 + 1) * (r1 - r0 + 1) > 64)
+        {
+            if (std::find(large_boxes_.begin(), large_boxes_.end(), index) == large_boxes_.end())
+                large_boxes_.push_back(index); // Spans too many cells, always checked
+            return;
+        }
+        for (long long r = r0; r <= r1; ++r)
+            for (long long c = c0; c <= c1; ++c)
+                cells_[static_cast<size_t>(r * columns_ + c)].push_back(index);
+    }
+
+    void cell_range(const PixelBoundingBox &box, long long &c0, long long &r0, long long &c1, long long &r1) const
+    {
+        auto clamp_cell = [](double value, long long limit)
+        { return std::max<long long>(0, std::min<long long>(limit - 1, static_cast<long long>(value))); };
+        c0 = clamp_cell(box.x / cell_size_, columns_);
+        r0 = clamp_cell(box.y / cell_size_, rows_);
+        c1 = clamp_cell((box.x + box.width) / cell_size_, columns_);
+        r1 = clamp_cell((box.y + box.height) / cell_size_, rows_);
+    }
+
+    double cell_size_;
+    long long columns_, rows_;
+    std::vector<std::vector<int>> cells_;
+    std::vector<int> large_boxes_;
+    std::vector<double> x1_, y1_, x2_, y2_;
+    std::vector<int> class_ids_;
+    std::vector<unsigned int> seen_;
+    unsigned int query_stamp_ = 0;
+};
+
+// Function to merge new detections into a set of existing (human-drawn) boxes.
+// A detection is dropped if it overlaps an existing box, or an already accepted detection, above
+// iou_threshold (only boxes of the same class are compared when class_aware). Existing boxes always
+// win conflicts; only the genuinely new detections are returned, in their original order.
+std::vector<PixelBoundingBox> merge_detections(
+    const std::vector<PixelBoundingBox> &existing_boxes,
+    const std::vector<PixelBoundingBox> &new_boxes,
+    double iou_threshold,
+    bool class_aware)
+{
+    BoxGridIndex index = BoxGridIndex::from_boxes(existing_boxes, new_boxes);
+    std::vector<PixelBoundingBox> accepted;
+    for (const auto &box : new_boxes)
+    {
+        if (box.width <= 0 || box.height <= 0 || index.overlaps(box, iou_threshold, class_aware))
+        {
+            continue;
+        }
+        index.insert(box);
+        accepted.push_back(box);
+    }
+    return accepted;
+}
+
+// Result of propagate_boxes: the boxes for the new image and how each previous box was obtained.
+struct PropagationResult
+{
+    std::vector<PixelBoundingBox> boxes;
+    int refined = 0; // Previous boxes that took the geometry of a matched detection
+    int carried = 0; // Previous boxes copied unchanged because no detection matched them
+};
+
+// Function to compute the IoU of two boxes given as x, y, width, height.
+double pixel_box_iou(const PixelBoundingBox &a, const PixelBoundingBox &b)
+{
+    double intersection_width = std::min(a.x + a.width, b.x + b.width) - std::max(a.x, b.x);
+    double intersection_height = std::min(a.y + a.height, b.y + b.height) - std::max(a.y, b.y);
+    if (intersection_width <= 0 || intersection_height <= 0)
+    {
+        return 0.0;
+    }
+    double intersection = intersection_width * intersection_height;
+    double union_area = a.width * a.height + b.width * b.height - intersection;
+    return union_area > 0 ? intersection / union_area : 0.0;
+}
+
+// Function to solve a square assignment problem minimizing the total cost (row-major n x n matrix)
+// with the Hungarian algorithm in its O(n^3) shortest augmenting path form. Returns the column of each row.
+std::vector<int> solve_assignment(const std::vector<double> &cost, int n)
+{
+    const double infinity = std::numeric_limits<double>::infinity();
+    std::vector<double> row_potential(n + 1, 0.0), column_potential(n + 1, 0.0), min_slack(n + 1);
+    std::vector<int> row_of_column(n + 1, 0), previous_column(n + 1, 0);
+    std::vector<char> visited(n + 1);
+    for (int row = 1; row <= n; ++row)
+    {
+        // Column 0 is a virtual start column; grow alternating paths from it until a free column is reached
+        row_of_column[0] = row;
+        int column = 0;
+        std::fill(min_slack.begin(), min_slack.end(), infinity);
+        std::fill(visited.begin(), visited.end(), 0);
+        do
+        {
+            visited[column] = 1;
+            int current_row = row_of_column[column];
+            int next_column = 0;
+            double delta = infinity;
+            for (int j = 1; j <= n; ++j)
+            {
+                if (visited[j])
+                {
+                    continue;
+                }
+                double slack = cost[(current_row - 1) * n + (j - 1)] - row_potential[current_row] - column_potential[j];
+                if (slack < min_slack[j])
+                {
+                    min_slack[j] = slack;
+                    previous_column[j] = column;
+                }
+                if (min_slack[j] < delta)
+                {
+                    delta = min_slack[j];
+                    next_column = j;
+                }
+            }
+            for (int j = 0; j <= n; ++j)
+            {
+                if (visited[j])
+                {
+                    row_potential[row_of_column[j]] += delta;
+                    column_potential[j] -= delta;
+                }
+                else
+                {
+                    min_slack[j] -= delta;
+                }
+            }
+            column = next_column;
+        } while (row_of_column[column] != 0);
+        // Flip the augmenting path
+        do
+        {
+            int previous = previous_column[column];
+            row_of_column[column] = row_of_column[previous];
+            column = previous;
+        } while (column != 0);
+    }
+    std::vector<int> column_of_row(n, -1);
+    for (int j = 1; j <= n; ++j)
+    {
+        if (row_of_column[j] != 0)
+        {
+            column_of_row[row_of_column[j] - 1] = j - 1;
+        }
+    }
+    return column_of_row;
+}
+
+// Function to bring the boxes of the previous image forward onto the next one.
+// Previous boxes are matched one-to-one to detections on the new image by maximizing the total IoU
+// (Hungarian algorithm); pairs below match_iou, or of different classes when class_aware, never match.
+// A matched box keeps its class but takes the detection's geometry; unmatched boxes are carried over
+// unchanged. Unmatched detections are not added. Boxes are clipped to the new image.
+PropagationResult propagate_boxes(
+    const std::vector<PixelBoundingBox> &previous_boxes,
+    const std::vector<PixelBoundingBox> &detections,
+    double match_iou,
+    bool class_aware,
+    double image_width,
+    double image_height)
+{
+    // Only boxes with at least one acceptable partner take part in the assignment
+    std::vector<int> rows, columns;
+    std::vector<int> column_index(detections.size(), -1);
+    std::vector<double> iou(previous_boxes.size() * detections.size(), 0.0);
+    for (size_t i = 0; i < previous_boxes.size(); ++i)
+    {
+        bool has_partner = false;
+        for (size_t j = 0; j < detections.size(); ++j)
+        {
+            if (class_aware && previous_boxes[i].class_id != detections[j].class_id)
+            {
+                continue;
+            }
+            double overlap = pixel_box_iou(previous_boxes[i], detections[j]);
+            if (overlap >= match_iou && overlap > 0)
+            {
+                iou[i * detections.size() + j] = overlap;
+                has_partner = true;
+                if (column_index[j] < 0)
+                {
+                    column_index[j] = static_cast<int>(columns.size());
+                    columns.push_back(static_cast<int>(j));
+                }
+            }
+        }
+        if (has_partner)
+        {
+            rows.push_back(static_cast<int>(i));
+        }
+    }
+
+    std::vector<int> match(previous_boxes.size(), -1);
+    int n = static_cast<int>(std::max(rows.size(), columns.size()));
+    if (n > 0)
+    {
+        // Cost 1 - IoU; padding and unacceptable pairs cost 1, the same as leaving a box unmatched
+        std::vector<double> cost(static_cast<size_t>(n) * n, 1.0);
+        for (size_t r = 0; r < rows.size(); ++r)
+        {
+            for (size_t c = 0; c < columns.size(); ++c)
+            {
+                cost[r * n + c] = 1.0 - iou[rows[r] * detections.size() + columns[c]];
+            }
+        }
+        std::vector<int> assignment = solve_assignment(cost, n);
+        for (size_t r = 0; r < rows.size(); ++r)
+        {
+            int c = assignment[r];
+            if (c >= 0 && c < static_cast<int>(columns.size()) && iou[rows[r] * detections.size() + columns[c]] > 0)
+            {
+                match[rows[r]] = columns[c];
+            }
+        }
+    }
+
+    PropagationResult result;
+    for (size_t i = 0; i < previous_boxes.size(); ++i)
+    {
+        PixelBoundingBox box = previous_boxes[i];
+        if (match[i] >= 0)
+        {
+            const PixelBoundingBox &detection = detections[match[i]];
+            box.x = detection.x;
+            box.y = detection.y;
+            box.width = detection.width;
+            box.height = detection.height;
+            ++result.refined;
+        }
+        else
+        {
+            ++result.carried;
+        }
+        double x1 = std::clamp(box.x, 0.0, image_width), y1 = std::clamp(box.y, 0.0, image_height);
+        double x2 = std::clamp(box.x + box.width, 0.0, image_width), y2 = std::clamp(box.y + box.height, 0.0, image_height);
+        if (x2 - x1 < 1.0 || y2 - y1 < 1.0)
+        {
+            continue; // Moved out of the image
+        }
+        if (x1 != box.x || x2 != box.x + box.width) // Only touch clipped sides, so carried boxes stay exact
+        {
+            box.x = x1;
+            box.width = x2 - x1;
+        }
+        if (y1 != box.y || y2 != box.y + box.height)
+        {
+            box.y = y1;
+            box.height = y2 - y1;
+        }
+        result.boxes.push_back(box);
+    }
+    return result;
+}
+
+// Function to merge raw [x1, y1, x2, y2, conf, class_id] detections collected from overlapping tiles.
+// Detections are visited by descending confidence; when one's intersection with an already kept detection
+// of the same class covers more than match_threshold of the smaller box, the kept detection grows to cover
+// both instead (greedy box merging), so copies of an object cut by a tile border join back into one box.
+// A spatial grid keeps this near linear.
+std::vector<std::vector<double>> merge_tile_detections(
+    const std::vector<std::vector<double>> &raw_boxes,
+    double match_threshold,
+    double image_width,
+    double image_height)
+{
+    std::vector<size_t> order;
+    for (size_t i = 0; i < raw_boxes.size(); ++i)
+    {
+        if (raw_boxes[i].size() >= 6 && raw_boxes[i][2] > raw_boxes[i][0] && raw_boxes[i][3] > raw_boxes[i][1])
+        {
+            order.push_back(i);
+        }
+    }
+    std::stable_sort(order.begin(), order.end(), [&](size_t a, size_t b)
+                     { return raw_boxes[a][4] > raw_boxes[b][4]; });
+
+    double total_size = 0;
+    for (size_t i : order)
+    {
+        total_size += std::max(raw_boxes[i][2] - raw_boxes[i][0], raw_boxes[i][3] - raw_boxes[i][1]);
+    }
+    double cell_size = order.empty() ? 64.0 : 2.0 * total_size / order.size();
+    BoxGridIndex index(cell_size, image_width, image_height, order.size());
+
+    std::vector<std::vector<double>> kept;
+    for (size_t i : order)
+    {
+        const auto &raw = raw_boxes[i];
+        PixelBoundingBox box;
+        box.class_id = static_cast<int>(raw[5]);
+        box.x = raw[0];
+        box.y = raw[1];
+        box.width = raw[2] - raw[0];
+        box.height = raw[3] - raw[1];
+        int match = index.find_overlap(box, match_threshold, true, true);
+        if (match >= 0)
+        {
+            auto &merged = kept[match];
+            merged[0] = std::min(merged[0], raw[0]);
+            merged[1] = std::min(merged[1], raw[1]);
+            merged[2] = std::max(merged[2], raw[2]);
+            merged[3] = std::max(merged[3], raw[3]);
+            index.expand(match, box);
+            continue;
+        }
+        index.insert(box);
+        kept.push_back(raw);
+    }
+    return kept;
+}
+
 // Function to convert pixel bounding boxes to normalized YOLO format
 std::vector<NormalizedBoundingBox> convert_to_yolo_format(
     const std::vector<PixelBoundingBox> &pixel_boxes,
@@ -43,165 +1163,1307 @@ std::vector<NormalizedBoundingBox> convert_to_yolo_format(
     double original_height)
 {
 
-    std::vector<NormalizedBoundingBox> yolo_boxes;
-    for (const auto &p_box : pixel_boxes)
+    std::vector<NormalizedBoundingBox> yolo_boxes;
+    for (const auto &p_box : pixel_boxes)
+    {
+        if (p_box.width <= 0 || p_box.height <= 0)
+        {
+            continue;
+        }
+
+        double center_x = (p_box.x + p_box.width / 2) / original_width;
+        double center_y = (p_box.y + p_box.height / 2) / original_height;
+        double width = p_box.width / original_width;
+        double height = p_box.height / original_height;
+
+        yolo_boxes.push_back({p_box.class_id, center_x, center_y, width, height});
+    }
+    return yolo_boxes;
+}
+
+// Function to convert normalized YOLO bounding boxes to pixel format
+std::vector<PixelBoundingBox> convert_from_yolo_format(
+    const std::vector<NormalizedBoundingBox> &yolo_boxes,
+    double original_width,
+    double original_height)
+{
+
+    std::vector<PixelBoundingBox> pixel_boxes;
+    for (const auto &n_box : yolo_boxes)
+    {
+        double x = (n_box.center_x - n_box.width / 2) * original_width;
+        double y = (n_box.center_y - n_box.height / 2) * original_height;
+        double w = n_box.width * original_width;
+        double h = n_box.height * original_height;
+
+        pixel_boxes.push_back({n_box.class_id, x, y, w, h});
+    }
+    return pixel_boxes;
+}
+
+// Function to scan a directory for image files and determine their label status.
+// candidate_paths replaces the directory listing when given, for images that are not files of the
+// directory (e.g. members of an archive given virtual paths inside it); labels are still looked up there.
+std::vector<ImageInfo> scan_images_and_labels(const std::string &folder_path, const std::vector<std::string> &supported_extensions,
+                                              const std::optional<std::vector<std::string>> &candidate_paths)
+{
+    std::vector<ImageInfo> image_infos;
+    fs::path dataset_folder_path(folder_path);
+
+    if (!fs::exists(dataset_folder_path) || !fs::is_directory(dataset_folder_path))
+    {
+        return image_infos; // Return empty if path doesn't exist or isn't a directory
+    }
+
+    std::vector<fs::path> paths;
+    if (candidate_paths)
+    {
+        paths.assign(candidate_paths->begin(), candidate_paths->end());
+    }
+    else
+    {
+        for (const auto &entry : fs::directory_iterator(dataset_folder_path))
+        {
+            if (fs::is_regular_file(entry.path()))
+            {
+                paths.push_back(entry.path());
+            }
+        }
+    }
+
+    for (const auto &path : paths)
+    {
+        std::string file_extension = path.extension().string();
+        if (!file_extension.empty())
+        {
+            file_extension = file_extension.substr(1); // Remove the leading dot
+        }
+
+        // Convert to lowercase for case-insensitive comparison
+        std::transform(file_extension.begin(), file_extension.end(), file_extension.begin(),
+                       [](unsigned char c)
+                       { return std::tolower(c); });
+
+        bool is_supported_image = false;
+        for (const auto &ext : supported_extensions)
+        {
+            if (file_extension == ext)
+            {
+                is_supported_image = true;
+                break;
+            }
+        }
+
+        if (is_supported_image)
+        {
+            ImageInfo info;
+            info.path = path.string();
+
+            // Construct label file path
+            std::string filename_stem = path.stem().string();
+            fs::path label_filepath = dataset_folder_path / (filename_stem + ".txt");
+
+            std::error_code error;
+            info.is_labelled = fs::exists(label_filepath, error) && fs::file_size(label_filepath, error) > 0;
+            image_infos.push_back(info);
+        }
+    }
+    return image_infos;
+}
+
+// Function to generate a random color in hex string format
+std::string generate_random_color()
+{
+    thread_local std::mt19937 gen(std::random_device{}()); // One generator per thread, callers may run concurrently
+    std::uniform_int_distribution<> distrib(0, 255);
+    int r = 0, g = 0, b = 0;
+
+    // Ensure reasonable brightness (not too dark or too light)
+    // This is a simplified version of the Python logic, aiming for a mid-range brightness
+    while ((r + g + b < 300) || (r + g + b > 600))
+    {
+        r = distrib(gen);
+        g = distrib(gen);
+        b = distrib(gen);
+    }
+
+    std::stringstream ss;
+    ss << "#" << std::hex << std::setfill('0') << std::setw(2) << r
+       << std::setfill('0') << std::setw(2) << g
+       << std::setfill('0') << std::setw(2) << b;
+    return ss.str();
+}
+
+// Function to process raw YOLO results into a list of PixelBoundingBox
+std::vector<PixelBoundingBox> process_yolo_results(
+    const std::vector<std::vector<double>> &raw_boxes, // Each inner vector: [x1, y1, x2, y2, conf, class_id]
+    double confidence_threshold)
+{
+
+    std::vector<PixelBoundingBox> new_boxes;
+    for (const auto &box_data : raw_boxes)
+    {
+        if (box_data.size() >= 6)
+        {
+            double x1 = box_data[0];
+            double y1 = box_data[1];
+            double x2 = box_data[2];
+            double y2 = box_data[3];
+            double conf = box_data[4];
+            int class_id = static_cast<int>(box_data[5]);
+
+            if (conf > confidence_threshold)
+            {
+                double w = x2 - x1;
+                double h = y2 - y1;
+                new_boxes.push_back({class_id, x1, y1, w, h});
+            }
+        }
+    }
+    return new_boxes;
+}
+
+// Function to format a list of NormalizedBoundingBox objects into a single string
+std::string format_yolo_labels_to_string(const std::vector<NormalizedBoundingBox> &yolo_boxes)
+{
+    std::string text;
+    text.reserve(yolo_boxes.size() * 48);
+    char line[160];
+    for (const auto &y_box : yolo_boxes)
+    {
+        // Same output as std::fixed with a precision of 6, without the stream overhead
+        int length = std::snprintf(line, sizeof(line), "%d %.6f %.6f %.6f %.6f\n",
+                                   y_box.class_id, y_box.center_x, y_box.center_y, y_box.width, y_box.height);
+        if (length < static_cast<int>(sizeof(line)))
+        {
+            text.append(line, static_cast<size_t>(std::max(length, 0)));
+            continue;
+        }
+        std::string long_line(static_cast<size_t>(length) + 1, '\0'); // Absurdly large coordinates
+        std::snprintf(&long_line[0], long_line.size(), "%d %.6f %.6f %.6f %.6f\n",
+                      y_box.class_id, y_box.center_x, y_box.center_y, y_box.width, y_box.height);
+        long_line.resize(static_cast<size_t>(length));
+        text += long_line;
+    }
+    return text;
+}
+
+// Helper to check that per-image arguments of a batch function have one entry per image
+void check_batch_sizes(const char *function_name, size_t image_count, size_t width_count, size_t height_count)
+{
+    if (width_count != image_count || height_count != image_count)
+    {
+        throw std::invalid_argument(std::string(function_name) + ": expected one width and one height per image");
+    }
+}
+
+// Function to convert the pixel boxes of many images to normalized YOLO format in parallel.
+std::vector<std::vector<NormalizedBoundingBox>> convert_to_yolo_format_batch(
+    const std::vector<std::vector<PixelBoundingBox>> &pixel_boxes_per_image,
+    const std::vector<double> &image_widths,
+    const std::vector<double> &image_heights,
+    int num_threads)
+{
+    check_batch_sizes("convert_to_yolo_format_batch", pixel_boxes_per_image.size(), image_widths.size(), image_heights.size());
+    std::vector<std::vector<NormalizedBoundingBox>> results(pixel_boxes_per_image.size());
+    parallel_for(pixel_boxes_per_image.size(), num_threads, [&](unsigned int, size_t i)
+                 { results[i] = convert_to_yolo_format(pixel_boxes_per_image[i], image_widths[i], image_heights[i]); });
+    return results;
+}
+
+// Function to convert the normalized YOLO boxes of many images to pixel boxes in parallel.
+std::vector<std::vector<PixelBoundingBox>> convert_from_yolo_format_batch(
+    const std::vector<std::vector<NormalizedBoundingBox>> &yolo_boxes_per_image,
+    const std::vector<double> &image_widths,
+    const std::vector<double> &image_heights,
+    int num_threads)
+{
+    check_batch_sizes("convert_from_yolo_format_batch", yolo_boxes_per_image.size(), image_widths.size(), image_heights.size());
+    std::vector<std::vector<PixelBoundingBox>> results(yolo_boxes_per_image.size());
+    parallel_for(yolo_boxes_per_image.size(), num_threads, [&](unsigned int, size_t i)
+                 { results[i] = convert_from_yolo_format(yolo_boxes_per_image[i], image_widths[i], image_heights[i]); });
+    return results;
+}
+
+// Function to filter the raw detections of many images by confidence and convert them to pixel boxes in parallel.
+std::vector<std::vector<PixelBoundingBox>> process_yolo_results_batch(
+    const std::vector<std::vector<std::vector<double>>> &raw_boxes_per_image,
+    double confidence_threshold,
+    int num_threads)
+{
+    std::vector<std::vector<PixelBoundingBox>> results(raw_boxes_per_image.size());
+    parallel_for(raw_boxes_per_image.size(), num_threads, [&](unsigned int, size_t i)
+                 { results[i] = process_yolo_results(raw_boxes_per_image[i], confidence_threshold); });
+    return results;
+}
+
+// Function to turn the pixel boxes of many images into YOLO label file contents in parallel:
+// conversion to normalized coordinates and formatting in one pass per image.
+std::vector<std::string> format_yolo_label_texts(
+    const std::vector<std::vector<PixelBoundingBox>> &pixel_boxes_per_image,
+    const std::vector<double> &image_widths,
+    const std::vector<double> &image_heights,
+    int num_threads)
+{
+    check_batch_sizes("format_yolo_label_texts", pixel_boxes_per_image.size(), image_widths.size(), image_heights.size());
+    std::vector<std::string> texts(pixel_boxes_per_image.size());
+    parallel_for(pixel_boxes_per_image.size(), num_threads, [&](unsigned int, size_t i)
+                 { texts[i] = format_yolo_labels_to_string(convert_to_yolo_format(pixel_boxes_per_image[i], image_widths[i], image_heights[i])); });
+    return texts;
+}
+
+// Width and height of the grayscale difference-hash grid (one column more than the 8 bits per row)
+const int DHASH_GRID_WIDTH = 9;
+const int DHASH_GRID_HEIGHT = 8;
+
+// Function to compute 64-bit difference hashes (dHash) of a batch of small grayscale thumbnails.
+// thumbnails holds count images of width x height bytes each, packed without row padding. Every
+// thumbnail is area-averaged down to a 9x8 grid; bit (row * 8 + column) is set when a cell is
+// brighter than its right neighbour.
+std::vector<uint64_t> compute_dhashes(py::buffer thumbnails, size_t count, int width, int height, int num_threads)
+{
+    py::buffer_info info = thumbnails.request();
+    size_t image_bytes = static_cast<size_t>(width) * height;
+    if (width < DHASH_GRID_WIDTH || height < DHASH_GRID_HEIGHT || static_cast<size_t>(info.size * info.itemsize) < image_bytes * count)
+    {
+        throw std::invalid_argument("compute_dhashes: thumbnail buffer does not match the given dimensions");
+    }
+    const unsigned char *pixels = static_cast<const unsigned char *>(info.ptr);
+
+    std::vector<uint64_t> hashes(count, 0);
+    py::gil_scoped_release release;
+    parallel_for(count, num_threads, [&](unsigned int, size_t i)
+                 {
+        const unsigned char *image = pixels + i * image_bytes;
+        double grid[DHASH_GRID_HEIGHT][DHASH_GRID_WIDTH];
+        for (int gy = 0; gy < DHASH_GRID_HEIGHT; ++gy)
+        {
+            int y0 = gy * height / DHASH_GRID_HEIGHT, y1 = (gy + 1) * height / DHASH_GRID_HEIGHT;
+            for (int gx = 0; gx < DHASH_GRID_WIDTH; ++gx)
+            {
+                int x0 = gx * width / DHASH_GRID_WIDTH, x1 = (gx + 1) * width / DHASH_GRID_WIDTH;
+                double sum = 0;
+                for (int y = y0; y < y1; ++y)
+                    for (int x = x0; x < x1; ++x)
+                        sum += image[static_cast<size_t>(y) * width + x];
+                grid[gy][gx] = sum / ((y1 - y0) * (x1 - x0));
+            }
+        }
+        uint64_t hash = 0;
+        for (int gy = 0; gy < DHASH_GRID_HEIGHT; ++gy)
+            for (int gx = 0; gx < DHASH_GRID_WIDTH - 1; ++gx)
+                if (grid[gy][gx] > grid[gy][gx + 1])
+                    hash |= uint64_t(1) << (gy * (DHASH_GRID_WIDTH - 1) + gx);
+        hashes[i] = hash; });
+    return hashes;
+}
+
+// Union-find over item indices; the root of a set is always its smallest index
+struct DisjointSets
+{
+    std::vector<int> parent;
+
+    explicit DisjointSets(size_t count) : parent(count) { std::iota(parent.begin(), parent.end(), 0); }
+
+    int find(int i)
+    {
+        while (parent[i] != i)
+        {
+            parent[i] = parent[parent[i]];
+            i = parent[i];
+        }
+        return i;
+    }
+
+    void unite(int a, int b)
+    {
+        a = find(a);
+        b = find(b);
+        if (a != b)
+            parent[std::max(a, b)] = std::min(a, b);
+    }
+};
+
+// Function to group 64-bit perceptual hashes into near-duplicate clusters.
+// Two hashes are linked when their Hamming distance is at most max_distance, and clusters are the
+// transitive closure of those links. Multi-index hashing keeps this fast: the hash is split into
+// max_distance + 1 bit ranges, and any two linked hashes must agree exactly on at least one of them,
+// so only hashes sharing a range value are compared (one range per worker thread).
+// Returns, per input hash, the index of the first member of its cluster.
+std::vector<int> find_near_duplicate_clusters(const std::vector<uint64_t> &hashes, int max_distance, int num_threads)
+{
+    max_distance = std::max(0, std::min(max_distance, 31));
+    // Identical hashes are always in one cluster, so only distinct values need comparing
+    std::vector<uint64_t> unique_hashes(hashes);
+    std::sort(unique_hashes.begin(), unique_hashes.end());
+    unique_hashes.erase(std::unique(unique_hashes.begin(), unique_hashes.end()), unique_hashes.end());
+
+    int range_count = max_distance + 1;
+    std::vector<DisjointSets> range_sets;
+    range_sets.reserve(range_count);
+    for (int r = 0; r < range_count; ++r)
+        range_sets.emplace_back(unique_hashes.size());
+
+    parallel_for(static_cast<size_t>(range_count), num_threads, [&](unsigned int, size_t r)
+                 {
+        int first_bit = static_cast<int>(r * 64 / range_count);
+        int last_bit = static_cast<int>((r + 1) * 64 / range_count);
+        uint64_t mask = (last_bit - first_bit == 64) ? ~uint64_t(0) : ((uint64_t(1) << (last_bit - first_bit)) - 1) << first_bit;
+        std::vector<std::pair<uint64_t, int>> keyed(unique_hashes.size());
+        for (size_t i = 0; i < unique_hashes.size(); ++i)
+            keyed[i] = {unique_hashes[i] & mask, static_cast<int>(i)};
+        std::sort(keyed.begin(), keyed.end());
+        DisjointSets &sets = range_sets[r];
+        for (size_t start = 0; start < keyed.size();)
+        {
+            size_t end = start + 1;
+            while (end < keyed.size() && keyed[end].first == keyed[start].first)
+                ++end;
+            for (size_t a = start; a < end; ++a)
+                for (size_t b = a + 1; b < end; ++b)
+                {
+                    int ia = keyed[a].second, ib = keyed[b].second;
+                    if (static_cast<int>(std::bitset<64>(unique_hashes[ia] ^ unique_hashes[ib]).count()) <= max_distance)
+                        sets.unite(ia, ib);
+                }
+            start = end;
+        } });
+
+    DisjointSets merged(unique_hashes.size());
+    for (auto &sets : range_sets)
+        for (size_t i = 0; i < unique_hashes.size(); ++i)
+            merged.unite(static_cast<int>(i), sets.find(static_cast<int>(i)));
+
+    // Map clusters of distinct hashes back to the first input index that carries them
+    std::vector<int> first_item(unique_hashes.size(), -1);
+    std::vector<int> unique_index(hashes.size());
+    for (size_t i = 0; i < hashes.size(); ++i)
+        unique_index[i] = static_cast<int>(std::lower_bound(unique_hashes.begin(), unique_hashes.end(), hashes[i]) - unique_hashes.begin());
+    std::vector<int> clusters(hashes.size());
+    for (size_t i = 0; i < hashes.size(); ++i)
+    {
+        int root = merged.find(unique_index[i]);
+        if (first_item[root] < 0)
+            first_item[root] = static_cast<int>(i);
+        clusters[i] = first_item[root];
+    }
+    return clusters;
+}
+
+// Layout of a columnar box store file (see box_store.py), in native (little-endian) byte order.
+// Every section starts at a multiple of 8 bytes:
+//   header         magic "YLBOXST1", uint64 image_count, uint64 box_count, uint64 names_size
+//   uint64         box_start[image_count + 1], boxes of image i are box_start[i] .. box_start[i + 1] - 1
+//   int32          image_width[image_count], image_height[image_count], 0 if the header was unreadable
+//   int32          invalid_lines[image_count], unparsable lines of the label file
+//   uint8          label_exists[image_count]
+//   int32          class_id[box_count]
+//   float64        center_x[box_count], center_y, width, height, so boxes read back exactly as parsed
+//   char           label file names separated by '\n' (names_size bytes)
+const char BOX_STORE_MAGIC[] = "YLBOXST1";
+const size_t BOX_STORE_HEADER_SIZE = 32;
+
+// Byte offsets of the sections of a box store file
+struct BoxStoreLayout
+{
+    size_t box_start, image_width, image_height, invalid_lines, label_exists;
+    size_t class_id, center_x, center_y, width, height, names, total_size;
+
+    BoxStoreLayout(size_t image_count, size_t box_count, size_t names_size)
+    {
+        auto aligned = [](size_t offset)
+        { return (offset + 7) & ~static_cast<size_t>(7); };
+        box_start = BOX_STORE_HEADER_SIZE;
+        image_width = aligned(box_start + (image_count + 1) * sizeof(uint64_t));
+        image_height = aligned(image_width + image_count * sizeof(int32_t));
+        invalid_lines = aligned(image_height + image_count * sizeof(int32_t));
+        label_exists = aligned(invalid_lines + image_count * sizeof(int32_t));
+        class_id = aligned(label_exists + image_count);
+        center_x = aligned(class_id + box_count * sizeof(int32_t));
+        center_y = center_x + box_count * sizeof(double);
+        width = center_y + box_count * sizeof(double);
+        height = width + box_count * sizeof(double);
+        names = height + box_count * sizeof(double);
+        total_size = names + names_size;
+    }
+};
+
+// Read-only view of the columns of a box store in memory, typically a memory map of the file
+struct BoxStoreView
+{
+    size_t image_count = 0, box_count = 0;
+    const uint64_t *box_start = nullptr;
+    const int32_t *image_width = nullptr, *image_height = nullptr, *invalid_lines = nullptr;
+    const uint8_t *label_exists = nullptr;
+    const int32_t *class_id = nullptr;
+    const double *center_x = nullptr, *center_y = nullptr, *width = nullptr, *height = nullptr;
+    const char *names = nullptr; // Label file names, each followed by '\n'
+    size_t names_size = 0;
+
+    BoxStoreView(const char *data, size_t size)
+    {
+        uint64_t counts[3];
+        if (size < BOX_STORE_HEADER_SIZE || memcmp(data, BOX_STORE_MAGIC, 8) != 0)
+            throw std::invalid_argument("Not a box store file");
+        memcpy(counts, data + 8, sizeof(counts));
+        image_count = static_cast<size_t>(counts[0]);
+        box_count = static_cast<size_t>(counts[1]);
+        names_size = static_cast<size_t>(counts[2]);
+        BoxStoreLayout layout(image_count, box_count, names_size);
+        if (layout.total_size != size)
+            throw std::invalid_argument("Box store file is truncated or damaged");
+        box_start = reinterpret_cast<const uint64_t *>(data + layout.box_start);
+        image_width = reinterpret_cast<const int32_t *>(data + layout.image_width);
+        image_height = reinterpret_cast<const int32_t *>(data + layout.image_height);
+        invalid_lines = reinterpret_cast<const int32_t *>(data + layout.invalid_lines);
+        label_exists = reinterpret_cast<const uint8_t *>(data + layout.label_exists);
+        class_id = reinterpret_cast<const int32_t *>(data + layout.class_id);
+        center_x = reinterpret_cast<const double *>(data + layout.center_x);
+        center_y = reinterpret_cast<const double *>(data + layout.center_y);
+        width = reinterpret_cast<const double *>(data + layout.width);
+        height = reinterpret_cast<const double *>(data + layout.height);
+        names = data + layout.names;
+        if (box_start[image_count] != box_count)
+            throw std::invalid_argument("Box store file is truncated or damaged");
+    }
+
+    // Checks a row number coming from Python, -1 stands for an image that is not in the store
+    bool has_row(long long row) const { return row >= 0 && static_cast<size_t>(row) < image_count; }
+
+    NormalizedBoundingBox box(size_t b) const { return {class_id[b], center_x[b], center_y[b], width[b], height[b]}; }
+
+    // Calls on_box for every box of an image
+    template <typename Fn>
+    void for_each_box(size_t row, Fn on_box) const
+    {
+        for (uint64_t b = box_start[row]; b < box_start[row + 1]; ++b)
+            on_box(box(static_cast<size_t>(b)));
+    }
+};
+
+// Per-image content of a box store while it is being assembled
+struct BoxStoreImage
+{
+    std::string name; // Label file name
+    int image_width = 0, image_height = 0;
+    int invalid_lines = 0;
+    bool label_exists = false;
+    std::vector<NormalizedBoundingBox> boxes;
+};
+
+// Helper that fills a BoxStoreImage from label file text (None if the file does not exist)
+void parse_box_store_image(const std::optional<std::string> &label_text, BoxStoreImage &image)
+{
+    image.boxes.clear();
+    image.label_exists = label_text.has_value();
+    image.invalid_lines = 0;
+    if (label_text)
+        image.invalid_lines = static_cast<int>(parse_yolo_label_text(*label_text, [&](const NormalizedBoundingBox &box)
+                                                                     { image.boxes.push_back(box); }));
+}
+
+// Updates of a box store that are not in its file yet: the rows whose label file changed, parsed from their
+// new text (None for removed files). Readers take a row from here if it is present, from the store otherwise.
+struct BoxStoreOverlay
+{
+    std::unordered_map<size_t, BoxStoreImage> images;
+
+    BoxStoreOverlay(const BoxStoreView &store, const std::vector<long long> &rows,
+                    const std::vector<std::optional<std::string>> &label_texts)
+    {
+        if (rows.size() != label_texts.size())
+            throw std::invalid_argument("Box store updates: expected one label text per row");
+        for (size_t k = 0; k < rows.size(); ++k)
+        {
+            if (!store.has_row(rows[k]))
+                throw std::out_of_range("Box store updates: row out of range");
+            size_t row = static_cast<size_t>(rows[k]);
+            BoxStoreImage &image = images[row];
+            image.image_width = store.image_width[row];
+            image.image_height = store.image_height[row];
+            parse_box_store_image(label_texts[k], image);
+        }
+    }
+
+    const BoxStoreImage *find(size_t row) const
+    {
+        auto it = images.find(row);
+        return it != images.end() ? &it->second : nullptr;
+    }
+};
+
+// Helper that lays out the columns of a box store file
+std::string serialize_box_store(const std::vector<BoxStoreImage> &images)
+{
+    size_t box_count = 0, names_size = 0;
+    for (const auto &image : images)
+    {
+        box_count += image.boxes.size();
+        names_size += image.name.size() + 1;
+    }
+    BoxStoreLayout layout(images.size(), box_count, names_size);
+    std::string data(layout.total_size, '\0');
+    char *base = &data[0];
+    uint64_t counts[3] = {images.size(), box_count, names_size};
+    memcpy(base, BOX_STORE_MAGIC, 8);
+    memcpy(base + 8, counts, sizeof(counts));
+
+    auto *box_start = reinterpret_cast<uint64_t *>(base + layout.box_start);
+    auto *image_width = reinterpret_cast<int32_t *>(base + layout.image_width);
+    auto *image_height = reinterpret_cast<int32_t *>(base + layout.image_height);
+    auto *invalid_lines = reinterpret_cast<int32_t *>(base + layout.invalid_lines);
+    auto *label_exists = reinterpret_cast<uint8_t *>(base + layout.label_exists);
+    auto *class_id = reinterpret_cast<int32_t *>(base + layout.class_id);
+    auto *center_x = reinterpret_cast<double *>(base + layout.center_x);
+    auto *center_y = reinterpret_cast<double *>(base + layout.center_y);
+    auto *width = reinterpret_cast<double *>(base + layout.width);
+    auto *height = reinterpret_cast<double *>(base + layout.height);
+    char *names = base + layout.names;
+    size_t b = 0;
+    for (size_t i = 0; i < images.size(); ++i)
     {
-        if (p_box.width <= 0 || p_box.height <= 0)
+        const BoxStoreImage &image = images[i];
+        box_start[i] = b;
+        image_width[i] = image.image_width;
+        image_height[i] = image.image_height;
+        invalid_lines[i] = image.invalid_lines;
+        label_exists[i] = image.label_exists ? 1 : 0;
+        for (const auto &box : image.boxes)
         {
-            continue;
+            class_id[b] = box.class_id;
+            center_x[b] = box.center_x;
+            center_y[b] = box.center_y;
+            width[b] = box.width;
+            height[b] = box.height;
+            ++b;
         }
+        memcpy(names, image.name.data(), image.name.size());
+        names[image.name.size()] = '\n';
+        names += image.name.size() + 1;
+    }
+    box_start[images.size()] = b;
+    return data;
+}
 
-        double center_x = (p_box.x + p_box.width / 2) / original_width;
-        double center_y = (p_box.y + p_box.height / 2) / original_height;
-        double width = p_box.width / original_width;
-        double height = p_box.height / original_height;
+bool write_file_atomically(const std::string &path, const std::string &content);
 
-        yolo_boxes.push_back({p_box.class_id, center_x, center_y, width, height});
+// Function to build a box store from the label files (and image headers, for pixel sizes) of a dataset,
+// reading them on native threads. image_sizes, if not empty, replaces the image headers as in
+// build_coco_chunk. Returns the number of boxes stored.
+long long build_box_store(
+    const std::vector<std::string> &image_paths,
+    const std::vector<std::string> &label_paths,
+    const std::string &output_path,
+    int num_threads,
+    const std::vector<std::pair<int, int>> &image_sizes)
+{
+    if (image_paths.size() != label_paths.size())
+        throw std::invalid_argument("build_box_store: expected one label path per image");
+    if (!image_sizes.empty() && image_sizes.size() != image_paths.size())
+        throw std::invalid_argument("build_box_store: expected one image size per image");
+    std::vector<BoxStoreImage> images(image_paths.size());
+    parallel_for(images.size(), num_threads, [&](unsigned int, size_t i)
+                 {
+        BoxStoreImage &image = images[i];
+        image.name = fs::path(label_paths[i]).filename().string();
+        auto size = image_sizes.empty() ? read_image_size(image_paths[i]) : image_sizes[i];
+        image.image_width = size.first;
+        image.image_height = size.second;
+        std::string content;
+        if (read_file_to_string(label_paths[i], content))
+            parse_box_store_image(content, image);
+        else
+            parse_box_store_image(std::nullopt, image); });
+
+    std::string data = serialize_box_store(images);
+    if (!write_file_atomically(output_path, data))
+        throw std::runtime_error("Could not write " + output_path);
+    return static_cast<long long>(BoxStoreView(data.data(), data.size()).box_count);
+}
+
+// Function to write a copy of a box store with the boxes of some images replaced by new label
+// file content (None for removed label files). Image sizes are kept. Returns the number of boxes stored.
+long long write_updated_box_store(
+    const BoxStoreView &store,
+    const std::vector<long long> &rows,
+    const std::vector<std::optional<std::string>> &label_texts,
+    const std::string &output_path)
+{
+    if (rows.size() != label_texts.size())
+        throw std::invalid_argument("write_updated_box_store: expected one label text per row");
+    std::vector<BoxStoreImage> images(store.image_count);
+    const char *name = store.names;
+    const char *names_end = store.names + store.names_size;
+    for (size_t i = 0; i < images.size(); ++i)
+    {
+        BoxStoreImage &image = images[i];
+        const char *name_end = static_cast<const char *>(memchr(name, '\n', names_end - name));
+        if (name_end == nullptr)
+            throw std::invalid_argument("Box store file is truncated or damaged");
+        image.name.assign(name, name_end);
+        name = name_end + 1;
+        image.image_width = store.image_width[i];
+        image.image_height = store.image_height[i];
+        image.invalid_lines = store.invalid_lines[i];
+        image.label_exists = store.label_exists[i] != 0;
+        store.for_each_box(i, [&](const NormalizedBoundingBox &box)
+                           { image.boxes.push_back(box); });
     }
-    return yolo_boxes;
+    for (size_t k = 0; k < rows.size(); ++k)
+    {
+        if (!store.has_row(rows[k]))
+            throw std::out_of_range("write_updated_box_store: row out of range");
+        parse_box_store_image(label_texts[k], images[static_cast<size_t>(rows[k])]);
+    }
+
+    std::string data = serialize_box_store(images);
+    if (!write_file_atomically(output_path, data))
+        throw std::runtime_error("Could not write " + output_path);
+    return static_cast<long long>(BoxStoreView(data.data(), data.size()).box_count);
 }
 
-// Function to convert normalized YOLO bounding boxes to pixel format
-std::vector<PixelBoundingBox> convert_from_yolo_format(
-    const std::vector<NormalizedBoundingBox> &yolo_boxes,
-    double original_width,
-    double original_height)
+// Function to read the boxes of one image of a box store. Returns None if it has no label file.
+std::optional<std::vector<NormalizedBoundingBox>> read_box_store_boxes(const BoxStoreView &store, long long row)
 {
+    if (!store.has_row(row))
+        throw std::out_of_range("read_box_store_boxes: row out of range");
+    if (!store.label_exists[row])
+        return std::nullopt;
+    std::vector<NormalizedBoundingBox> boxes;
+    store.for_each_box(static_cast<size_t>(row), [&](const NormalizedBoundingBox &box)
+                       { boxes.push_back(box); });
+    return boxes;
+}
 
-    std::vector<PixelBoundingBox> pixel_boxes;
-    for (const auto &n_box : yolo_boxes)
-    {
-        double x = (n_box.center_x - n_box.width / 2) * original_width;
-        double y = (n_box.center_y - n_box.height / 2) * original_height;
-        double w = n_box.width * original_width;
-        double h = n_box.height * original_height;
+// Function to aggregate the statistics of the given rows of a box store, like compute_label_statistics
+// over their label files. Rows in the overlay are taken from it. A row of -1 counts as an image without a label file.
+DatasetStatistics compute_box_store_statistics(const BoxStoreView &store, const BoxStoreOverlay &overlay,
+                                               const std::vector<long long> &rows, int num_threads)
+{
+    unsigned int worker_count = resolve_thread_count(num_threads, rows.size());
+    std::vector<DatasetStatistics> partial_stats(worker_count);
+    parallel_for(rows.size(), static_cast<int>(worker_count), [&](unsigned int worker, size_t i)
+                 {
+        DatasetStatistics &stats = partial_stats[worker];
+        long long row = rows[i];
+        const BoxStoreImage *updated = store.has_row(row) ? overlay.find(static_cast<size_t>(row)) : nullptr;
+        if (updated != nullptr && updated->label_exists)
+        {
+            for (const auto &box : updated->boxes)
+                accumulate_box_statistics(box, stats);
+            stats.invalid_lines += updated->invalid_lines;
+            accumulate_label_file_statistics(static_cast<long long>(updated->boxes.size()), stats);
+        }
+        else if (updated == nullptr && store.has_row(row) && store.label_exists[row])
+        {
+            store.for_each_box(static_cast<size_t>(row), [&](const NormalizedBoundingBox &box)
+                               { accumulate_box_statistics(box, stats); });
+            stats.invalid_lines += store.invalid_lines[row];
+            accumulate_label_file_statistics(static_cast<long long>(store.box_start[row + 1] - store.box_start[row]), stats);
+        }
+        else
+        {
+            ++stats.missing_label_files;
+            ++stats.boxes_per_image[0];
+        } });
 
-        pixel_boxes.push_back({n_box.class_id, x, y, w, h});
+    DatasetStatistics total;
+    for (const auto &stats : partial_stats)
+    {
+        total.merge(stats, 1);
     }
-    return pixel_boxes;
+    return total;
 }
 
-// Function to scan a directory for image files and determine their label status
-std::vector<ImageInfo> scan_images_and_labels(const std::string &folder_path, const std::vector<std::string> &supported_extensions)
+// Function to write the label files of the given rows of a box store as YOLO text, on native threads.
+// Rows in the overlay are taken from it. Rows of -1 and images without a label file are skipped.
+// Returns the paths that could not be written.
+std::vector<std::string> export_box_store_labels(
+    const BoxStoreView &store,
+    const BoxStoreOverlay &overlay,
+    const std::vector<long long> &rows,
+    const std::vector<std::string> &label_paths,
+    int num_threads)
 {
-    std::vector<ImageInfo> image_infos;
-    fs::path dataset_folder_path(folder_path);
+    if (rows.size() != label_paths.size())
+        throw std::invalid_argument("export_box_store_labels: expected one label path per row");
+    std::vector<char> failed(rows.size(), 0);
+    parallel_for(rows.size(), num_threads, [&](unsigned int, size_t i)
+                 {
+        long long row = rows[i];
+        if (!store.has_row(row))
+            return;
+        std::vector<NormalizedBoundingBox> boxes;
+        if (const BoxStoreImage *updated = overlay.find(static_cast<size_t>(row)))
+        {
+            if (!updated->label_exists)
+                return;
+            boxes = updated->boxes;
+        }
+        else
+        {
+            if (!store.label_exists[row])
+                return;
+            store.for_each_box(static_cast<size_t>(row), [&](const NormalizedBoundingBox &box)
+                               { boxes.push_back(box); });
+        }
+        failed[i] = write_file_atomically(label_paths[i], format_yolo_labels_to_string(boxes)) ? 0 : 1; });
 
-    if (!fs::exists(dataset_folder_path) || !fs::is_directory(dataset_folder_path))
+    std::vector<std::string> failed_files;
+    for (size_t i = 0; i < rows.size(); ++i)
+        if (failed[i])
+            failed_files.push_back(label_paths[i]);
+    return failed_files;
+}
+
+// Helper that views a Python buffer (e.g. the mmap of a box store file) as a box store.
+// The buffer_info must outlive the view, it keeps the buffer from being closed.
+BoxStoreView box_store_view(const py::buffer_info &info)
+{
+    return BoxStoreView(static_cast<const char *>(info.ptr), static_cast<size_t>(info.size * info.itemsize));
+}
+
+// Predicates of an image list query. Unset bounds are negative; all set predicates must hold.
+struct LabelQuery
+{
+    std::vector<int> required_classes; // Image has boxes of every one of these classes
+    std::vector<int> excluded_classes; // Image has no box of any of these classes
+    long long min_boxes = -1;          // Box count >= min_boxes
+    long long max_boxes = -1;          // Box count <= max_boxes
+    double smaller_than = -1;          // Some box has a side shorter than this many pixels
+    double larger_than = -1;           // Some box has a side longer than this many pixels
+    std::string name_contains;         // Lowercase substring of the image file name
+};
+
+// Per-image summary of label files used to evaluate LabelQuery predicates without touching disk.
+// Image i of the index is image i of the list it was built from.
+class LabelIndex
+{
+public:
+    // Reads every label file (and the image header, for pixel sizes, unless image_sizes gives them) on native threads
+    void build(const std::vector<std::string> &image_paths, const std::vector<std::string> &label_paths, int num_threads,
+               const std::vector<std::pair<int, int>> &image_sizes)
     {
-        return image_infos; // Return empty if path doesn't exist or isn't a directory
+        size_t count = std::min(image_paths.size(), label_paths.size());
+        if (!image_sizes.empty() && image_sizes.size() != count)
+            throw std::invalid_argument("LabelIndex.build: expected one image size per image");
+        entries_.assign(count, Entry());
+        names_.assign(count, std::string());
+        parallel_for(count, num_threads, [&](unsigned int, size_t i)
+                     {
+            names_[i] = lowercase_file_name(image_paths[i]);
+            auto size = image_sizes.empty() ? read_image_size(image_paths[i]) : image_sizes[i];
+            entries_[i].image_width = size.first;
+            entries_[i].image_height = size.second;
+            std::string content;
+            if (read_file_to_string(label_paths[i], content))
+                summarize(content, entries_[i]);
+        });
     }
 
-    for (const auto &entry : fs::directory_iterator(dataset_folder_path))
+    // Summarizes images from the rows of a box store (-1 for images not in the store) without touching disk.
+    // Rows in the overlay are taken from it.
+    void build_from_box_store(const std::vector<std::string> &image_paths, const BoxStoreView &store,
+                              const BoxStoreOverlay &overlay, const std::vector<long long> &rows, int num_threads)
     {
-        if (fs::is_regular_file(entry.path()))
-        {
-            std::string file_extension = entry.path().extension().string();
-            if (!file_extension.empty())
+        if (image_paths.size() != rows.size())
+            throw std::invalid_argument("LabelIndex.build_from_box_store: expected one row per image");
+        entries_.assign(rows.size(), Entry());
+        names_.assign(rows.size(), std::string());
+        parallel_for(rows.size(), num_threads, [&](unsigned int, size_t i)
+                     {
+            names_[i] = lowercase_file_name(image_paths[i]);
+            if (!store.has_row(rows[i]))
+                return;
+            Entry &entry = entries_[i];
+            size_t row = static_cast<size_t>(rows[i]);
+            entry.image_width = store.image_width[row];
+            entry.image_height = store.image_height[row];
+            if (const BoxStoreImage *updated = overlay.find(row))
             {
-                file_extension = file_extension.substr(1); // Remove the leading dot
+                for (const auto &box : updated->boxes)
+                    add_box(box, entry);
             }
-
-            // Convert to lowercase for case-insensitive comparison
-            std::transform(file_extension.begin(), file_extension.end(), file_extension.begin(),
-                           [](unsigned char c)
-                           { return std::tolower(c); });
-
-            bool is_supported_image = false;
-            for (const auto &ext : supported_extensions)
+            else
             {
-                if (file_extension == ext)
-                {
-                    is_supported_image = true;
-                    break;
-                }
+                store.for_each_box(row, [&](const NormalizedBoundingBox &box)
+                                   { add_box(box, entry); });
             }
+            finish(entry);
+        });
+    }
 
-            if (is_supported_image)
-            {
-                ImageInfo info;
-                info.path = entry.path().string();
+    // Re-summarizes image i from new label file content (None if the file was removed)
+    void update(size_t i, const std::optional<std::string> &label_text)
+    {
+        if (i >= entries_.size())
+            throw std::out_of_range("LabelIndex.update: image index out of range");
+        Entry &entry = entries_[i];
+        entry.box_count = 0;
+        entry.classes.clear();
+        entry.min_side = std::numeric_limits<float>::infinity();
+        entry.max_side = 0;
+        if (label_text)
+            summarize(*label_text, entry);
+    }
+
+    // Returns one byte per image, 1 where every predicate of the query holds
+    std::string query(const LabelQuery &query, int num_threads) const
+    {
+        std::string mask(entries_.size(), '\0');
+        parallel_for(entries_.size(), num_threads, [&](unsigned int, size_t i)
+                     { mask[i] = matches(query, i) ? 1 : 0; });
+        return mask;
+    }
+
+    size_t size() const { return entries_.size(); }
+
+    long long box_count(size_t i) const { return i < entries_.size() ? entries_[i].box_count : 0; }
+
+private:
+    struct Entry
+    {
+        int image_width = 0, image_height = 0; // From the image header, 0 if unreadable
+        long long box_count = 0;
+        std::vector<int> classes; // Sorted, unique
+        float min_side = std::numeric_limits<float>::infinity(); // Shortest box side in pixels
+        float max_side = 0; // Longest box side in pixels
+    };
+
+    static std::string lowercase_file_name(const std::string &path)
+    {
+        std::string name = fs::path(path).filename().string();
+        std::transform(name.begin(), name.end(), name.begin(), [](unsigned char c)
+                       { return static_cast<char>(std::tolower(c)); });
+        return name;
+    }
+
+    static void add_box(const NormalizedBoundingBox &box, Entry &entry)
+    {
+        ++entry.box_count;
+        entry.classes.push_back(box.class_id);
+        if (entry.image_width > 0 && entry.image_height > 0)
+        {
+            double w = box.width * entry.image_width, h = box.height * entry.image_height;
+            entry.min_side = std::min(entry.min_side, static_cast<float>(std::min(w, h)));
+            entry.max_side = std::max(entry.max_side, static_cast<float>(std::max(w, h)));
+        }
+    }
+
+    static void finish(Entry &entry)
+    {
+        std::sort(entry.classes.begin(), entry.classes.end());
+        entry.classes.erase(std::unique(entry.classes.begin(), entry.classes.end()), entry.classes.end());
+    }
 
-                // Construct label file path
-                std::string filename_stem = entry.path().stem().string();
-                fs::path label_filepath = dataset_folder_path / (filename_stem + ".txt");
+    static void summarize(const std::string &text, Entry &entry)
+    {
+        parse_yolo_label_text(text, [&](const NormalizedBoundingBox &box)
+                              { add_box(box, entry); });
+        finish(entry);
+    }
+
+    bool matches(const LabelQuery &query, size_t i) const
+    {
+        const Entry &entry = entries_[i];
+        if (query.min_boxes >= 0 && entry.box_count < query.min_boxes)
+            return false;
+        if (query.max_boxes >= 0 && entry.box_count > query.max_boxes)
+            return false;
+        if (query.smaller_than >= 0 && !(entry.box_count > 0 && entry.min_side < query.smaller_than))
+            return false;
+        if (query.larger_than >= 0 && !(entry.box_count > 0 && entry.max_side > query.larger_than))
+            return false;
+        for (int class_id : query.required_classes)
+            if (!std::binary_search(entry.classes.begin(), entry.classes.end(), class_id))
+                return false;
+        for (int class_id : query.excluded_classes)
+            if (std::binary_search(entry.classes.begin(), entry.classes.end(), class_id))
+                return false;
+        if (!query.name_contains.empty() && names_[i].find(query.name_contains) == std::string::npos)
+            return false;
+        return true;
+    }
+
+    std::vector<Entry> entries_;
+    std::vector<std::string> names_; // Lowercase file names
+};
+
+// Result of rewriting class ids across label files
+struct ClassRemapResult
+{
+    long long files_changed = 0;
+    long long boxes_remapped = 0;
+    long long boxes_deleted = 0;
+    std::vector<std::string> failed_files;
+};
+
+// Function to write content to a temporary file beside path and rename it over path
+bool write_file_atomically(const std::string &path, const std::string &content)
+{
+    fs::path target(path);
+    fs::path temp_path = target.parent_path() / ("." + target.filename().string() + ".remap.tmp");
+    {
+        std::ofstream out(temp_path, std::ios::binary | std::ios::trunc);
+        if (!out)
+            return false;
+        out.write(content.data(), static_cast<std::streamsize>(content.size()));
+        if (!out)
+        {
+            out.close();
+            std::error_code ignored;
+            fs::remove(temp_path, ignored);
+            return false;
+        }
+    }
+    std::error_code error;
+    fs::rename(temp_path, target, error);
+    if (error)
+    {
+        fs::remove(temp_path, error);
+        return false;
+    }
+    return true;
+}
+
+// Function to rewrite the class id of every box in a set of label files, on native threads.
+// class_mapping maps old ids to new ids; a new id of -1 deletes the box. Ids not in the mapping and
+// lines that cannot be parsed are kept as they are, and coordinates are copied verbatim. Files that
+// change are replaced atomically; files that do not exist or need no change are not touched.
+ClassRemapResult remap_label_classes(const std::vector<std::string> &label_paths, const std::map<int, int> &class_mapping, int num_threads)
+{
+    unsigned int worker_count = resolve_thread_count(num_threads, label_paths.size());
+    std::vector<ClassRemapResult> partial_results(worker_count);
+
+    parallel_for(label_paths.size(), static_cast<int>(worker_count), [&](unsigned int worker, size_t i)
+                 {
+        ClassRemapResult &result = partial_results[worker];
+        std::string content;
+        if (!read_file_to_string(label_paths[i], content))
+            return; // Missing label file, nothing to remap
 
-                info.is_labelled = fs::exists(label_filepath) && fs::file_size(label_filepath) > 0;
-                image_infos.push_back(info);
+        std::string rewritten;
+        rewritten.reserve(content.size());
+        bool changed = false;
+        const char *cursor = content.c_str();
+        const char *end = cursor + content.size();
+        while (cursor < end)
+        {
+            const char *line_end = static_cast<const char *>(memchr(cursor, '\n', end - cursor));
+            bool has_newline = line_end != nullptr;
+            if (!has_newline)
+                line_end = end;
+            const char *token = cursor;
+            while (token < line_end && (*token == ' ' || *token == '\t'))
+                ++token;
+            char *token_end = nullptr;
+            long class_id = std::strtol(token, &token_end, 10);
+            auto mapping = (token_end != token && token_end <= line_end) ? class_mapping.find(static_cast<int>(class_id)) : class_mapping.end();
+            if (mapping == class_mapping.end())
+            {
+                rewritten.append(cursor, line_end); // Unmapped class or unparsable line
             }
+            else if (mapping->second < 0)
+            {
+                changed = true;
+                ++result.boxes_deleted;
+                cursor = has_newline ? line_end + 1 : end;
+                continue; // Drop the line together with its newline
+            }
+            else
+            {
+                changed = true;
+                ++result.boxes_remapped;
+                rewritten.append(cursor, token);
+                rewritten += std::to_string(mapping->second);
+                rewritten.append(static_cast<const char *>(token_end), line_end);
+            }
+            if (has_newline)
+                rewritten += '\n';
+            cursor = has_newline ? line_end + 1 : end;
         }
+
+        if (!changed)
+            return;
+        if (write_file_atomically(label_paths[i], rewritten))
+            ++result.files_changed;
+        else
+            result.failed_files.push_back(label_paths[i]); });
+
+    ClassRemapResult total;
+    for (auto &result : partial_results)
+    {
+        total.files_changed += result.files_changed;
+        total.boxes_remapped += result.boxes_remapped;
+        total.boxes_deleted += result.boxes_deleted;
+        total.failed_files.insert(total.failed_files.end(), result.failed_files.begin(), result.failed_files.end());
     }
-    return image_infos;
+    return total;
 }
 
-// Random number generator for colors
-std::random_device rd;
-std::mt19937 gen(rd());
+// Function to read the set of class ids used in each label file, on native threads.
+// Only the leading class id of each line is parsed; lines without one are skipped. Missing files
+// give an empty set. Each returned set is sorted.
+std::vector<std::vector<int>> read_label_class_sets(const std::vector<std::string> &label_paths, int num_threads)
+{
+    std::vector<std::vector<int>> class_sets(label_paths.size());
+    parallel_for(label_paths.size(), num_threads, [&](unsigned int, size_t i)
+                 {
+        std::string content;
+        if (!read_file_to_string(label_paths[i], content))
+            return;
+        std::vector<int> &classes = class_sets[i];
+        const char *cursor = content.c_str();
+        const char *end = cursor + content.size();
+        while (cursor < end)
+        {
+            const char *line_end = static_cast<const char *>(memchr(cursor, '\n', end - cursor));
+            if (line_end == nullptr)
+                line_end = end;
+            char *token_end = nullptr;
+            long class_id = std::strtol(cursor, &token_end, 10);
+            if (token_end != cursor && token_end <= line_end)
+                classes.push_back(static_cast<int>(class_id));
+            cursor = line_end + 1;
+        }
+        std::sort(classes.begin(), classes.end());
+        classes.erase(std::unique(classes.begin(), classes.end()), classes.end()); });
+    return class_sets;
+}
 
-// Function to generate a random color in hex string format
-std::string generate_random_color()
+// Result of link_files
+struct LinkResult
 {
-    std::uniform_int_distribution<> distrib(0, 255);
-    int r = 0, g = 0, b = 0;
+    long long hard_links = 0;
+    long long symbolic_links = 0;
+    std::vector<std::string> failed_files; // Sources that could not be linked
+};
 
-    // Ensure reasonable brightness (not too dark or too light)
-    // This is a simplified version of the Python logic, aiming for a mid-range brightness
-    while ((r + g + b < 300) || (r + g + b > 600))
+// Function to create a link at target_paths[i] to every source_paths[i], on native threads.
+// Hard links are tried first (unless prefer_symlinks) and fall back to a symbolic link to the absolute
+// source path, e.g. across file systems. Nothing is copied; existing targets are never replaced.
+LinkResult link_files(const std::vector<std::string> &source_paths, const std::vector<std::string> &target_paths,
+                      bool prefer_symlinks, int num_threads)
+{
+    if (source_paths.size() != target_paths.size())
     {
-        r = distrib(gen);
-        g = distrib(gen);
-        b = distrib(gen);
+        throw std::invalid_argument("link_files: expected one target path per source path");
     }
+    unsigned int worker_count = resolve_thread_count(num_threads, source_paths.size());
+    std::vector<LinkResult> partial_results(worker_count);
+    parallel_for(source_paths.size(), static_cast<int>(worker_count), [&](unsigned int worker, size_t i)
+                 {
+        LinkResult &result = partial_results[worker];
+        std::error_code error;
+        if (!prefer_symlinks)
+        {
+            fs::create_hard_link(source_paths[i], target_paths[i], error);
+            if (!error)
+            {
+                ++result.hard_links;
+                return;
+            }
+            if (error == std::errc::file_exists)
+            {
+                result.failed_files.push_back(source_paths[i]);
+                return;
+            }
+            error.clear();
+        }
+        fs::path source = fs::absolute(source_paths[i], error);
+        if (!error)
+            fs::create_symlink(source, target_paths[i], error);
+        if (error)
+            result.failed_files.push_back(source_paths[i]);
+        else
+            ++result.symbolic_links; });
 
-    std::stringstream ss;
-    ss << "#" << std::hex << std::setfill('0') << std::setw(2) << r
-       << std::setfill('0') << std::setw(2) << g
-       << std::setfill('0') << std::setw(2) << b;
-    return ss.str();
+    LinkResult total;
+    for (auto &result : partial_results)
+    {
+        total.hard_links += result.hard_links;
+        total.symbolic_links += result.symbolic_links;
+        total.failed_files.insert(total.failed_files.end(), result.failed_files.begin(), result.failed_files.end());
+    }
+    return total;
 }
 
-// Function to process raw YOLO results into a list of PixelBoundingBox
-std::vector<PixelBoundingBox> process_yolo_results(
-    const std::vector<std::vector<double>> &raw_boxes, // Each inner vector: [x1, y1, x2, y2, conf, class_id]
-    double confidence_threshold)
+// Kinds of problems found by the label file validator
+enum class LabelIssueKind
 {
+    MalformedLine,
+    UnknownClass,
+    OutOfRange,
+    NonPositiveSize,
+    DuplicateBox
+};
 
-    std::vector<PixelBoundingBox> new_boxes;
-    for (const auto &box_data : raw_boxes)
+// Structure describing one problem in a label file. line is 1-based.
+struct LabelIssue
+{
+    int file_index = 0;
+    int line = 0;
+    LabelIssueKind kind = LabelIssueKind::MalformedLine;
+    std::string message;
+};
+
+// Result of validating a set of label files
+struct LabelValidationReport
+{
+    std::vector<LabelIssue> issues; // Sorted by file and line, at most max_issues of them
+    long long files_checked = 0;    // Label files that exist
+    long long files_with_issues = 0;
+    long long total_issues = 0;     // Including issues beyond max_issues
+};
+
+// Slack allowed on box edges, so boxes written with 6 decimals and touching the border still pass
+const double LABEL_EDGE_TOLERANCE = 1e-5;
+
+// Helper that appends the issues of one label file's text to issues
+void validate_label_text_into(const std::string &text, int file_index, const std::unordered_set<int> &known_class_ids,
+                              double duplicate_iou, std::vector<LabelIssue> &issues)
+{
+    struct ParsedBox
     {
-        if (box_data.size() >= 6)
+        int line;
+        int class_id;
+        double x1, y1, x2, y2;
+    };
+    std::vector<ParsedBox> boxes;
+    size_t first_issue = issues.size();
+    auto add_issue = [&](int line, LabelIssueKind kind, std::string message)
+    {
+        issues.push_back({file_index, line, kind, std::move(message)});
+    };
+
+    const char *cursor = text.c_str();
+    const char *end = cursor + text.size();
+    int line_number = 0;
+    while (cursor < end)
+    {
+        const char *line_end = static_cast<const char *>(memchr(cursor, '\n', end - cursor));
+        if (line_end == nullptr)
+            line_end = end;
+        std::string line(cursor, line_end);
+        cursor = line_end + 1;
+        ++line_number;
+        if (line.find_first_not_of(" \t\r") == std::string::npos)
+            continue; // Blank line
+
+        const char *p = line.c_str();
+        char *next = nullptr;
+        long class_id = std::strtol(p, &next, 10);
+        bool ok = next != p && (*next == ' ' || *next == '\t'); // Class id must be a whole number
+        double values[4];
+        for (int i = 0; ok && i < 4; ++i)
         {
-            double x1 = box_data[0];
-            double y1 = box_data[1];
-            double x2 = box_data[2];
-            double y2 = box_data[3];
-            double conf = box_data[4];
-            int class_id = static_cast<int>(box_data[5]);
+            p = next;
+            values[i] = std::strtod(p, &next);
+            ok = next != p && std::isfinite(values[i]);
+        }
+        if (!ok)
+        {
+            add_issue(line_number, LabelIssueKind::MalformedLine, "Expected 'class_id center_x center_y width height'");
+            continue;
+        }
 
-            if (conf > confidence_threshold)
+        if (known_class_ids.count(static_cast<int>(class_id)) == 0)
+            add_issue(line_number, LabelIssueKind::UnknownClass, "Class id " + std::to_string(class_id) + " is not in labels.json");
+        double center_x = values[0], center_y = values[1], width = values[2], height = values[3];
+        if (width <= 0 || height <= 0)
+        {
+            add_issue(line_number, LabelIssueKind::NonPositiveSize, "Box width and height must be positive");
+            continue;
+        }
+        double x1 = center_x - width / 2, y1 = center_y - height / 2;
+        double x2 = center_x + width / 2, y2 = center_y + height / 2;
+        if (x1 < -LABEL_EDGE_TOLERANCE || y1 < -LABEL_EDGE_TOLERANCE || x2 > 1 + LABEL_EDGE_TOLERANCE || y2 > 1 + LABEL_EDGE_TOLERANCE)
+            add_issue(line_number, LabelIssueKind::OutOfRange, "Box extends outside the image (coordinates outside [0, 1])");
+        boxes.push_back({line_number, static_cast<int>(class_id), x1, y1, x2, y2});
+    }
+
+    // Duplicates: sweep boxes sorted by left edge, so only horizontally overlapping pairs are compared
+    std::vector<size_t> order(boxes.size());
+    std::iota(order.begin(), order.end(), 0);
+    std::sort(order.begin(), order.end(), [&](size_t a, size_t b)
+              { return boxes[a].x1 < boxes[b].x1; });
+    std::vector<int> duplicate_of(boxes.size(), 0);
+    for (size_t i = 0; i < order.size(); ++i)
+    {
+        const ParsedBox &a = boxes[order[i]];
+        for (size_t j = i + 1; j < order.size() && boxes[order[j]].x1 < a.x2; ++j)
+        {
+            const ParsedBox &b = boxes[order[j]];
+            if (a.class_id != b.class_id)
+                continue;
+            double intersection = std::max(0.0, std::min(a.x2, b.x2) - b.x1) * std::max(0.0, std::min(a.y2, b.y2) - std::max(a.y1, b.y1));
+            double union_area = (a.x2 - a.x1) * (a.y2 - a.y1) + (b.x2 - b.x1) * (b.y2 - b.y1) - intersection;
+            if (union_area > 0 && intersection / union_area >= duplicate_iou)
             {
-                double w = x2 - x1;
-                double h = y2 - y1;
-                new_boxes.push_back({class_id, x1, y1, w, h});
+                size_t later = a.line > b.line ? order[i] : order[j];
+                int earlier_line = std::min(a.line, b.line);
+                if (duplicate_of[later] == 0 || earlier_line < duplicate_of[later])
+                    duplicate_of[later] = earlier_line;
             }
         }
     }
-    return new_boxes;
+    for (size_t i = 0; i < boxes.size(); ++i)
+    {
+        if (duplicate_of[i] != 0)
+            add_issue(boxes[i].line, LabelIssueKind::DuplicateBox, "Duplicate of the box on line " + std::to_string(duplicate_of[i]));
+    }
+
+    std::stable_sort(issues.begin() + first_issue, issues.end(), [](const LabelIssue &a, const LabelIssue &b)
+                     { return a.line < b.line; }); // Duplicates were appended after the per-line issues
 }
 
-// Function to format a list of NormalizedBoundingBox objects into a single string
-std::string format_yolo_labels_to_string(const std::vector<NormalizedBoundingBox> &yolo_boxes)
+// Function to validate the content of a single label file, e.g. right after it was saved
+std::vector<LabelIssue> validate_label_text(const std::string &text, const std::vector<int> &known_class_ids, double duplicate_iou)
 {
-    std::stringstream ss;
-    for (const auto &y_box : yolo_boxes)
+    std::vector<LabelIssue> issues;
+    validate_label_text_into(text, 0, std::unordered_set<int>(known_class_ids.begin(), known_class_ids.end()), duplicate_iou, issues);
+    return issues;
+}
+
+// Function to validate many label files in a single multithreaded pass. Files are checked for malformed
+// lines, class ids missing from known_class_ids, boxes outside the image, non-positive sizes and boxes
+// of the same class overlapping by duplicate_iou or more. Missing files are skipped.
+LabelValidationReport validate_label_files(const std::vector<std::string> &label_paths, const std::vector<int> &known_class_ids,
+                                           double duplicate_iou, size_t max_issues, int num_threads)
+{
+    std::unordered_set<int> known(known_class_ids.begin(), known_class_ids.end());
+    unsigned int worker_count = resolve_thread_count(num_threads, label_paths.size());
+    std::vector<std::vector<LabelIssue>> worker_issues(worker_count);
+    std::vector<long long> files_checked(worker_count, 0);
+
+    parallel_for(label_paths.size(), static_cast<int>(worker_count), [&](unsigned int worker, size_t i)
+                 {
+        std::string content;
+        if (!read_file_to_string(label_paths[i], content))
+            return;
+        ++files_checked[worker];
+        validate_label_text_into(content, static_cast<int>(i), known, duplicate_iou, worker_issues[worker]); });
+
+    LabelValidationReport report;
+    for (unsigned int worker = 0; worker < worker_count; ++worker)
     {
-        ss << y_box.class_id << " "
-           << std::fixed << std::setprecision(6) << y_box.center_x << " "
-           << std::fixed << std::setprecision(6) << y_box.center_y << " "
-           << std::fixed << std::setprecision(6) << y_box.width << " "
-           << std::fixed << std::setprecision(6) << y_box.height << "\n";
+        report.files_checked += files_checked[worker];
+        report.total_issues += static_cast<long long>(worker_issues[worker].size());
+        report.issues.insert(report.issues.end(), std::make_move_iterator(worker_issues[worker].begin()), std::make_move_iterator(worker_issues[worker].end()));
+        std::vector<LabelIssue>().swap(worker_issues[worker]);
     }
-    return ss.str();
+    std::stable_sort(report.issues.begin(), report.issues.end(), [](const LabelIssue &a, const LabelIssue &b)
+                     { return a.file_index < b.file_index; });
+    int previous_file = -1;
+    for (const LabelIssue &issue : report.issues)
+    {
+        if (issue.file_index != previous_file)
+            ++report.files_with_issues;
+        previous_file = issue.file_index;
+    }
+    if (report.issues.size() > max_issues)
+        report.issues.resize(max_issues);
+    return report;
 }
 
 PYBIND11_MODULE(bbox_utils, m)
@@ -225,19 +2487,44 @@ PYBIND11_MODULE(bbox_utils, m)
         .def_readwrite("height", &PixelBoundingBox::height);
 
     m.def("convert_to_yolo_format", &convert_to_yolo_format,
-          "A function that converts pixel bounding boxes to normalized YOLO format.");
+          "A function that converts pixel bounding boxes to normalized YOLO format.",
+          py::call_guard<py::gil_scoped_release>());
 
     m.def("convert_from_yolo_format", &convert_from_yolo_format,
-          "A function that converts normalized YOLO bounding boxes to pixel format.");
+          "A function that converts normalized YOLO bounding boxes to pixel format.",
+          py::call_guard<py::gil_scoped_release>());
 
     m.def("generate_random_color", &generate_random_color,
-          "A function that generates a random color in hex string format.");
+          "A function that generates a random color in hex string format.",
+          py::call_guard<py::gil_scoped_release>());
 
     m.def("process_yolo_results", &process_yolo_results,
-          "A function that processes raw YOLO detection results, filters by confidence, and converts to pixel bounding boxes.");
+          "A function that processes raw YOLO detection results, filters by confidence, and converts to pixel bounding boxes.",
+          py::call_guard<py::gil_scoped_release>());
 
     m.def("format_yolo_labels_to_string", &format_yolo_labels_to_string,
-          "A function that formats a list of normalized bounding boxes into a YOLO .txt file string.");
+          "A function that formats a list of normalized bounding boxes into a YOLO .txt file string.",
+          py::call_guard<py::gil_scoped_release>());
+
+    m.def("convert_to_yolo_format_batch", &convert_to_yolo_format_batch,
+          "A function that converts the pixel bounding boxes of many images to normalized YOLO format on native threads.",
+          py::arg("pixel_boxes_per_image"), py::arg("image_widths"), py::arg("image_heights"), py::arg("num_threads") = 0,
+          py::call_guard<py::gil_scoped_release>());
+
+    m.def("convert_from_yolo_format_batch", &convert_from_yolo_format_batch,
+          "A function that converts the normalized YOLO bounding boxes of many images to pixel format on native threads.",
+          py::arg("yolo_boxes_per_image"), py::arg("image_widths"), py::arg("image_heights"), py::arg("num_threads") = 0,
+          py::call_guard<py::gil_scoped_release>());
+
+    m.def("process_yolo_results_batch", &process_yolo_results_batch,
+          "A function that filters the raw YOLO detections of many images by confidence into pixel bounding boxes on native threads.",
+          py::arg("raw_boxes_per_image"), py::arg("confidence_threshold"), py::arg("num_threads") = 0,
+          py::call_guard<py::gil_scoped_release>());
+
+    m.def("format_yolo_label_texts", &format_yolo_label_texts,
+          "A function that converts and formats the pixel bounding boxes of many images into YOLO .txt file strings on native threads.",
+          py::arg("pixel_boxes_per_image"), py::arg("image_widths"), py::arg("image_heights"), py::arg("num_threads") = 0,
+          py::call_guard<py::gil_scoped_release>());
 
     py::class_<ImageInfo>(m, "ImageInfo")
         .def(py::init<>())
@@ -245,5 +2532,274 @@ PYBIND11_MODULE(bbox_utils, m)
         .def_readwrite("is_labelled", &ImageInfo::is_labelled);
 
     m.def("scan_images_and_labels", &scan_images_and_labels,
-          "A function that scans a directory for image files and determines their label status.");
+          "A function that scans a directory (or a given list of image paths in it) for image files and determines their label status.",
+          py::arg("folder_path"), py::arg("supported_extensions"), py::arg("candidate_paths") = std::nullopt,
+          py::call_guard<py::gil_scoped_release>());
+
+    m.def("read_image_size", &read_image_size,
+          "A function that reads (width, height) of a JPEG, PNG, GIF, BMP or WEBP image from its header, or (0, 0) if unknown.",
+          py::call_guard<py::gil_scoped_release>());
+
+    py::class_<CocoChunk>(m, "CocoChunk")
+        .def(py::init<>())
+        .def_readonly("images_json", &CocoChunk::images_json)
+        .def_readonly("annotations_json", &CocoChunk::annotations_json)
+        .def_readonly("image_count", &CocoChunk::image_count)
+        .def_readonly("annotation_count", &CocoChunk::annotation_count)
+        .def_readonly("failed_images", &CocoChunk::failed_images);
+
+    m.def("build_coco_chunk", &build_coco_chunk,
+          "A function that converts a chunk of images and YOLO label files into COCO JSON fragments in parallel.",
+          py::arg("image_paths"), py::arg("label_paths"), py::arg("file_names"),
+          py::arg("first_image_id"), py::arg("first_annotation_id"), py::arg("num_threads") = 0,
+          py::arg("image_sizes") = std::vector<std::pair<int, int>>(),
+          py::call_guard<py::gil_scoped_release>());
+
+    m.def("merge_detections", &merge_detections,
+          "A function that returns the detections that do not duplicate existing boxes (or each other), using a spatial grid and IoU.",
+          py::arg("existing_boxes"), py::arg("new_boxes"), py::arg("iou_threshold") = 0.5, py::arg("class_aware") = true,
+          py::call_guard<py::gil_scoped_release>());
+
+    m.def("compute_dhashes", &compute_dhashes,
+          "A function that computes 64-bit difference hashes of packed grayscale thumbnails on native threads.",
+          py::arg("thumbnails"), py::arg("count"), py::arg("width"), py::arg("height"), py::arg("num_threads") = 0);
+
+    m.def("find_near_duplicate_clusters", &find_near_duplicate_clusters,
+          "A function that clusters perceptual hashes within a Hamming distance, returning the first member index of each item's cluster.",
+          py::arg("hashes"), py::arg("max_distance"), py::arg("num_threads") = 0,
+          py::call_guard<py::gil_scoped_release>());
+
+    py::class_<PropagationResult>(m, "PropagationResult")
+        .def_readonly("boxes", &PropagationResult::boxes)
+        .def_readonly("refined", &PropagationResult::refined)
+        .def_readonly("carried", &PropagationResult::carried);
+
+    m.def("propagate_boxes", &propagate_boxes,
+          "A function that carries boxes to the next image, refining each with its detection matched by IoU (Hungarian algorithm).",
+          py::arg("previous_boxes"), py::arg("detections"), py::arg("match_iou") = 0.3, py::arg("class_aware") = true,
+          py::arg("image_width") = std::numeric_limits<double>::max(), py::arg("image_height") = std::numeric_limits<double>::max(),
+          py::call_guard<py::gil_scoped_release>());
+
+    m.def("merge_tile_detections", &merge_tile_detections,
+          "A function that merges raw detections from overlapping tiles, joining duplicates matched by intersection over the smaller box.",
+          py::arg("raw_boxes"), py::arg("match_threshold"), py::arg("image_width"), py::arg("image_height"),
+          py::call_guard<py::gil_scoped_release>());
+
+    m.def("non_max_suppression", &non_max_suppression,
+          "A function that runs greedy (optionally class-aware) non-maximum suppression on raw [x1, y1, x2, y2, conf, class_id] detections.",
+          py::arg("raw_boxes"), py::arg("iou_threshold"), py::arg("class_aware") = true, py::arg("max_detections") = 0,
+          py::call_guard<py::gil_scoped_release>());
+
+    m.def("letterbox_image", &letterbox_image,
+          "A function that letterboxes an RGB888 image buffer into a (1, 3, size, size) float tensor. Returns (tensor, scale, pad_x, pad_y).",
+          py::arg("rgb_data"), py::arg("width"), py::arg("height"), py::arg("bytes_per_line"), py::arg("target_size"));
+
+    m.def("decode_yolo_output", &decode_yolo_output,
+          "A function that decodes a YOLOv8-style output tensor into raw detections in original image pixels, with class-aware NMS.",
+          py::arg("output"), py::arg("confidence_threshold"), py::arg("iou_threshold"), py::arg("scale"),
+          py::arg("pad_x"), py::arg("pad_y"), py::arg("original_width"), py::arg("original_height"), py::arg("max_detections") = 300);
+
+    m.attr("STATISTICS_BOXES_PER_IMAGE_BINS") = STATISTICS_BOXES_PER_IMAGE_BINS;
+    m.attr("STATISTICS_SIZE_BINS") = STATISTICS_SIZE_BINS;
+    m.attr("STATISTICS_ASPECT_RATIO_BINS") = STATISTICS_ASPECT_RATIO_BINS;
+    m.attr("STATISTICS_ASPECT_RATIO_LOG2_RANGE") = STATISTICS_ASPECT_RATIO_LOG2_RANGE;
+
+    py::class_<DatasetStatistics>(m, "DatasetStatistics")
+        .def(py::init<>())
+        .def_readonly("total_label_files", &DatasetStatistics::total_label_files)
+        .def_readonly("empty_label_files", &DatasetStatistics::empty_label_files)
+        .def_readonly("missing_label_files", &DatasetStatistics::missing_label_files)
+        .def_readonly("total_boxes", &DatasetStatistics::total_boxes)
+        .def_readonly("invalid_lines", &DatasetStatistics::invalid_lines)
+        .def_readonly("class_counts", &DatasetStatistics::class_counts)
+        .def_readonly("boxes_per_image", &DatasetStatistics::boxes_per_image)
+        .def_readonly("box_size_histogram", &DatasetStatistics::box_size_histogram)
+        .def_readonly("aspect_ratio_histogram", &DatasetStatistics::aspect_ratio_histogram)
+        .def("add", [](DatasetStatistics &self, const DatasetStatistics &other)
+             { self.merge(other, 1); })
+        .def("subtract", [](DatasetStatistics &self, const DatasetStatistics &other)
+             { self.merge(other, -1); });
+
+    py::class_<ClassRemapResult>(m, "ClassRemapResult")
+        .def_readonly("files_changed", &ClassRemapResult::files_changed)
+        .def_readonly("boxes_remapped", &ClassRemapResult::boxes_remapped)
+        .def_readonly("boxes_deleted", &ClassRemapResult::boxes_deleted)
+        .def_readonly("failed_files", &ClassRemapResult::failed_files);
+
+    m.def("remap_label_classes", &remap_label_classes,
+          "A function that rewrites (or deletes, for a new id of -1) class ids in label files in parallel, replacing changed files atomically.",
+          py::arg("label_paths"), py::arg("class_mapping"), py::arg("num_threads") = 0,
+          py::call_guard<py::gil_scoped_release>());
+
+    m.def("read_label_class_sets", &read_label_class_sets,
+          "A function that reads the sorted set of class ids used in each label file in parallel (empty for missing files).",
+          py::arg("label_paths"), py::arg("num_threads") = 0,
+          py::call_guard<py::gil_scoped_release>());
+
+    py::class_<LinkResult>(m, "LinkResult")
+        .def_readonly("hard_links", &LinkResult::hard_links)
+        .def_readonly("symbolic_links", &LinkResult::symbolic_links)
+        .def_readonly("failed_files", &LinkResult::failed_files);
+
+    m.def("link_files", &link_files,
+          "A function that hard links (or symlinks, as a fallback or if preferred) files to new paths in parallel without copying.",
+          py::arg("source_paths"), py::arg("target_paths"), py::arg("prefer_symlinks") = false, py::arg("num_threads") = 0,
+          py::call_guard<py::gil_scoped_release>());
+
+    py::enum_<LabelIssueKind>(m, "LabelIssueKind")
+        .value("MALFORMED_LINE", LabelIssueKind::MalformedLine)
+        .value("UNKNOWN_CLASS", LabelIssueKind::UnknownClass)
+        .value("OUT_OF_RANGE", LabelIssueKind::OutOfRange)
+        .value("NON_POSITIVE_SIZE", LabelIssueKind::NonPositiveSize)
+        .value("DUPLICATE_BOX", LabelIssueKind::DuplicateBox);
+
+    py::class_<LabelIssue>(m, "LabelIssue")
+        .def_readonly("file_index", &LabelIssue::file_index)
+        .def_readonly("line", &LabelIssue::line)
+        .def_readonly("kind", &LabelIssue::kind)
+        .def_readonly("message", &LabelIssue::message);
+
+    py::class_<LabelValidationReport>(m, "LabelValidationReport")
+        .def_readonly("issues", &LabelValidationReport::issues)
+        .def_readonly("files_checked", &LabelValidationReport::files_checked)
+        .def_readonly("files_with_issues", &LabelValidationReport::files_with_issues)
+        .def_readonly("total_issues", &LabelValidationReport::total_issues);
+
+    m.def("validate_label_text", &validate_label_text,
+          "A function that validates the content of one label file and returns its issues.",
+          py::arg("text"), py::arg("known_class_ids"), py::arg("duplicate_iou") = 0.95,
+          py::call_guard<py::gil_scoped_release>());
+
+    m.def("validate_label_files", &validate_label_files,
+          "A function that validates many label files in parallel (malformed lines, unknown classes, out-of-range or empty boxes, duplicates).",
+          py::arg("label_paths"), py::arg("known_class_ids"), py::arg("duplicate_iou") = 0.95,
+          py::arg("max_issues") = 100000, py::arg("num_threads") = 0,
+          py::call_guard<py::gil_scoped_release>());
+
+    py::class_<LabelQuery>(m, "LabelQuery")
+        .def(py::init<>())
+        .def_readwrite("required_classes", &LabelQuery::required_classes)
+        .def_readwrite("excluded_classes", &LabelQuery::excluded_classes)
+        .def_readwrite("min_boxes", &LabelQuery::min_boxes)
+        .def_readwrite("max_boxes", &LabelQuery::max_boxes)
+        .def_readwrite("smaller_than", &LabelQuery::smaller_than)
+        .def_readwrite("larger_than", &LabelQuery::larger_than)
+        .def_readwrite("name_contains", &LabelQuery::name_contains);
+
+    py::class_<LabelIndex>(m, "LabelIndex")
+        .def(py::init<>())
+        .def("build", &LabelIndex::build,
+             "Summarizes the label files of the given images on native threads.",
+             py::arg("image_paths"), py::arg("label_paths"), py::arg("num_threads") = 0,
+             py::arg("image_sizes") = std::vector<std::pair<int, int>>(),
+             py::call_guard<py::gil_scoped_release>())
+        .def("build_from_box_store", [](LabelIndex &self, const std::vector<std::string> &image_paths, const py::buffer &store,
+                                        const std::vector<long long> &rows, int num_threads, const std::vector<long long> &updated_rows,
+                                        const std::vector<std::optional<std::string>> &updated_texts)
+             {
+                 py::buffer_info info = store.request();
+                 py::gil_scoped_release release;
+                 BoxStoreView view = box_store_view(info);
+                 self.build_from_box_store(image_paths, view, BoxStoreOverlay(view, updated_rows, updated_texts), rows, num_threads); },
+             "Summarizes images from the rows of a box store (-1 for images not in it) without reading label files.\n"
+             "updated_rows/updated_texts are saves not written to the store yet (None for removed files).",
+             py::arg("image_paths"), py::arg("store"), py::arg("rows"), py::arg("num_threads") = 0,
+             py::arg("updated_rows") = std::vector<long long>(),
+             py::arg("updated_texts") = std::vector<std::optional<std::string>>())
+        .def("update", &LabelIndex::update,
+             "Re-summarizes one image from its new label file content (None if the file was removed).",
+             py::arg("index"), py::arg("label_text"))
+        .def("query", [](const LabelIndex &self, const LabelQuery &query, int num_threads)
+             {
+                 std::string mask;
+                 {
+                     py::gil_scoped_release release;
+                     mask = self.query(query, num_threads);
+                 }
+                 return py::bytes(mask); },
+             "Returns one byte per image, 1 where the query matches.",
+             py::arg("query"), py::arg("num_threads") = 0)
+        .def("box_count", &LabelIndex::box_count)
+        .def("__len__", &LabelIndex::size);
+
+    m.def("compute_label_text_statistics", &compute_label_text_statistics,
+          "A function that computes the statistics contribution of one label file's content (None for a missing file).",
+          py::call_guard<py::gil_scoped_release>());
+
+    m.def("compute_label_statistics", &compute_label_statistics,
+          "A function that scans label files in parallel and returns aggregated class counts and histograms.",
+          py::arg("label_paths"), py::arg("num_threads") = 0,
+          py::call_guard<py::gil_scoped_release>());
+
+    m.def("build_box_store", &build_box_store,
+          "A function that reads the label files and image sizes of a dataset in parallel and writes them to a columnar box store file.",
+          py::arg("image_paths"), py::arg("label_paths"), py::arg("output_path"), py::arg("num_threads") = 0,
+          py::arg("image_sizes") = std::vector<std::pair<int, int>>(),
+          py::call_guard<py::gil_scoped_release>());
+
+    m.def("write_updated_box_store", [](const py::buffer &store, const std::vector<long long> &rows,
+                                        const std::vector<std::optional<std::string>> &label_texts, const std::string &output_path)
+          {
+              py::buffer_info info = store.request();
+              py::gil_scoped_release release;
+              return write_updated_box_store(box_store_view(info), rows, label_texts, output_path); },
+          "A function that writes a copy of a box store with the boxes of some rows replaced by new label text (None for removed files).",
+          py::arg("store"), py::arg("rows"), py::arg("label_texts"), py::arg("output_path"));
+
+    m.def("read_box_store_names", [](const py::buffer &store)
+          {
+              py::buffer_info info = store.request();
+              BoxStoreView view = box_store_view(info);
+              std::vector<std::string> names;
+              names.reserve(view.image_count);
+              const char *name = view.names, *names_end = view.names + view.names_size;
+              while (name < names_end)
+              {
+                  const char *name_end = static_cast<const char *>(memchr(name, '\n', names_end - name));
+                  if (name_end == nullptr)
+                      break;
+                  names.emplace_back(name, name_end);
+                  name = name_end + 1;
+              }
+              if (names.size() != view.image_count)
+                  throw std::invalid_argument("Box store file is truncated or damaged");
+              return names; },
+          "A function that validates a box store and returns the label file name of every row.",
+          py::arg("store"));
+
+    m.def("read_box_store_boxes", [](const py::buffer &store, long long row)
+          {
+              py::buffer_info info = store.request();
+              return read_box_store_boxes(box_store_view(info), row); },
+          "A function that returns the normalized boxes of one row of a box store, or None if it has no label file.",
+          py::arg("store"), py::arg("row"));
+
+    m.def("compute_box_store_statistics", [](const py::buffer &store, const std::vector<long long> &rows, int num_threads,
+                                             const std::vector<long long> &updated_rows,
+                                             const std::vector<std::optional<std::string>> &updated_texts)
+          {
+              py::buffer_info info = store.request();
+              py::gil_scoped_release release;
+              BoxStoreView view = box_store_view(info);
+              return compute_box_store_statistics(view, BoxStoreOverlay(view, updated_rows, updated_texts), rows, num_threads); },
+          "A function that aggregates the statistics of rows of a box store (-1 for images not in it) without reading label files.\n"
+          "updated_rows/updated_texts are saves not written to the store yet (None for removed files).",
+          py::arg("store"), py::arg("rows"), py::arg("num_threads") = 0,
+          py::arg("updated_rows") = std::vector<long long>(),
+          py::arg("updated_texts") = std::vector<std::optional<std::string>>());
+
+    m.def("export_box_store_labels", [](const py::buffer &store, const std::vector<long long> &rows,
+                                        const std::vector<std::string> &label_paths, int num_threads,
+                                        const std::vector<long long> &updated_rows,
+                                        const std::vector<std::optional<std::string>> &updated_texts)
+          {
+              py::buffer_info info = store.request();
+              py::gil_scoped_release release;
+              BoxStoreView view = box_store_view(info);
+              return export_box_store_labels(view, BoxStoreOverlay(view, updated_rows, updated_texts), rows, label_paths, num_threads); },
+          "A function that writes rows of a box store as YOLO label files in parallel and returns the paths that failed.\n"
+          "updated_rows/updated_texts are saves not written to the store yet (None for removed files).",
+          py::arg("store"), py::arg("rows"), py::arg("label_paths"), py::arg("num_threads") = 0,
+          py::arg("updated_rows") = std::vector<long long>(),
+          py::arg("updated_texts") = std::vector<std::optional<std::string>>());
 }
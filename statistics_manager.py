@@ -0,0 +1,66 @@
+from PyQt6.QtCore import QObject, pyqtSignal
+
+import bbox_utils # Import the C++ module
+from workers import run_in_background
+
+class StatisticsManager(QObject):
+    statistics_updated = pyqtSignal(object) # Emits the current bbox_utils.DatasetStatistics
+
+    def __init__(self, main_window):
+        super().__init__()
+        self.main_window = main_window
+        self.statistics = bbox_utils.DatasetStatistics()
+        self._recompute_running = False
+        self._recompute_pending = False # A change happened while a full scan was running
+
+    def recompute(self):
+        """Rescans every label file of the dataset on a worker thread."""
+        if self._recompute_running:
+            self._recompute_pending = True
+            return
+
+        label_paths = self.main_window.dataset_manager.get_label_filepaths()
+        box_store = self.main_window.dataset_manager.box_store_for_images()
+        self._recompute_running = True
+        self._recompute_pending = False
+        self.main_window.statusBar.showMessage(f"Computing statistics for {len(label_paths)} label files...")
+        if box_store is not None:
+            # Same statistics from the memory-mapped box store, without opening every label file
+            store_buffer, rows, updated_rows, updated_texts = box_store
+            run_in_background(bbox_utils.compute_box_store_statistics, store_buffer, rows,
+                              updated_rows=updated_rows, updated_texts=updated_texts,
+                              on_finished=self._on_recompute_finished,
+                              on_error=self._on_recompute_error)
+            return
+        run_in_background(bbox_utils.compute_label_statistics, label_paths,
+                          on_finished=self._on_recompute_finished,
+                          on_error=self._on_recompute_error)
+
+    def _on_recompute_finished(self, statistics):
+        self._recompute_running = False
+        if self._recompute_pending:
+            # A save raced with the scan, so its delta may or may not be included. Scan again.
+            self.recompute()
+            return
+        self.statistics = statistics
+        self.statistics_updated.emit(self.statistics)
+        self.main_window.statusBar.showMessage(f"Statistics updated: {statistics.total_boxes} boxes in {statistics.total_label_files} label files.")
+
+    def _on_recompute_error(self, message):
+        self._recompute_running = False
+        self.main_window.statusBar.showMessage(f"Error computing statistics: {message}")
+
+    def update_label_file(self, old_text, new_text):
+        """Applies the change of a single label file incrementally. None means the file does not exist."""
+        if old_text == new_text:
+            return
+        if self._recompute_running:
+            self._recompute_pending = True
+            return
+        self.statistics.subtract(bbox_utils.compute_label_text_statistics(old_text))
+        self.statistics.add(bbox_utils.compute_label_text_statistics(new_text))
+        self.statistics_updated.emit(self.statistics)
+
+    def reset(self):
+        self.statistics = bbox_utils.DatasetStatistics()
+        self.statistics_updated.emit(self.statistics)
@@ -2,14 +2,20 @@ import os
 from PyQt6.QtWidgets import (
     QMainWindow, QWidget, QVBoxLayout, QHBoxLayout, QLabel, QStatusBar,
     QToolBar, QDockWidget, QFileDialog, QListWidget, QListWidgetItem,
-    QFrame, QPushButton, QStyle, QSizePolicy, QInputDialog, QLineEdit, QApplication, QComboBox
+    QFrame, QPushButton, QStyle, QSizePolicy, QInputDialog, QLineEdit, QApplication, QComboBox, QSpinBox, QSlider,
+    QTreeWidget, QTreeWidgetItem, QStackedWidget, QCheckBox
 )
 from PyQt6.QtCore import Qt, QDir, QSize, pyqtSignal, QRectF
 from PyQt6.QtGui import QPixmap, QImageReader, QIcon
 
-from widgets import ImageListItemWidget
+import bbox_utils # Import the C++ module for the histogram layout constants
+from inference_backends import INFERENCE_BACKENDS, DEFAULT_INFERENCE_BACKEND
+from label_query import LABEL_QUERY_HELP
+
+from widgets import ImageListItemWidget, HistogramWidget
 from styles import DARK_THEME
 from canvas_widget import ZoomPanLabel
+from review_grid import ReviewGridWidget
 
 class UIManager:
     def __init__(self, main_window: QMainWindow):
@@ -23,6 +29,8 @@ class UIManager:
         self.setup_toolbar()
         self.setup_left_panel()
         self.setup_right_panel()
+        self.setup_statistics_panel()
+        self.setup_validation_panel()
         self.setup_status_bar()
         self.setup_canvas()
 
@@ -34,6 +42,20 @@ class UIManager:
         self.main_window.addToolBar(Qt.ToolBarArea.TopToolBarArea, self.main_window.toolbar)
 
         self.main_window.load_dataset_action = self.main_window.toolbar.addAction("Load Dataset")
+        self.main_window.open_archive_action = self.main_window.toolbar.addAction("Open Archive")
+        self.main_window.open_video_action = self.main_window.toolbar.addAction("Open Video")
+        self.main_window.export_coco_action = self.main_window.toolbar.addAction("Export COCO")
+        self.main_window.create_split_action = self.main_window.toolbar.addAction("Create Split")
+        self.main_window.import_coco_action = self.main_window.toolbar.addAction("Import COCO")
+        self.main_window.import_voc_action = self.main_window.toolbar.addAction("Import VOC")
+        self.main_window.image_cache_action = self.main_window.toolbar.addAction("Image Cache")
+        self.main_window.box_store_action = self.main_window.toolbar.addAction("Box Store")
+        self.main_window.box_store_action.setCheckable(True) # Keeps all boxes in one memory-mapped file beside the label files
+        self.main_window.box_store_action.setToolTip("Keep every box of the dataset in one memory-mapped file for fast statistics, queries and display.\n"
+                                                     "Turn off and on again to rebuild it after editing label files outside the app.")
+        self.main_window.export_labels_action = self.main_window.toolbar.addAction("Export TXT")
+        self.main_window.review_grid_action = self.main_window.toolbar.addAction("Review Grid")
+        self.main_window.review_grid_action.setCheckable(True) # Switches the central area between canvas and grid
         # Connect to a method in MainWindow or a DatasetManager
         # self.main_window.load_dataset_action.triggered.connect(self.main_window.load_dataset)
 
@@ -48,7 +70,12 @@ class UIManager:
         # self.main_window.canvas_label.label_needed_signal.connect(self.main_window.statusBar.showMessage)
         canvas_layout = QVBoxLayout(self.main_window.canvas_widget)
         canvas_layout.addWidget(self.main_window.canvas_label)
-        self.main_window.setCentralWidget(self.main_window.canvas_widget)
+
+        self.main_window.review_grid = ReviewGridWidget()
+        self.main_window.central_stack = QStackedWidget()
+        self.main_window.central_stack.addWidget(self.main_window.canvas_widget)
+        self.main_window.central_stack.addWidget(self.main_window.review_grid)
+        self.main_window.setCentralWidget(self.main_window.central_stack)
 
     def setup_left_panel(self):
         self.main_window.left_panel = QDockWidget("Dataset Management")
@@ -61,11 +88,17 @@ class UIManager:
         filter_layout = QHBoxLayout()
         filter_label = QLabel("Filter:")
         self.main_window.filter_combobox = QComboBox()
-        self.main_window.filter_combobox.addItems(["All", "Labelled", "Unlabelled", "Auto-labelled"])
+        self.main_window.filter_combobox.addItems(["All", "Labelled", "Unlabelled", "Auto-labelled", "Hide Duplicates", "Duplicates Only"])
         filter_layout.addWidget(filter_label)
         filter_layout.addWidget(self.main_window.filter_combobox)
         left_layout.addLayout(filter_layout)
 
+        # Query box, combined with the filter above
+        self.main_window.label_query_edit = QLineEdit()
+        self.main_window.label_query_edit.setPlaceholderText(LABEL_QUERY_HELP)
+        self.main_window.label_query_edit.setClearButtonEnabled(True)
+        left_layout.addWidget(self.main_window.label_query_edit)
+
         self.main_window.left_panel_list = QListWidget()
         left_layout.addWidget(self.main_window.left_panel_list)
         
@@ -94,6 +127,19 @@ class UIManager:
         label_buttons_layout.addWidget(self.main_window.delete_label_button)
         label_management_layout.addLayout(label_buttons_layout)
 
+        # Dataset-wide class operations, rewrite every label file
+        class_buttons_layout = QHBoxLayout()
+        self.main_window.merge_label_button = QPushButton("Merge")
+        self.main_window.merge_label_button.setToolTip("Relabel every box of the selected label as another label")
+        self.main_window.change_label_id_button = QPushButton("Change ID")
+        self.main_window.change_label_id_button.setToolTip("Give the selected label a new class id in every label file")
+        self.main_window.compact_label_ids_button = QPushButton("Compact IDs")
+        self.main_window.compact_label_ids_button.setToolTip("Renumber the class ids 0..n-1 in every label file")
+        class_buttons_layout.addWidget(self.main_window.merge_label_button)
+        class_buttons_layout.addWidget(self.main_window.change_label_id_button)
+        class_buttons_layout.addWidget(self.main_window.compact_label_ids_button)
+        label_management_layout.addLayout(class_buttons_layout)
+
         left_layout.addWidget(self.main_window.label_management_widget)
         
         left_layout.setStretchFactor(self.main_window.left_panel_list, 6) 
@@ -149,6 +195,37 @@ class UIManager:
         self.main_window.import_yolo_model_button.clicked.connect(self.main_window.dataset_manager.import_yolo_model)
         right_layout.addWidget(self.main_window.import_yolo_model_button)
 
+        # Inference backend and thread count
+        self.main_window.inference_backend_combobox = QComboBox()
+        self.main_window.inference_backend_combobox.addItems(list(INFERENCE_BACKENDS))
+        self.main_window.inference_backend_combobox.setCurrentText(DEFAULT_INFERENCE_BACKEND)
+        right_layout.addWidget(self.main_window.inference_backend_combobox)
+
+        threads_layout = QHBoxLayout()
+        threads_layout.addWidget(QLabel("Threads:"))
+        self.main_window.inference_threads_spinbox = QSpinBox()
+        self.main_window.inference_threads_spinbox.setRange(0, os.cpu_count() or 64)
+        self.main_window.inference_threads_spinbox.setSpecialValueText("Auto") # 0 lets the backend decide
+        self.main_window.inference_threads_spinbox.setKeyboardTracking(False) # Typed values apply once, not per keystroke
+        threads_layout.addWidget(self.main_window.inference_threads_spinbox)
+        right_layout.addLayout(threads_layout)
+
+        # Tiled inference for high-resolution images
+        tiles_layout = QHBoxLayout()
+        tiles_layout.addWidget(QLabel("Tiles:"))
+        self.main_window.tile_size_spinbox = QSpinBox()
+        self.main_window.tile_size_spinbox.setRange(0, 8192)
+        self.main_window.tile_size_spinbox.setSingleStep(64)
+        self.main_window.tile_size_spinbox.setSuffix(" px")
+        self.main_window.tile_size_spinbox.setSpecialValueText("Off") # 0 runs the model on the whole image
+        tiles_layout.addWidget(self.main_window.tile_size_spinbox)
+        self.main_window.tile_overlap_spinbox = QSpinBox()
+        self.main_window.tile_overlap_spinbox.setRange(0, 50)
+        self.main_window.tile_overlap_spinbox.setValue(20)
+        self.main_window.tile_overlap_spinbox.setSuffix("% overlap")
+        tiles_layout.addWidget(self.main_window.tile_overlap_spinbox)
+        right_layout.addLayout(tiles_layout)
+
         self.main_window.auto_label_button = QPushButton("Auto Label Current Image")
         self.main_window.auto_label_button.clicked.connect(self.main_window.dataset_manager.auto_label_image)
         self.main_window.auto_label_button.setEnabled(False) # Initially disabled
@@ -159,6 +236,14 @@ class UIManager:
         self.main_window.auto_label_all_button.setEnabled(False) # Initially disabled
         right_layout.addWidget(self.main_window.auto_label_all_button)
 
+        # Confidence threshold, re-filters cached detections without running the model again
+        self.main_window.confidence_label = QLabel("Confidence: 0.50")
+        right_layout.addWidget(self.main_window.confidence_label)
+        self.main_window.confidence_slider = QSlider(Qt.Orientation.Horizontal)
+        self.main_window.confidence_slider.setRange(5, 95) # Hundredths; raw detections are cached down to 0.05
+        self.main_window.confidence_slider.setValue(50)
+        right_layout.addWidget(self.main_window.confidence_slider)
+
         right_layout.addStretch(1) # This pushes the following widgets to the bottom
 
         # Separator for bottom buttons group
@@ -177,11 +262,137 @@ class UIManager:
         navigation_buttons_layout.addWidget(self.main_window.previous_image_button)
         navigation_buttons_layout.addWidget(self.main_window.next_image_button)
         right_layout.addLayout(navigation_buttons_layout)
+        self.main_window.propagate_boxes_button = QPushButton("Propagate from Previous")
+        self.main_window.propagate_boxes_button.setToolTip("Copy the previous image's boxes, refined by detections when a model is loaded (Ctrl+Z undoes)")
+        right_layout.addWidget(self.main_window.propagate_boxes_button)
+        self.main_window.auto_propagate_checkbox = QCheckBox("Propagate on Next")
+        self.main_window.auto_propagate_checkbox.setToolTip("Bring boxes forward when Next opens an image without boxes")
+        right_layout.addWidget(self.main_window.auto_propagate_checkbox)
 
         self.main_window.right_panel.setWidget(right_content)
         self.main_window.addDockWidget(Qt.DockWidgetArea.RightDockWidgetArea, self.main_window.right_panel)
         self.main_window.right_panel.setFixedWidth(200)
 
+    def setup_statistics_panel(self):
+        self.main_window.statistics_panel = QDockWidget("Dataset Statistics")
+        self.main_window.statistics_panel.setAllowedAreas(Qt.DockWidgetArea.BottomDockWidgetArea | Qt.DockWidgetArea.LeftDockWidgetArea | Qt.DockWidgetArea.RightDockWidgetArea)
+        statistics_content = QWidget()
+        statistics_layout = QHBoxLayout(statistics_content)
+
+        summary_layout = QVBoxLayout()
+        self.main_window.statistics_summary_label = QLabel("No dataset loaded.")
+        self.main_window.statistics_summary_label.setAlignment(Qt.AlignmentFlag.AlignTop | Qt.AlignmentFlag.AlignLeft)
+        summary_layout.addWidget(self.main_window.statistics_summary_label)
+        self.main_window.refresh_statistics_button = QPushButton("Refresh")
+        summary_layout.addWidget(self.main_window.refresh_statistics_button)
+        statistics_layout.addLayout(summary_layout)
+
+        self.main_window.class_counts_list = QListWidget()
+        statistics_layout.addWidget(self.main_window.class_counts_list)
+
+        self.main_window.boxes_per_image_histogram = HistogramWidget("Boxes per image")
+        self.main_window.box_size_histogram = HistogramWidget("Box size (sqrt of relative area)")
+        self.main_window.aspect_ratio_histogram = HistogramWidget("Aspect ratio (w/h)")
+        statistics_layout.addWidget(self.main_window.boxes_per_image_histogram)
+        statistics_layout.addWidget(self.main_window.box_size_histogram)
+        statistics_layout.addWidget(self.main_window.aspect_ratio_histogram)
+
+        self.main_window.statistics_panel.setWidget(statistics_content)
+        self.main_window.addDockWidget(Qt.DockWidgetArea.BottomDockWidgetArea, self.main_window.statistics_panel)
+        self.main_window.statistics_panel.hide() # Shown on demand from the toolbar
+        self.main_window.toolbar.addAction(self.main_window.statistics_panel.toggleViewAction())
+
+    def update_statistics_panel(self, statistics):
+        label_names = {label['id']: label['name'] for label in self.main_window.dataset_manager.labels}
+        self.main_window.statistics_summary_label.setText(
+            f"Label files: {statistics.total_label_files}\n"
+            f"Empty label files: {statistics.empty_label_files}\n"
+            f"Images without labels: {statistics.missing_label_files}\n"
+            f"Boxes: {statistics.total_boxes}\n"
+            f"Invalid lines: {statistics.invalid_lines}"
+        )
+
+        self.main_window.class_counts_list.clear()
+        for class_id, count in sorted(statistics.class_counts.items()):
+            name = label_names.get(class_id, f"ID {class_id} (Unknown)")
+            self.main_window.class_counts_list.addItem(f"{name}: {count}")
+
+        last_count_bin = bbox_utils.STATISTICS_BOXES_PER_IMAGE_BINS - 1
+        self.main_window.boxes_per_image_histogram.set_data(statistics.boxes_per_image, "0", f"{last_count_bin}+")
+        self.main_window.box_size_histogram.set_data(statistics.box_size_histogram, "0", "1")
+        ratio_range = 2 ** int(bbox_utils.STATISTICS_ASPECT_RATIO_LOG2_RANGE)
+        self.main_window.aspect_ratio_histogram.set_data(statistics.aspect_ratio_histogram, f"1:{ratio_range}", f"{ratio_range}:1")
+
+    def setup_validation_panel(self):
+        self.main_window.validation_panel = QDockWidget("Label Issues")
+        self.main_window.validation_panel.setAllowedAreas(Qt.DockWidgetArea.BottomDockWidgetArea | Qt.DockWidgetArea.LeftDockWidgetArea | Qt.DockWidgetArea.RightDockWidgetArea)
+        validation_content = QWidget()
+        validation_layout = QVBoxLayout(validation_content)
+
+        summary_layout = QHBoxLayout()
+        self.main_window.validation_summary_label = QLabel("No dataset loaded.")
+        summary_layout.addWidget(self.main_window.validation_summary_label, 1)
+        self.main_window.validate_labels_button = QPushButton("Check Again")
+        summary_layout.addWidget(self.main_window.validate_labels_button)
+        validation_layout.addLayout(summary_layout)
+
+        # One row per label file with issues, one child per issue; activating a row opens its image
+        self.main_window.validation_tree = QTreeWidget()
+        self.main_window.validation_tree.setHeaderLabels(["File", "Line", "Issue"])
+        self.main_window.validation_tree.setUniformRowHeights(True)
+        validation_layout.addWidget(self.main_window.validation_tree)
+        self._validation_items = {} # {label path: top level item}
+
+        self.main_window.validation_panel.setWidget(validation_content)
+        self.main_window.addDockWidget(Qt.DockWidgetArea.BottomDockWidgetArea, self.main_window.validation_panel)
+        self.main_window.tabifyDockWidget(self.main_window.statistics_panel, self.main_window.validation_panel)
+        self.main_window.validation_panel.hide() # Shown on demand from the toolbar
+        self.main_window.toolbar.addAction(self.main_window.validation_panel.toggleViewAction())
+
+    def _create_validation_file_item(self, label_path, image_path, issues):
+        file_item = QTreeWidgetItem([os.path.basename(label_path), "", f"{len(issues)} issues"])
+        file_item.setData(0, Qt.ItemDataRole.UserRole, image_path)
+        for issue in issues:
+            issue_item = QTreeWidgetItem(file_item, ["", str(issue.line), issue.message])
+            issue_item.setData(0, Qt.ItemDataRole.UserRole, image_path)
+        return file_item
+
+    def _update_validation_summary(self, validation_manager):
+        summary = (f"{validation_manager.total_issues} issues in {len(validation_manager.issues_by_label_path)} of "
+                   f"{validation_manager.files_checked} label files, {len(validation_manager.orphan_paths)} label files without an image.")
+        listed_issues = sum(len(issues) for issues in validation_manager.issues_by_label_path.values())
+        if listed_issues < validation_manager.total_issues:
+            summary += f" Listing the first {listed_issues}."
+        self.main_window.validation_summary_label.setText(summary)
+
+    def update_validation_panel(self, validation_manager):
+        tree = self.main_window.validation_tree
+        tree.clear()
+        self._validation_items = {}
+        items = []
+        for label_path, issues in validation_manager.issues_by_label_path.items():
+            file_item = self._create_validation_file_item(label_path, validation_manager.image_by_label_path.get(label_path), issues)
+            self._validation_items[label_path] = file_item
+            items.append(file_item)
+        for orphan_path in validation_manager.orphan_paths:
+            items.append(QTreeWidgetItem([os.path.basename(orphan_path), "", "No image for this label file"]))
+        tree.addTopLevelItems(items) # One insertion instead of one per file
+        self._update_validation_summary(validation_manager)
+
+    def update_validation_file(self, validation_manager, label_path):
+        tree = self.main_window.validation_tree
+        old_item = self._validation_items.pop(label_path, None)
+        row = tree.indexOfTopLevelItem(old_item) if old_item else tree.topLevelItemCount()
+        if old_item:
+            tree.takeTopLevelItem(row)
+        issues = validation_manager.issues_by_label_path.get(label_path)
+        if issues:
+            file_item = self._create_validation_file_item(label_path, validation_manager.image_by_label_path.get(label_path), issues)
+            self._validation_items[label_path] = file_item
+            tree.insertTopLevelItem(row, file_item)
+            file_item.setExpanded(old_item is not None and old_item.isExpanded())
+        self._update_validation_summary(validation_manager)
+
     def setup_status_bar(self):
         self.main_window.statusBar = QStatusBar()
         self.main_window.setStatusBar(self.main_window.statusBar)
@@ -0,0 +1,110 @@
+import os
+from PyQt6.QtCore import QObject, pyqtSignal
+
+import bbox_utils # Import the C++ module
+from workers import run_in_background
+
+DUPLICATE_BOX_IOU = 0.95 # Boxes of the same class overlapping at least this much are reported as duplicates
+MAX_REPORTED_ISSUES = 20000 # Issues listed in the report; the total is still counted
+NON_LABEL_TEXT_FILES = {"classes.txt"} # .txt files in a dataset that are not label files
+
+def validate_dataset(dataset_folder, image_paths, label_paths, class_ids):
+    """Worker function: validates every label file and looks for label files without an image.
+
+    Returns ({label path: [bbox_utils.LabelIssue, ...]}, {label path: image path}, orphan label paths, report).
+    """
+    report = bbox_utils.validate_label_files(label_paths, class_ids, DUPLICATE_BOX_IOU, MAX_REPORTED_ISSUES)
+    issues_by_label_path = {}
+    for issue in report.issues:
+        issues_by_label_path.setdefault(label_paths[issue.file_index], []).append(issue)
+    image_by_label_path = dict(zip(label_paths, image_paths))
+
+    known_label_paths = set(label_paths)
+    orphan_paths = []
+    with os.scandir(dataset_folder) as entries:
+        for entry in entries:
+            if entry.name.endswith(".txt") and entry.name not in NON_LABEL_TEXT_FILES and entry.path not in known_label_paths and entry.is_file():
+                orphan_paths.append(entry.path)
+    orphan_paths.sort()
+    return issues_by_label_path, image_by_label_path, orphan_paths, report
+
+class ValidationManager(QObject):
+    report_updated = pyqtSignal() # The whole report changed
+    file_issues_changed = pyqtSignal(str) # The issues of one label file changed after it was saved
+
+    def __init__(self, main_window):
+        super().__init__()
+        self.main_window = main_window
+        self.issues_by_label_path = {} # {label path: [bbox_utils.LabelIssue, ...]}, only files with issues
+        self.image_by_label_path = {}
+        self.orphan_paths = [] # Label files without an image
+        self.files_checked = 0
+        self.total_issues = 0
+        self._class_ids = []
+        self._report_folder = None # Dataset folder the report is about
+        self._validation_running = False
+        self._validation_pending = False # Labels changed while a full validation was running
+
+    def validate(self):
+        """Validates every label file of the dataset on a worker thread."""
+        dataset_manager = self.main_window.dataset_manager
+        if not dataset_manager.dataset_folder:
+            return
+        if self._validation_running:
+            self._validation_pending = True
+            return
+
+        self._validation_running = True
+        self._validation_pending = False
+        self._report_folder = dataset_manager.dataset_folder
+        self._class_ids = [label['id'] for label in dataset_manager.labels]
+        run_in_background(validate_dataset, dataset_manager.dataset_folder, list(dataset_manager.image_files),
+                          dataset_manager.get_label_filepaths(), self._class_ids,
+                          on_finished=self._on_validation_finished,
+                          on_error=self._on_validation_error)
+
+    def set_labels(self, labels):
+        """Takes the class ids of the current labels, connected to labels_updated so saves are checked against them.
+
+        If they changed, the report of the loaded dataset is redone, since its unknown class issues no longer hold.
+        """
+        class_ids = [label['id'] for label in labels]
+        if class_ids == self._class_ids:
+            return
+        self._class_ids = class_ids
+        if self._validation_running:
+            self._validation_pending = True # The running validation checks against the old classes
+        elif self._report_folder and self._report_folder == self.main_window.dataset_manager.dataset_folder:
+            self.validate() # A dataset that is still loading is validated once dataset_loaded is emitted
+
+    def _on_validation_finished(self, result):
+        self._validation_running = False
+        if self._validation_pending:
+            self.validate()
+            return
+        self.issues_by_label_path, self.image_by_label_path, self.orphan_paths, report = result
+        self.files_checked = report.files_checked
+        self.total_issues = report.total_issues
+        self.report_updated.emit()
+        if self.total_issues or self.orphan_paths:
+            self.main_window.statusBar.showMessage(
+                f"Label check: {self.total_issues} issues in {report.files_with_issues} files, {len(self.orphan_paths)} label files without an image.")
+
+    def _on_validation_error(self, message):
+        self._validation_running = False
+        self.main_window.statusBar.showMessage(f"Error validating labels: {message}")
+
+    def update_label_file(self, label_filepath, old_text, new_text):
+        """Re-checks a single label file after it was written. None means the file was removed."""
+        if self._validation_running:
+            self._validation_pending = True
+            return
+        if label_filepath not in self.image_by_label_path:
+            return
+        issues = bbox_utils.validate_label_text(new_text, self._class_ids, DUPLICATE_BOX_IOU) if new_text else []
+        old_issues = self.issues_by_label_path.pop(label_filepath, [])
+        if issues:
+            self.issues_by_label_path[label_filepath] = issues
+        if issues or old_issues:
+            self.total_issues += len(issues) - len(old_issues)
+            self.file_issues_changed.emit(label_filepath)
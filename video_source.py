@@ -0,0 +1,226 @@
+import os
+import re
+import json
+import hashlib
+import threading
+
+from label_writer import write_text_atomically
+from dataset_export import export_coco
+
+VIDEO_EXTENSIONS = (".mp4", ".avi", ".mov", ".mkv", ".webm", ".m4v")
+VIDEO_OVERLAY_SUFFIX = ".frames" # Labels of a video's frames live in <video>.frames beside it
+VIDEO_INDEX_FILENAME = "video_index.json"
+DEFAULT_FRAME_STRIDE = 10 # Every n-th frame is listed as an image
+SEQUENTIAL_GRAB_LIMIT = 48 # Frames decoded forward instead of seeking, about one keyframe interval
+MAX_VIDEO_DECODERS = 4 # Open cv2.VideoCapture contexts per video, shared by every thread that decodes frames
+EXPORT_JPEG_QUALITY = 95
+
+_FRAME_FILE_PATTERN = re.compile(r"^frame_(\d+)\.(?:bmp|txt)$")
+
+def is_video_path(path):
+    return path.lower().endswith(VIDEO_EXTENSIONS)
+
+def frame_file_name(frame_index, extension=".bmp"):
+    return f"frame_{frame_index:07d}{extension}"
+
+class VideoSource:
+    """Frames of a video file, addressed by virtual image paths inside the video's overlay folder.
+
+    Frame n is the image <overlay>/frame_000000n.bmp and its labels go to frame_000000n.txt beside
+    it, so a video behaves like a dataset folder without extracting any frame. Every stride-th
+    frame is listed, plus any frame that already has a label file. Frames are decoded on demand
+    with OpenCV by a small pool of decoders that threads borrow per frame. A thread gets the idle
+    decoder positioned just before its frame if there is one, reads nearby frames by decoding
+    forward and seeks further jumps, which FFmpeg resolves from the preceding keyframe.
+    """
+
+    def __init__(self, video_path, stride=None):
+        self.video_path = os.path.abspath(video_path)
+        self.overlay_folder = self.video_path + VIDEO_OVERLAY_SUFFIX
+        self.stride = stride
+        self.frame_count = 0
+        self.fps = 0.0
+        self.frame_size = (0, 0) # (width, height)
+        self._frames = {} # {virtual path: frame index}
+        self._idle_decoders = [] # [[cv2.VideoCapture, index of the next frame, generation], ...], least recently used first
+        self._decoder_count = 0 # Decoders of the current generation, idle or in use
+        self._decoder_generation = 0 # Incremented by close, older decoders are released when returned
+        self._decoders_available = threading.Condition()
+
+    def open(self):
+        """Reads the video's frame count and size, or the cached index if the video did not change."""
+        os.makedirs(self.overlay_folder, exist_ok=True)
+        stat = os.stat(self.video_path)
+        index_path = os.path.join(self.overlay_folder, VIDEO_INDEX_FILENAME)
+        index = self._load_index(index_path)
+        previous_index = index
+        if index is None or index['video_size'] != stat.st_size or index['video_mtime_ns'] != stat.st_mtime_ns:
+            import cv2 # Imported on first use, only video datasets need OpenCV
+            capture = cv2.VideoCapture(self.video_path)
+            try:
+                if not capture.isOpened():
+                    raise ValueError(f"Could not open video {os.path.basename(self.video_path)}")
+                index = {'video_size': stat.st_size, 'video_mtime_ns': stat.st_mtime_ns,
+                         'frame_count': int(capture.get(cv2.CAP_PROP_FRAME_COUNT)), 'fps': capture.get(cv2.CAP_PROP_FPS),
+                         'width': int(capture.get(cv2.CAP_PROP_FRAME_WIDTH)), 'height': int(capture.get(cv2.CAP_PROP_FRAME_HEIGHT)),
+                         'stride': index['stride'] if index else DEFAULT_FRAME_STRIDE}
+            finally:
+                capture.release()
+        if self.stride is None:
+            self.stride = index['stride'] # Reopened, keep the stride it was opened with
+        index = dict(index, stride=self.stride)
+        if index != previous_index:
+            write_text_atomically(index_path, json.dumps(index))
+        self.frame_count = index['frame_count']
+        self.fps = index['fps']
+        self.frame_size = (index['width'], index['height'])
+
+        frame_indices = set(range(0, self.frame_count, max(1, self.stride)))
+        with os.scandir(self.overlay_folder) as entries:
+            for entry in entries:
+                match = _FRAME_FILE_PATTERN.match(entry.name)
+                if match and int(match.group(1)) < self.frame_count:
+                    frame_indices.add(int(match.group(1))) # Labelled frames stay listed whatever the stride
+        self._frames = {os.path.join(self.overlay_folder, frame_file_name(frame_index)): frame_index
+                        for frame_index in sorted(frame_indices)}
+        return self
+
+    def _load_index(self, index_path):
+        try:
+            with open(index_path, 'r') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def image_paths(self):
+        return list(self._frames)
+
+    def contains(self, path):
+        return path in self._frames
+
+    def frame_index(self, path):
+        return self._frames[path]
+
+    def member_signature(self, path):
+        """Returns (size, mtime_ns) for a frame: the decoded frame size and the video's mtime."""
+        width, height = self.frame_size
+        return width * height * 3, os.stat(self.video_path).st_mtime_ns
+
+    def member_size(self, path):
+        """Returns (width, height) of a frame, the same for every frame of the video."""
+        return self.frame_size
+
+    def member_digest(self, path):
+        """Identifies a frame's content without decoding it: the video's size and mtime and the frame index."""
+        stat = os.stat(self.video_path)
+        return hashlib.sha1(f"{stat.st_size}:{stat.st_mtime_ns}:{self._frames[path]}".encode()).hexdigest()
+
+    def _acquire_decoder(self, frame_index):
+        """Takes the idle decoder closest before frame_index, opens one if fewer than MAX_VIDEO_DECODERS exist, or waits."""
+        import cv2
+        with self._decoders_available:
+            while True:
+                nearby = [decoder for decoder in self._idle_decoders if 0 <= frame_index - decoder[1] <= SEQUENTIAL_GRAB_LIMIT]
+                if nearby:
+                    decoder = min(nearby, key=lambda decoder: frame_index - decoder[1])
+                    self._idle_decoders.remove(decoder)
+                    return decoder
+                if self._decoder_count < MAX_VIDEO_DECODERS:
+                    self._decoder_count += 1
+                    generation = self._decoder_generation
+                    break
+                if self._idle_decoders:
+                    return self._idle_decoders.pop(0) # Seeks, from the least recently used position
+                self._decoders_available.wait()
+        return [cv2.VideoCapture(self.video_path), -SEQUENTIAL_GRAB_LIMIT - 1, generation]
+
+    def _release_decoder(self, decoder):
+        with self._decoders_available:
+            if decoder[2] == self._decoder_generation:
+                self._idle_decoders.append(decoder)
+            else:
+                decoder[0].release() # The source was closed while the frame was decoded
+            self._decoders_available.notify()
+
+    def decode_frame(self, frame_index):
+        """Returns a frame as a (height, width, 3) uint8 BGR array."""
+        import cv2
+        decoder = self._acquire_decoder(frame_index)
+        try:
+            capture, next_frame, _ = decoder
+            if 0 <= frame_index - next_frame <= SEQUENTIAL_GRAB_LIMIT:
+                for _ in range(frame_index - next_frame):
+                    capture.grab() # Decoding forward is cheaper than seeking to a frame this close
+            else:
+                capture.set(cv2.CAP_PROP_POS_FRAMES, frame_index)
+            ok, frame = capture.read()
+            decoder[1] = frame_index + 1
+            if not ok:
+                decoder[1] = -SEQUENTIAL_GRAB_LIMIT - 1 # Position unknown, seek next time
+                raise ValueError(f"Could not decode frame {frame_index} of {os.path.basename(self.video_path)}")
+            return frame
+        finally:
+            self._release_decoder(decoder)
+
+    def read_bytes(self, path):
+        """Returns a frame encoded as BMP, which is quick to encode and decode, for QImageReader."""
+        import cv2
+        ok, encoded = cv2.imencode(".bmp", self.decode_frame(self._frames[path]))
+        if not ok:
+            raise ValueError(f"Could not encode frame {self._frames[path]}")
+        return encoded.tobytes()
+
+    def close(self):
+        """Releases the decoders. Decoders in use are released when their frame is done, the source can still be read."""
+        with self._decoders_available:
+            for capture, _, _ in self._idle_decoders:
+                capture.release()
+            self._idle_decoders = []
+            self._decoder_count = 0
+            self._decoder_generation += 1
+            self._decoders_available.notify_all()
+
+def find_overlay_video(folder):
+    """Returns the video an overlay folder belongs to, or None if folder is not a video overlay."""
+    if folder.endswith(VIDEO_OVERLAY_SUFFIX):
+        video_path = folder[:-len(VIDEO_OVERLAY_SUFFIX)]
+        if is_video_path(video_path) and os.path.isfile(video_path):
+            return video_path
+    return None
+
+def export_labelled_frames(source, image_paths, label_paths, images_folder, progress_callback=None):
+    """Worker function: writes the frames that have boxes as JPEG files into images_folder.
+
+    Returns ([exported image path, ...], [their label path, ...]). Frames without a label file or
+    with an empty one are skipped, so an export only contains frames that were actually labelled.
+    """
+    import cv2
+    os.makedirs(images_folder, exist_ok=True)
+    stem = os.path.splitext(os.path.basename(source.video_path))[0]
+    exported_images = []
+    exported_labels = []
+    for i, (image_path, label_path) in enumerate(zip(image_paths, label_paths)):
+        try:
+            if os.path.getsize(label_path) == 0:
+                continue
+        except OSError:
+            continue
+        frame_index = source.frame_index(image_path)
+        output_path = os.path.join(images_folder, f"{stem}_{frame_file_name(frame_index, '.jpg')}")
+        if not cv2.imwrite(output_path, source.decode_frame(frame_index), [cv2.IMWRITE_JPEG_QUALITY, EXPORT_JPEG_QUALITY]):
+            raise OSError(f"Could not write {output_path}")
+        exported_images.append(output_path)
+        exported_labels.append(label_path)
+        if progress_callback and (i + 1) % 100 == 0:
+            progress_callback(i + 1, len(image_paths))
+    return exported_images, exported_labels
+
+def export_video_coco(source, image_paths, label_paths, labels, output_path, progress_callback=None):
+    """Worker function: exports the labelled frames of a video dataset to COCO.
+
+    The frames are written to <output name>_images beside the COCO file, which references them
+    relative to its own folder. Returns the result of export_coco.
+    """
+    images_folder = os.path.splitext(output_path)[0] + "_images"
+    exported_images, exported_labels = export_labelled_frames(source, image_paths, label_paths, images_folder, progress_callback)
+    return export_coco(os.path.dirname(os.path.abspath(output_path)), exported_images, exported_labels, labels, output_path, progress_callback)
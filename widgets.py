@@ -11,7 +11,12 @@ from PyQt6.QtWidgets import (
     QSizePolicy
 )
 from PyQt6.QtCore import Qt, QSize, pyqtSignal
-from PyQt6.QtGui import QPixmap, QImageReader, QIcon
+from PyQt6.QtGui import QPixmap, QIcon, QPainter, QColor
+
+from image_cache import image_cache
+from archive_source import open_image_reader
+
+THUMBNAIL_SIZE = 30
 
 # Define a custom widget for list items
 class ImageListItemWidget(QWidget):
@@ -28,7 +33,7 @@ class ImageListItemWidget(QWidget):
 
         # Thumbnail Label
         self.thumbnail_label = QLabel()
-        self.thumbnail_label.setFixedSize(30, 30) # Further reduced size for thinner list items
+        self.thumbnail_label.setFixedSize(THUMBNAIL_SIZE, THUMBNAIL_SIZE) # Further reduced size for thinner list items
         self.thumbnail_label.setScaledContents(True)
         self.load_thumbnail()
         self.layout.addWidget(self.thumbnail_label)
@@ -59,11 +64,60 @@ class ImageListItemWidget(QWidget):
             self.status_label.setStyleSheet("") # Reset style
 
     def load_thumbnail(self):
-        pixmap = QPixmap(self.image_path)
-        if not pixmap.isNull():
-            scaled_pixmap = pixmap.scaled(30, 30, Qt.AspectRatioMode.KeepAspectRatio, Qt.TransformationMode.SmoothTransformation) # Use further reduced size
+        scaled_pixmap = image_cache.get_or_load(("thumbnail", self.image_path, THUMBNAIL_SIZE), self._decode_thumbnail)
+        if not scaled_pixmap.isNull():
             self.thumbnail_label.setPixmap(scaled_pixmap)
         else:
             self.thumbnail_label.setText("No Thumb") # Placeholder if loading fails
 
+    def _decode_thumbnail(self):
+        # Decode at thumbnail size directly instead of decoding the full image and scaling it down
+        reader = open_image_reader(self.image_path)
+        size = reader.size()
+        if size.isValid():
+            reader.setScaledSize(size.scaled(THUMBNAIL_SIZE, THUMBNAIL_SIZE, Qt.AspectRatioMode.KeepAspectRatio).expandedTo(QSize(1, 1)))
+        return QPixmap.fromImage(reader.read())
+
 # --- End of ImageListItemWidget ---
+
+# Define a simple bar chart widget for the statistics panel
+class HistogramWidget(QWidget):
+    def __init__(self, title, parent=None):
+        super().__init__(parent)
+        self.title = title
+        self.values = []
+        self.first_bin_label = ""
+        self.last_bin_label = ""
+        self.setMinimumHeight(90)
+
+    def set_data(self, values, first_bin_label="", last_bin_label=""):
+        self.values = list(values)
+        self.first_bin_label = first_bin_label
+        self.last_bin_label = last_bin_label
+        self.setToolTip("\n".join(f"Bin {i}: {value}" for i, value in enumerate(self.values)))
+        self.update()
+
+    def paintEvent(self, event):
+        painter = QPainter(self)
+        painter.setPen(QColor("white"))
+        text_height = painter.fontMetrics().height()
+        painter.drawText(0, text_height, self.title)
+
+        chart_top = text_height + 4
+        chart_bottom = self.height() - text_height - 2
+        chart_height = chart_bottom - chart_top
+        max_value = max(self.values) if self.values else 0
+        if max_value > 0 and chart_height > 0:
+            bar_width = self.width() / len(self.values)
+            for i, value in enumerate(self.values):
+                bar_height = int(chart_height * value / max_value)
+                painter.fillRect(int(i * bar_width), chart_bottom - bar_height,
+                                 max(1, int(bar_width) - 1), bar_height, QColor("#4A90E2"))
+
+        painter.setPen(QColor("#888888"))
+        painter.drawText(0, self.height() - 2, self.first_bin_label)
+        last_label_width = painter.fontMetrics().horizontalAdvance(self.last_bin_label)
+        painter.drawText(self.width() - last_label_width, self.height() - 2, self.last_bin_label)
+        painter.end()
+
+# --- End of HistogramWidget ---
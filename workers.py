@@ -0,0 +1,45 @@
+import traceback
+from PyQt6.QtCore import QObject, QRunnable, QThreadPool, pyqtSignal
+
+class WorkerSignals(QObject):
+    finished = pyqtSignal(object) # Emits the return value of the worker function
+    error = pyqtSignal(str) # Emits the error message if the worker function raised
+    progress = pyqtSignal(int, int) # Emits (done, total) for long running jobs
+
+class Worker(QRunnable):
+    """Runs a function on the global QThreadPool and reports back through Qt signals.
+
+    The function is called as fn(*args, **kwargs). If it accepts a progress_callback
+    keyword, pass progress=True and it will receive a callable emitting signals.progress.
+    Signals are delivered to the GUI thread, so connected slots may safely touch widgets.
+    """
+
+    def __init__(self, fn, *args, progress=False, **kwargs):
+        super().__init__()
+        self.fn = fn
+        self.args = args
+        self.kwargs = kwargs
+        self.signals = WorkerSignals()
+        if progress:
+            self.kwargs['progress_callback'] = self.signals.progress.emit
+
+    def run(self):
+        try:
+            result = self.fn(*self.args, **self.kwargs)
+        except Exception as e:
+            traceback.print_exc()
+            self.signals.error.emit(str(e))
+        else:
+            self.signals.finished.emit(result)
+
+def run_in_background(fn, *args, on_finished=None, on_error=None, on_progress=None, **kwargs):
+    """Convenience wrapper that creates a Worker, connects the callbacks and starts it."""
+    worker = Worker(fn, *args, progress=on_progress is not None, **kwargs)
+    if on_finished:
+        worker.signals.finished.connect(on_finished)
+    if on_error:
+        worker.signals.error.connect(on_error)
+    if on_progress:
+        worker.signals.progress.connect(on_progress)
+    QThreadPool.globalInstance().start(worker)
+    return worker